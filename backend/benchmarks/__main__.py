@@ -0,0 +1,138 @@
+"""
+Endpoint benchmark CLI.
+
+Run from the backend directory:
+
+    # Benchmark the in-process app at scale factors 1 and 10 (reloads the database!)
+    python -m benchmarks run --scales 1,10 --out results.json
+
+    # Benchmark whatever is currently loaded, without touching the data
+    python -m benchmarks run --out results.json
+
+    # Benchmark a running server
+    python -m benchmarks run --base-url http://localhost:8000 --out results.json
+
+    # Compare two runs; exits with status 1 when a regression is found
+    python -m benchmarks compare baseline.json results.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.compare import compare_results
+from benchmarks.runner import run_benchmark
+
+
+def run(args):
+    """Run the benchmark at each scale factor and write the JSON report."""
+    scales = [s.strip() for s in args.scales.split(",")] if args.scales else ["current"]
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "target": args.base_url or "in-process",
+        },
+        "results": {},
+    }
+
+    # One log line per request would drown the progress output
+    logging.getLogger("request_timing").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    for scale in scales:
+        if scale != "current":
+            # Imported lazily: only needed when reloading data
+            from scripts.generate_data import generate, load
+
+            print(f"Loading data at scale {scale}...")
+            with tempfile.TemporaryDirectory() as out_dir:
+                generate(float(scale), Path(out_dir), seed=args.seed)
+                load(Path(out_dir), truncate=True)
+
+        print(f"Benchmarking scale {scale}...")
+        report["results"][scale] = asyncio.run(
+            run_benchmark(
+                requests=args.requests,
+                concurrency=args.concurrency,
+                warmup=args.warmup,
+                base_url=args.base_url,
+                only=args.only.split(",") if args.only else None,
+            )
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output)
+        print(f"✓ Results written to {args.out}")
+    else:
+        print(output)
+
+
+def compare(args):
+    """Compare two reports, print regressions and exit non-zero if any."""
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    rows = compare_results(baseline, candidate, args.threshold)
+
+    regressions = [row for row in rows if row["regression"]]
+    for row in rows if args.verbose else regressions:
+        marker = "✗" if row["regression"] else " "
+        print(
+            f"{marker} [{row['scale']}] {row['scenario']:<28} {row['metric']:<16} "
+            f"{row['baseline']} -> {row['candidate']} ({row['change_pct']:+}%)"
+        )
+
+    if regressions:
+        print(f"✗ {len(regressions)} regression(s) found")
+        sys.exit(1)
+    print("✓ No regressions found")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite")
+    run_parser.add_argument(
+        "--scales",
+        help="Comma-separated scale factors to generate and load before each run "
+        "(replaces all data!). Omit to benchmark the data already loaded.",
+    )
+    run_parser.add_argument("--requests", type=int, default=200)
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--warmup", type=int, default=5)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--base-url", help="Benchmark a running server instead")
+    run_parser.add_argument("--only", help="Comma-separated scenario names to run")
+    run_parser.add_argument("--out", help="Path of the JSON report to write")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed relative change before flagging (default 0.1 = 10%%)",
+    )
+    compare_parser.add_argument(
+        "--verbose", action="store_true", help="Print every comparison"
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
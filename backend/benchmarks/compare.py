@@ -0,0 +1,92 @@
+"""
+Compare two benchmark result files and flag regressions.
+"""
+
+# Metrics where a higher value is worse
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+
+
+def compare_results(baseline: dict, candidate: dict, threshold: float) -> list[dict]:
+    """
+    Compare a candidate run against a baseline run.
+
+    A scenario regresses when a latency percentile grows by more than
+    `threshold` (as a fraction, e.g. 0.1 for 10%), when throughput drops by
+    more than `threshold`, when SQL statements per request increase, or when
+    it starts returning errors.
+
+    Args:
+        baseline: Parsed JSON of the baseline run
+        candidate: Parsed JSON of the candidate run
+        threshold: Allowed relative change before flagging
+
+    Returns:
+        One entry per comparison, each with a "regression" flag
+    """
+    rows = []
+    for scale, scenarios in candidate["results"].items():
+        baseline_scenarios = baseline["results"].get(scale, {})
+        for name, new in scenarios.items():
+            old = baseline_scenarios.get(name)
+            if old is None:
+                continue
+
+            for metric in LATENCY_METRICS:
+                change = _relative_change(old[metric], new[metric])
+                rows.append(
+                    _row(scale, name, metric, old[metric], new[metric], change > threshold)
+                )
+
+            change = _relative_change(old["throughput_rps"], new["throughput_rps"])
+            rows.append(
+                _row(
+                    scale,
+                    name,
+                    "throughput_rps",
+                    old["throughput_rps"],
+                    new["throughput_rps"],
+                    change < -threshold,
+                )
+            )
+
+            if old["sql_per_request"] is not None and new["sql_per_request"] is not None:
+                rows.append(
+                    _row(
+                        scale,
+                        name,
+                        "sql_per_request",
+                        old["sql_per_request"],
+                        new["sql_per_request"],
+                        new["sql_per_request"] > old["sql_per_request"],
+                    )
+                )
+
+            rows.append(
+                _row(
+                    scale,
+                    name,
+                    "errors",
+                    old["errors"],
+                    new["errors"],
+                    new["errors"] > old["errors"],
+                )
+            )
+    return rows
+
+
+def _relative_change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return (new - old) / old
+
+
+def _row(scale: str, scenario: str, metric: str, old, new, regression: bool) -> dict:
+    return {
+        "scale": scale,
+        "scenario": scenario,
+        "metric": metric,
+        "baseline": old,
+        "candidate": new,
+        "change_pct": round(_relative_change(old or 0, new or 0) * 100, 1),
+        "regression": regression,
+    }
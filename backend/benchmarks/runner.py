@@ -0,0 +1,150 @@
+"""
+Benchmark runner: drives each scenario at a fixed concurrency and reports
+latency percentiles, throughput and SQL statements per request.
+"""
+
+import asyncio
+import re
+import time
+
+import httpx
+
+from benchmarks.scenarios import Scenario, prepare_scenarios
+
+# Statement count reported by the request timing middleware
+STATEMENTS_PATTERN = re.compile(r'db;[^,]*desc="(\d+) statements"')
+
+
+def statement_count(response: httpx.Response) -> int | None:
+    """Read the SQL statement count from a response's Server-Timing header."""
+    match = STATEMENTS_PATTERN.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else None
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Values sorted ascending
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    """
+    Run one scenario and summarize its latencies.
+
+    Args:
+        client: Client bound to the app under test
+        scenario: Scenario to run
+        requests: Number of measured requests
+        concurrency: Number of requests in flight at once
+        warmup: Number of unmeasured requests sent first
+
+    Returns:
+        Summary with p50/p95/p99/mean latency (ms), throughput (req/s),
+        error count and SQL statements per request
+    """
+    for _ in range(warmup):
+        await client.get(scenario.next_url())
+
+    latencies = []
+    statements = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            url = scenario.next_url()
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                failed = response.status_code >= 400
+                count = statement_count(response)
+                if count is not None:
+                    statements.append(count)
+            except httpx.HTTPError:
+                failed = True
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if failed:
+                errors += 1
+            else:
+                latencies.append(elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / wall_time, 2) if wall_time else 0.0,
+        "sql_per_request": (
+            round(sum(statements) / len(statements), 2) if statements else None
+        ),
+    }
+
+
+async def run_benchmark(
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    base_url: str | None = None,
+    only: list[str] | None = None,
+) -> dict[str, dict]:
+    """
+    Benchmark every route against the in-process app or a running server.
+
+    Args:
+        requests: Measured requests per scenario
+        concurrency: Requests in flight at once
+        warmup: Unmeasured requests per scenario
+        base_url: URL of a running server; when omitted the FastAPI app from
+            main.py is driven in-process
+        only: Optional list of scenario names to run
+
+    Returns:
+        Summary per scenario name
+    """
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        from main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            timeout=60,
+        )
+
+    results = {}
+    async with client:
+        for scenario in await prepare_scenarios(client):
+            if only and scenario.name not in only:
+                continue
+            print(f"  - {scenario.name}...")
+            results[scenario.name] = await run_scenario(
+                client, scenario, requests, concurrency, warmup
+            )
+    return results
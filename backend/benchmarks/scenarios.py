@@ -0,0 +1,152 @@
+"""
+Benchmark scenarios: one per API route.
+
+Each scenario is prepared once against the loaded dataset (e.g. to collect
+cursors or patient ids) and then yields the URL to request on every iteration.
+"""
+
+import itertools
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+import httpx
+
+# How many cursor pages to walk when preparing the deep pagination scenario
+CURSOR_PAGES = 20
+
+# Search terms covering name, email and phone matches
+SEARCH_TERMS = ["smi", "ann", "john", "example.org", "555", "lee", "mar", "@"]
+
+# Analytics backed by the daily rollups answer 503 without startDate until
+# scripts/build_rollups.py has run; an explicit window works on fresh data too
+ROLLUP_WINDOW = "startDate=2025-01-01&endDate=2025-06-30"
+
+
+@dataclass
+class Scenario:
+    """A named route to benchmark and the URLs to cycle through."""
+
+    name: str
+    urls: list[str] = field(default_factory=list)
+    _cycle: Iterator[str] | None = field(default=None, init=False, repr=False)
+
+    def next_url(self) -> str:
+        """Return the next URL to request, cycling through the prepared list."""
+        if self._cycle is None:
+            self._cycle = itertools.cycle(self.urls)
+        return next(self._cycle)
+
+
+async def collect_cursor_urls(client: httpx.AsyncClient, first_url: str) -> list[str]:
+    """
+    Follow nextCursor from a list URL for up to CURSOR_PAGES pages.
+
+    Returns:
+        The URLs of the pages after the first one
+    """
+    urls = []
+    url = first_url
+    for _ in range(CURSOR_PAGES):
+        response = await client.get(url)
+        response.raise_for_status()
+        body = response.json()
+        if not body["hasMore"]:
+            break
+        url = f"{first_url}&cursor={body['nextCursor']}"
+        urls.append(url)
+    return urls
+
+
+async def prepare_scenarios(client: httpx.AsyncClient) -> list[Scenario]:
+    """
+    Build the scenario list for every route, using the API to collect inputs.
+
+    Args:
+        client: Client bound to the app under test
+
+    Returns:
+        Scenarios for the patients, providers, appointments, payments and
+        analytics routes
+    """
+    # Walk cursor pages to benchmark deep pages, not just the first one
+    cursor_urls = await collect_cursor_urls(client, "/api/patients?limit=20")
+    appointment_cursor_urls = await collect_cursor_urls(
+        client, "/api/appointments?limit=20"
+    )
+    payment_cursor_urls = await collect_cursor_urls(client, "/api/payments?limit=50")
+
+    response = await client.get("/api/patients?limit=100")
+    response.raise_for_status()
+    patient_ids = [patient["id"] for patient in response.json()["data"]]
+
+    return [
+        Scenario("patients_list", ["/api/patients?limit=20"]),
+        Scenario(
+            "patients_search",
+            [f"/api/patients?limit=20&search={term}" for term in SEARCH_TERMS],
+        ),
+        Scenario(
+            "patients_filtered",
+            [
+                "/api/patients?limit=20&gender=female&sortBy=last_name&sortOrder=asc",
+                "/api/patients?limit=20&source=instagram&sortBy=date_of_birth",
+            ],
+        ),
+        Scenario("patients_cursor_pages", cursor_urls or ["/api/patients?limit=20"]),
+        Scenario(
+            "patient_detail",
+            [f"/api/patients/{patient_id}" for patient_id in patient_ids],
+        ),
+        Scenario("providers_list", ["/api/providers?limit=20"]),
+        Scenario("appointments_list", ["/api/appointments?limit=20"]),
+        Scenario(
+            "appointments_filtered",
+            [
+                "/api/appointments?limit=20&status=confirmed",
+                "/api/appointments?limit=20&status=pending&sortOrder=asc",
+            ],
+        ),
+        Scenario(
+            "appointments_cursor_pages",
+            appointment_cursor_urls or ["/api/appointments?limit=20"],
+        ),
+        Scenario("payments_ledger", ["/api/payments?limit=50"]),
+        Scenario(
+            "payments_filtered",
+            [
+                "/api/payments?limit=50&status=paid&method=cash",
+                "/api/payments?limit=50&startDate=2025-01-01&sortOrder=asc",
+            ],
+        ),
+        Scenario(
+            "payments_cursor_pages", payment_cursor_urls or ["/api/payments?limit=50"]
+        ),
+        Scenario("analytics_patients", ["/api/analytics/patients"]),
+        Scenario("analytics_business", ["/api/analytics/business"]),
+        Scenario(
+            "analytics_business_approximate",
+            ["/api/analytics/business?approximate=true"],
+        ),
+        Scenario(
+            "analytics_distributions",
+            [f"/api/analytics/distributions?{ROLLUP_WINDOW}"],
+        ),
+        Scenario(
+            "analytics_service_affinity",
+            [f"/api/analytics/service-affinity?{ROLLUP_WINDOW}"],
+        ),
+        Scenario("analytics_providers", ["/api/analytics/providers"]),
+        Scenario(
+            "analytics_providers_approximate",
+            [f"/api/analytics/providers?approximate=true&{ROLLUP_WINDOW}"],
+        ),
+        Scenario("analytics_patient_behavior", ["/api/analytics/patient-behavior"]),
+        Scenario(
+            "analytics_timeseries",
+            [
+                "/api/analytics/timeseries?metric=revenue&granularity=day",
+                "/api/analytics/timeseries?metric=bookings&granularity=week",
+                "/api/analytics/timeseries?metric=revenue&granularity=month",
+            ],
+        ),
+    ]
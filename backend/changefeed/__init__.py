@@ -0,0 +1,20 @@
+"""Change feed: database triggers, NOTIFY listener and cache invalidation bus."""
+
+from changefeed.invalidation import ALL, Change, InvalidationBus, invalidation_bus
+from changefeed.listener import (
+    ChangeListener,
+    change_feed_enabled,
+    start_change_listener,
+)
+from changefeed.memo import Memo
+
+__all__ = [
+    "ALL",
+    "Change",
+    "ChangeListener",
+    "InvalidationBus",
+    "Memo",
+    "change_feed_enabled",
+    "invalidation_bus",
+    "start_change_listener",
+]
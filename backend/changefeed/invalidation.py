@@ -0,0 +1,209 @@
+"""
+Turning table changes into cache invalidations.
+
+A Change (one trigger notification) maps to a set of invalidation tags:
+
+- section tags: the route path of every endpoint whose response depends on the
+  table, e.g. "/api/analytics/business"
+- entity tags: "<entity>:<id>" for every id in the changed rows, e.g.
+  "patient:pat_123", or "<entity>:*" when the notification did not list keys
+
+Caches subscribe to the InvalidationBus and drop entries carrying any of the
+delivered tags; ALL means "drop everything" (e.g. after the listener
+reconnects and may have missed notifications).
+
+Writes tend to come in bursts (a sync batch, a checkout touching several
+tables), so the bus debounces: tags accumulate until no change arrived for
+`debounce` seconds, or `max_delay` seconds after the first pending change,
+whichever comes first, and are then delivered as one set.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from changefeed.triggers import WATCHED_TABLES
+from metrics import CHANGE_FEED_FLUSHES
+
+logger = logging.getLogger(__name__)
+
+# Tag meaning "everything may have changed"
+ALL = "*"
+
+DEBOUNCE_SECONDS = float(os.getenv("CHANGE_FEED_DEBOUNCE_MS", "250")) / 1000
+MAX_DELAY_SECONDS = float(os.getenv("CHANGE_FEED_MAX_DELAY_MS", "2000")) / 1000
+
+# Table -> route paths of the endpoints whose responses read it
+SECTIONS_BY_TABLE = {
+    "patient": [
+        "/api/patients",
+        "/api/analytics/patients",
+        "/api/analytics/patient-behavior",
+    ],
+    "appointment": [
+        "/api/analytics/business",
+        "/api/analytics/patient-behavior",
+        "/api/analytics/timeseries",
+        "/api/analytics/distributions",
+    ],
+    "appointment_service": [
+        "/api/providers",
+        "/api/analytics/business",
+        "/api/analytics/providers",
+        "/api/analytics/patient-behavior",
+        "/api/analytics/distributions",
+        "/api/analytics/service-affinity",
+    ],
+    "payment": [
+        "/api/providers",
+        "/api/payments",
+        "/api/analytics/business",
+        "/api/analytics/providers",
+        "/api/analytics/patient-behavior",
+        "/api/analytics/timeseries",
+        "/api/analytics/distributions",
+    ],
+}
+
+# Key column -> entity it identifies ("id" identifies the changed table's entity)
+ENTITY_BY_COLUMN = {
+    "patient_id": "patient",
+    "appointment_id": "appointment",
+    "provider_id": "provider",
+    "service_id": "service",
+}
+
+
+def entity_for(table: str, column: str) -> str:
+    """Entity identified by a key column of a table."""
+    return table if column == "id" else ENTITY_BY_COLUMN[column]
+
+
+@dataclass(frozen=True)
+class Change:
+    """One change notification: rows of a table changed by a statement."""
+
+    table: str
+    op: str
+    count: int | None = None
+    # Key columns of each changed row; None when the whole table may have changed
+    keys: tuple[dict, ...] | None = None
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "Change":
+        """Parse a notification payload published by the change triggers."""
+        data = json.loads(payload)
+        keys = data.get("keys")
+        return cls(
+            table=data["table"],
+            op=data["op"],
+            count=data.get("count"),
+            keys=tuple(keys) if keys is not None else None,
+        )
+
+    def tags(self) -> set[str]:
+        """Invalidation tags for this change."""
+        tags = set(SECTIONS_BY_TABLE.get(self.table, []))
+        columns = WATCHED_TABLES.get(self.table, [])
+        if self.keys is None:
+            tags.update(f"{entity_for(self.table, column)}:*" for column in columns)
+            return tags
+
+        for key in self.keys:
+            for column in columns:
+                if key.get(column) is not None:
+                    tags.add(f"{entity_for(self.table, column)}:{key[column]}")
+        return tags
+
+
+class InvalidationBus:
+    """Collects invalidation tags and delivers them to subscribers, debounced."""
+
+    def __init__(
+        self,
+        debounce: float = DEBOUNCE_SECONDS,
+        max_delay: float = MAX_DELAY_SECONDS,
+    ):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._subscribers: list[Callable[[frozenset[str]], None]] = []
+        self._pending: set[str] = set()
+        self._first_pending_at: float | None = None
+        self._last_pending_at: float | None = None
+
+    def subscribe(self, callback: Callable[[frozenset[str]], None]):
+        """Register a callback receiving each delivered set of tags."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[frozenset[str]], None]):
+        """Remove a callback registered with subscribe()."""
+        with self._lock:
+            self._subscribers.remove(callback)
+
+    def publish(self, tags: set[str], now: float | None = None):
+        """Queue tags for the next delivery."""
+        if not tags:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._first_pending_at is None:
+                self._first_pending_at = now
+            self._last_pending_at = now
+            self._pending.update(tags)
+
+    def publish_change(self, change: Change, now: float | None = None):
+        """Queue the tags of a change notification."""
+        self.publish(change.tags(), now)
+
+    def seconds_until_due(self, now: float | None = None) -> float | None:
+        """Time until pending tags are due for delivery (None when none pending)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._first_pending_at is None:
+                return None
+            due_at = min(
+                self._last_pending_at + self.debounce,
+                self._first_pending_at + self.max_delay,
+            )
+        return max(due_at - now, 0.0)
+
+    def flush(self, now: float | None = None, force: bool = False) -> frozenset[str]:
+        """
+        Deliver pending tags to every subscriber if they are due.
+
+        Args:
+            now: Current time.monotonic() (for tests and the listener loop)
+            force: Deliver even if the debounce interval has not elapsed
+
+        Returns:
+            The delivered tags (empty when nothing was due)
+        """
+        remaining = self.seconds_until_due(now)
+        if remaining is None or (remaining > 0 and not force):
+            return frozenset()
+
+        with self._lock:
+            tags = frozenset(self._pending)
+            self._pending.clear()
+            self._first_pending_at = None
+            self._last_pending_at = None
+            subscribers = list(self._subscribers)
+
+        CHANGE_FEED_FLUSHES.inc()
+        for callback in subscribers:
+            try:
+                callback(tags)
+            except Exception:
+                # One broken subscriber must not starve the others
+                logger.exception("Invalidation subscriber %r failed", callback)
+        return tags
+
+
+# Process-wide bus fed by the change listener
+invalidation_bus = InvalidationBus()
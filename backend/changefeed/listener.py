@@ -0,0 +1,134 @@
+"""
+Background thread consuming change notifications.
+
+The listener holds one dedicated database connection in autocommit mode,
+LISTENs on the change channel and feeds every notification into the
+invalidation bus, flushing the bus whenever its debounce interval elapses.
+
+If the connection drops, notifications sent in the meantime are lost, so on
+reconnect the listener publishes ALL and every cache starts over.
+
+LISTEN needs a session-level connection: point the listener at the database
+directly (or a session pooler), not at a transaction pooler.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+
+from sqlalchemy.engine import Engine
+
+from changefeed.invalidation import ALL, Change, InvalidationBus, invalidation_bus
+from changefeed.triggers import CHANNEL
+from metrics import CHANGE_FEED_RECONNECTS, CHANGE_NOTIFICATIONS
+
+logger = logging.getLogger(__name__)
+
+# Longest wait for a notification before checking for shutdown
+POLL_INTERVAL_SECONDS = 1.0
+
+# Idle time after which the connection is checked with a query; a dropped
+# connection is not always visible on the socket (NAT, proxies)
+HEARTBEAT_SECONDS = 30.0
+
+# Wait before reconnecting after a failure (doubles up to the maximum)
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+
+class ChangeListener(threading.Thread):
+    """Daemon thread turning NOTIFY messages into invalidations."""
+
+    def __init__(self, engine: Engine, bus: InvalidationBus = invalidation_bus):
+        super().__init__(name="change-listener", daemon=True)
+        self.engine = engine
+        self.bus = bus
+        self._stopping = threading.Event()
+
+    def run(self):
+        delay = RECONNECT_DELAY_SECONDS
+        connected_before = False
+        while not self._stopping.is_set():
+            try:
+                self._listen(on_connect=lambda: self._on_connect(connected_before))
+            except Exception:
+                CHANGE_FEED_RECONNECTS.inc()
+                logger.exception("Change listener failed, reconnecting in %.0fs", delay)
+                self._stopping.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+            else:
+                delay = RECONNECT_DELAY_SECONDS
+            connected_before = True
+
+    def _on_connect(self, reconnected: bool):
+        if reconnected:
+            # Notifications sent while disconnected are gone
+            self.bus.publish({ALL})
+            self.bus.flush(force=True)
+        logger.info("Change listener listening on '%s'", CHANNEL)
+
+    def _listen(self, on_connect):
+        raw_connection = self.engine.raw_connection()
+        try:
+            connection = raw_connection.driver_connection
+            connection.autocommit = True
+            connection.cursor().execute(f"LISTEN {CHANNEL}")
+            on_connect()
+            last_activity = time.monotonic()
+
+            while not self._stopping.is_set():
+                timeout = self.bus.seconds_until_due()
+                if timeout is None or timeout > POLL_INTERVAL_SECONDS:
+                    timeout = POLL_INTERVAL_SECONDS
+
+                readable, _, _ = select.select([connection], [], [], timeout)
+                if readable:
+                    connection.poll()
+                    while connection.notifies:
+                        self._handle(connection.notifies.pop(0).payload)
+                    last_activity = time.monotonic()
+                elif time.monotonic() - last_activity > HEARTBEAT_SECONDS:
+                    connection.cursor().execute("SELECT 1")
+                    last_activity = time.monotonic()
+                self.bus.flush()
+        except Exception:
+            # The connection is probably dead: discard it without a rollback
+            raw_connection.invalidate()
+            raise
+        raw_connection.close()
+
+    def _handle(self, payload: str):
+        try:
+            change = Change.from_payload(payload)
+        except (ValueError, KeyError):
+            logger.warning("Ignoring malformed change notification: %r", payload)
+            return
+        CHANGE_NOTIFICATIONS.labels(table=change.table).inc()
+        self.bus.publish_change(change)
+
+    def stop(self, timeout: float | None = None):
+        """Ask the thread to stop, deliver pending invalidations and wait for it."""
+        self._stopping.set()
+        self.join(timeout)
+        self.bus.flush(force=True)
+
+
+def change_feed_enabled() -> bool:
+    """Whether the change feed is enabled (CHANGE_FEED=1)."""
+    return os.getenv("CHANGE_FEED", "0").lower() in ("1", "true", "yes")
+
+
+def start_change_listener(engine: Engine) -> ChangeListener | None:
+    """
+    Start the change listener when CHANGE_FEED is enabled.
+
+    Returns:
+        The running listener, or None when the change feed is disabled
+    """
+    if not change_feed_enabled():
+        return None
+    listener = ChangeListener(engine)
+    listener.start()
+    return listener
@@ -0,0 +1,91 @@
+"""
+Memoized query results invalidated by the change feed.
+
+For intermediate results that are expensive to recompute and reused across
+requests with different parameters, so the response cache cannot serve them
+(e.g. the revenue total before a payments ledger page, or the buckets of a
+time series). A Memo holds values keyed by their query parameters and drops
+all of them when the change feed delivers one of its tags.
+
+Like the response cache, memoizing is only safe when invalidations arrive:
+without the change feed (CHANGE_FEED=0) every lookup recomputes.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Generic, TypeVar
+
+from changefeed.invalidation import ALL, invalidation_bus
+from changefeed.listener import change_feed_enabled
+
+T = TypeVar("T")
+
+
+class Memo(Generic[T]):
+    """Thread-safe LRU of computed values, cleared when one of its tags is invalidated."""
+
+    def __init__(
+        self,
+        tags: Iterable[str],
+        max_entries: int = 1000,
+        enabled: bool | None = None,
+    ):
+        self.tags = frozenset(tags)
+        self.max_entries = max_entries
+        self.enabled = change_feed_enabled() if enabled is None else enabled
+        # Bumped on every invalidation, so a value computed while an
+        # invalidation was delivered is not stored
+        self.generation = 0
+        self._entries: OrderedDict[Hashable, T] = OrderedDict()
+        self._lock = threading.Lock()
+        invalidation_bus.subscribe(self.invalidate)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Memoized value for key, computing (and storing) it on a miss."""
+        hits, generation = self.lookup([key])
+        if key in hits:
+            return hits[key]
+        value = compute()
+        self.store({key: value}, generation)
+        return value
+
+    def lookup(self, keys: Iterable[Hashable]) -> tuple[dict[Hashable, T], int]:
+        """
+        Memoized values of the keys that have one.
+
+        Returns:
+            Tuple of (values by key, generation to pass to store())
+        """
+        if not self.enabled:
+            return {}, self.generation
+        with self._lock:
+            hits = {}
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    hits[key] = self._entries[key]
+            return hits, self.generation
+
+    def store(self, values: dict[Hashable, T], generation: int):
+        """Memoize values computed after lookup(), unless invalidated since."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries.update(values)
+            for key in values:
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags: frozenset[str]):
+        """Drop every value if the tags include one of the memo's tags."""
+        if ALL in tags or self.tags & tags:
+            with self._lock:
+                self.generation += 1
+                self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,131 @@
+"""
+Triggers publishing row changes on the CHANNEL notification channel.
+
+Triggers are statement-level and read the changed rows from transition
+tables, so a bulk INSERT/UPDATE/DELETE sends one notification instead of one
+per row. Each notification is a JSON object:
+
+    {"table": "payment", "op": "UPDATE", "count": 2,
+     "keys": [{"id": "pay_1", "patient_id": "pat_1", ...}, ...]}
+
+"keys" holds the distinct key columns of every changed row (old and new
+values for an UPDATE). When a statement changes more than MAX_KEYS rows, or
+on TRUNCATE, or when the keys would not fit in a NOTIFY payload, "keys" is
+null and listeners treat the whole table as changed.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+CHANNEL = "table_changes"
+
+# Most keys listed in a single notification before it degrades to "whole table"
+MAX_KEYS = 50
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_LENGTH = 7900
+
+# Watched table -> columns published for each changed row
+WATCHED_TABLES = {
+    "patient": ["id"],
+    "appointment": ["id", "patient_id"],
+    "appointment_service": ["appointment_id", "service_id", "provider_id"],
+    "payment": ["id", "patient_id", "provider_id", "service_id"],
+}
+
+FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+DECLARE
+    source text;
+    counted text;
+    key_object text;
+    row_count bigint;
+    keys jsonb;
+    payload text;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify(
+            '{CHANNEL}',
+            json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'keys', NULL)::text
+        );
+        RETURN NULL;
+    END IF;
+
+    source := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT * FROM old_rows'
+        ELSE 'SELECT * FROM new_rows UNION ALL SELECT * FROM old_rows'
+    END;
+    counted := CASE TG_OP WHEN 'DELETE' THEN 'old_rows' ELSE 'new_rows' END;
+
+    -- jsonb_build_object('id', changed.id, ...) over the trigger arguments
+    SELECT string_agg(format('%L, changed.%I', column_name, column_name), ', ')
+    INTO key_object
+    FROM unnest(TG_ARGV) AS column_name;
+
+    EXECUTE format(
+        'SELECT count(*), (SELECT jsonb_agg(DISTINCT key) FROM ('
+        '  SELECT jsonb_build_object(%s) AS key FROM (%s) AS changed LIMIT %s'
+        ') AS limited) FROM %I',
+        key_object, source, {MAX_KEYS} * 2 + 1, counted
+    ) INTO row_count, keys;
+
+    IF row_count = 0 THEN
+        RETURN NULL;
+    END IF;
+    IF jsonb_array_length(keys) > {MAX_KEYS} THEN
+        keys := NULL;
+    END IF;
+
+    payload := jsonb_build_object(
+        'table', TG_TABLE_NAME, 'op', TG_OP, 'count', row_count, 'keys', keys
+    )::text;
+    -- An oversized payload would make pg_notify fail the writing transaction
+    IF length(payload) > {MAX_PAYLOAD_LENGTH} THEN
+        payload := jsonb_build_object(
+            'table', TG_TABLE_NAME, 'op', TG_OP, 'count', row_count, 'keys', NULL
+        )::text;
+    END IF;
+
+    PERFORM pg_notify('{CHANNEL}', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def trigger_statements(table_name: str, columns: list[str]) -> list[str]:
+    """CREATE TRIGGER statements for one table (one per event)."""
+    arguments = ", ".join(f"'{column}'" for column in columns)
+    transition_tables = {
+        "INSERT": "REFERENCING NEW TABLE AS new_rows",
+        "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "REFERENCING OLD TABLE AS old_rows",
+        "TRUNCATE": "",
+    }
+    # Transition tables can only be declared on single-event triggers
+    return [
+        f'CREATE TRIGGER "{table_name}_notify_{event.lower()}" '
+        f'AFTER {event} ON "{table_name}" {referencing} '
+        f"FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change({arguments})"
+        for event, referencing in transition_tables.items()
+    ]
+
+
+def drop_triggers(conn: Connection):
+    """Remove the change triggers and their function."""
+    for table_name in WATCHED_TABLES:
+        for event in ["insert", "update", "delete", "truncate"]:
+            conn.execute(
+                text(f'DROP TRIGGER IF EXISTS "{table_name}_notify_{event}" ON "{table_name}"')
+            )
+    conn.execute(text("DROP FUNCTION IF EXISTS notify_table_change()"))
+
+
+def install_triggers(conn: Connection):
+    """(Re)create the change triggers on every watched table."""
+    drop_triggers(conn)
+    conn.execute(text(FUNCTION_SQL))
+    for table_name, columns in WATCHED_TABLES.items():
+        for statement in trigger_statements(table_name, columns):
+            conn.execute(text(statement))
@@ -0,0 +1,118 @@
+"""
+Cancelling the database work of abandoned requests.
+
+SQLAlchemy event hooks record which DBAPI connections the current request is
+executing a statement on. When the client disconnects (see
+middleware/cancellation.py), cancel_queries() asks the server to cancel those
+statements, and any statement the request tries to start afterwards fails
+immediately with QueryCancelled, so an abandoned search stops running its
+count and ILIKE queries and releases its connection.
+
+Statements are cancelled with psycopg2's connection.cancel() (a cancel
+request on a separate socket, also understood by PgBouncer/Supavisor), or
+with pg_cancel_backend() on another connection if that fails.
+"""
+
+import logging
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCancelled(Exception):
+    """Raised when a request starts a statement after its client disconnected."""
+
+
+@dataclass
+class QueryScope:
+    """Statements currently executing for one request."""
+
+    cancelled: bool = False
+    # DBAPI connections with a statement in progress
+    active: set = field(default_factory=set)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+# Scope of the request being handled. Mutable and copied into the threadpool
+# with the context, like RequestStats.
+current_query_scope: ContextVar[QueryScope | None] = ContextVar(
+    "current_query_scope", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = current_query_scope.get()
+    if scope is None:
+        return
+    with scope.lock:
+        if scope.cancelled:
+            raise QueryCancelled("Client disconnected; statement not started")
+        scope.active.add(conn.connection.dbapi_connection)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = current_query_scope.get()
+    if scope is not None:
+        with scope.lock:
+            scope.active.discard(conn.connection.dbapi_connection)
+
+
+def _handle_error(exception_context):
+    scope = current_query_scope.get()
+    connection = exception_context.connection
+    if scope is not None and connection is not None and not connection.invalidated:
+        with scope.lock:
+            scope.active.discard(connection.connection.dbapi_connection)
+
+
+def instrument_cancellation(engine: Engine) -> Engine:
+    """
+    Attach the statement tracking hooks to an engine (idempotent).
+
+    Args:
+        engine: Engine to instrument
+
+    Returns:
+        The same engine, for chaining
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def cancel_queries(scope: QueryScope, engine: Engine) -> int:
+    """
+    Cancel the scope's running statements and refuse new ones.
+
+    Blocking (it talks to the server): call it from a worker thread.
+
+    Returns:
+        Number of statements a cancel was sent for
+    """
+    with scope.lock:
+        scope.cancelled = True
+        connections = list(scope.active)
+
+    for connection in connections:
+        try:
+            connection.cancel()
+        except Exception:
+            logger.warning("Cancel request failed, using pg_cancel_backend", exc_info=True)
+            # Run outside the cancelled scope, which refuses new statements
+            token = current_query_scope.set(None)
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT pg_cancel_backend(:pid)"),
+                        {"pid": connection.info.backend_pid},
+                    )
+            finally:
+                current_query_scope.reset(token)
+    return len(connections)
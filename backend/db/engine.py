@@ -18,15 +18,25 @@ def create_sqlalchemy_engine():
     # Construct the SQLAlchemy connection string
     DATABASE_URL = f"postgresql+psycopg2://{USER}:{PASSWORD}@{HOST}:{PORT}/{DBNAME}?sslmode=require"
 
-    # Create the SQLAlchemy engine
-    # engine = create_engine(DATABASE_URL)
     # If using Transaction Pooler or Session Pooler, we want to ensure we disable SQLAlchemy client side pooling -
     # https://docs.sqlalchemy.org/en/20/core/pooling.html#switching-pool-implementations
+    # When connecting to the database directly, set DB_POOL_SIZE to keep that many
+    # connections open per process instead of opening one per request.
+    pool_size = int(os.getenv("DB_POOL_SIZE", "0"))
+    if pool_size > 0:
+        pool_options = {
+            "pool_size": pool_size,
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            # Replace connections silently dropped by the server or a proxy
+            "pool_pre_ping": True,
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        }
+    else:
+        pool_options = {"poolclass": NullPool}
+
     engine = create_engine(
         DATABASE_URL,
         client_encoding="utf8",
-        poolclass=NullPool,
-        # pool_size=20,
-        # max_overflow=10,
+        **pool_options,
     )
     return engine
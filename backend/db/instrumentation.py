@@ -0,0 +1,128 @@
+"""
+Per-request SQL instrumentation.
+
+SQLAlchemy event hooks on the engine record, for the request currently being
+handled, how many statements ran, the total time spent executing them and the
+time spent opening database connections. The request timing middleware reads
+these numbers back to emit Server-Timing headers and a structured log line.
+
+Statements run with the SESSION_SETUP_OPTION execution option (such as the
+per-transaction SET LOCAL statement_timeout) are session plumbing, not the
+route's queries: they are left out of the request's statement count and
+database time.
+
+Statements slower than SLOW_QUERY_MS are logged with their SQL and parameters.
+The same hooks feed the Prometheus query, connect and pool metrics.
+"""
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics import (
+    DB_CONNECT_DURATION,
+    DB_CONNECTIONS_CHECKED_OUT,
+    DB_CONNECTIONS_OPENED,
+    DB_QUERY_DURATION,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this many milliseconds are logged with SQL and parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Execution option marking statements that set up a session, not counted
+# against the request
+SESSION_SETUP_OPTION = "session_setup"
+
+
+@dataclass
+class RequestStats:
+    """Timings collected while handling a single request (all durations in ms)."""
+
+    started: float = field(default_factory=time.perf_counter)
+    statements: int = 0
+    db_ms: float = 0.0
+    connections: int = 0
+    connect_ms: float = 0.0
+    serialize_ms: float = 0.0
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started."""
+        return (time.perf_counter() - self.started) * 1000
+
+
+# Stats for the request being handled. The object is mutable and FastAPI copies
+# the context into the threadpool, so sync endpoints update the same instance.
+current_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context, not on the connection:
+    # a statement that fails (or is refused before it starts) never reaches
+    # after_cursor_execute, and must not leave a start time behind
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_start_time) * 1000
+    DB_QUERY_DURATION.observe(elapsed_ms / 1000)
+
+    stats = current_request_stats.get()
+    if stats is not None and not context.execution_options.get(SESSION_SETUP_OPTION):
+        stats.statements += 1
+        stats.db_ms += elapsed_ms
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s | parameters=%r", elapsed_ms, statement, parameters
+        )
+
+
+def _do_connect(dialect, conn_rec, cargs, cparams):
+    # Open the DBAPI connection ourselves so the connect time can be measured
+    started = time.perf_counter()
+    connection = dialect.connect(*cargs, **cparams)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    DB_CONNECT_DURATION.observe(elapsed_ms / 1000)
+    DB_CONNECTIONS_OPENED.inc()
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.connections += 1
+        stats.connect_ms += elapsed_ms
+    return connection
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_CONNECTIONS_CHECKED_OUT.inc()
+
+
+def _checkin(dbapi_connection, connection_record):
+    DB_CONNECTIONS_CHECKED_OUT.dec()
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Attach the timing hooks to an engine (idempotent).
+
+    Args:
+        engine: Engine to instrument
+
+    Returns:
+        The same engine, for chaining
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "do_connect", _do_connect)
+        event.listen(engine.pool, "checkout", _checkout)
+        event.listen(engine.pool, "checkin", _checkin)
+    return engine
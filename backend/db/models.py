@@ -1,6 +1,17 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import List
-from sqlalchemy import ForeignKey, String, Integer, DateTime, Enum, Index
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 import enum
 
@@ -170,6 +181,11 @@ class Appointment(Base):
         # Composite indexes for analytics queries
         Index("idx_appointment_patient_status", "patient_id", "status"),
         Index("idx_appointment_patient_created", "patient_id", "created_date"),
+        # Keyset pagination of the appointment list: (created_date, id) is
+        # the sort key, so every page (first or deep) is a short index range
+        # scan, also when filtered by status
+        Index("idx_appointment_created_id", "created_date", "id"),
+        Index("idx_appointment_status_created_id", "status", "created_date", "id"),
     )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -259,12 +275,33 @@ class Payment(Base):
 
     __tablename__ = "payment"
     __table_args__ = (
-        # Composite indexes for analytics queries
-        # Status is frequently filtered, so it's first in composite indexes
-        Index("idx_payment_status_service", "status", "service_id"),
-        Index("idx_payment_status_patient", "status", "patient_id"),
-        Index("idx_payment_status_provider", "status", "provider_id"),
-        Index("idx_payment_status_amount", "status", "amount"),
+        # Partial covering indexes for revenue queries
+        # Revenue only counts paid payments, so the indexes only hold paid rows,
+        # and INCLUDE (amount) lets SUM(amount) GROUP BY X run as an index-only scan
+        # (enum columns are stored by name, hence 'PAID')
+        Index(
+            "idx_payment_paid_service",
+            "service_id",
+            postgresql_include=["amount"],
+            postgresql_where=text("status = 'PAID'"),
+        ),
+        Index(
+            "idx_payment_paid_patient",
+            "patient_id",
+            postgresql_include=["amount"],
+            postgresql_where=text("status = 'PAID'"),
+        ),
+        Index(
+            "idx_payment_paid_provider",
+            "provider_id",
+            postgresql_include=["amount"],
+            postgresql_where=text("status = 'PAID'"),
+        ),
+        # Keyset pagination of the payments ledger on (date, id), unfiltered
+        # and filtered by provider or service
+        Index("idx_payment_date_id", "date", "id"),
+        Index("idx_payment_provider_date_id", "provider_id", "date", "id"),
+        Index("idx_payment_service_date_id", "service_id", "date", "id"),
     )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -288,3 +325,82 @@ class Payment(Base):
 
     def __repr__(self) -> str:
         return f"Payment(id={self.id!r}, patient_id={self.patient_id!r}, amount={self.amount!r}, status={self.status!r})"
+
+
+class SeedChecksum(Base):
+    """
+    Per-record checksum manifest used by the incremental seed sync.
+
+    Each row stores the hash of the seed JSON record last written for a given
+    table and primary key, so a re-run can skip records that have not changed.
+    """
+
+    __tablename__ = "seed_checksum"
+
+    table_name: Mapped[str] = mapped_column(String, primary_key=True)
+    record_key: Mapped[str] = mapped_column(String, primary_key=True)
+    checksum: Mapped[str] = mapped_column(String)
+
+    def __repr__(self) -> str:
+        return f"SeedChecksum(table_name={self.table_name!r}, record_key={self.record_key!r})"
+
+
+class AnalyticsDailyRollup(Base):
+    """
+    Exact per-day totals behind approximate analytics (approximate=true).
+
+    Payments count on their payment date and appointment services on their
+    start date. Built by scripts/build_rollups.py; see db/rollups.py.
+    """
+
+    __tablename__ = "analytics_daily_rollup"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    revenue: Mapped[int] = mapped_column(BigInteger)  # Paid amounts in cents
+    paid_payments: Mapped[int] = mapped_column(Integer)
+    appointment_services: Mapped[int] = mapped_column(Integer)
+    # Appointments with a service starting that day; NULL on days built
+    # before service pair counts were
+    appointments: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    built_at: Mapped[datetime] = mapped_column(DateTime)
+
+    def __repr__(self) -> str:
+        return f"AnalyticsDailyRollup(day={self.day!r}, revenue={self.revenue!r})"
+
+
+class AnalyticsDailySketch(Base):
+    """
+    A serialized mergeable sketch (see sketches/) of one day, stored next to
+    the day's AnalyticsDailyRollup; name says what it sketches.
+    """
+
+    __tablename__ = "analytics_daily_sketch"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    sketch: Mapped[bytes] = mapped_column(LargeBinary)
+
+    def __repr__(self) -> str:
+        return f"AnalyticsDailySketch(day={self.day!r}, name={self.name!r})"
+
+
+class AnalyticsDailyServicePair(Base):
+    """
+    Appointments of one day that booked both services of a pair, behind
+    service affinity analytics. service_id <= companion_id; the row with
+    service_id == companion_id counts the appointments with that service.
+    Stored next to the day's AnalyticsDailyRollup; see db/rollups.py.
+    """
+
+    __tablename__ = "analytics_daily_service_pair"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    service_id: Mapped[str] = mapped_column(String, primary_key=True)
+    companion_id: Mapped[str] = mapped_column(String, primary_key=True)
+    appointments: Mapped[int] = mapped_column(Integer)
+
+    def __repr__(self) -> str:
+        return (
+            f"AnalyticsDailyServicePair(day={self.day!r}, "
+            f"service_id={self.service_id!r}, companion_id={self.companion_id!r})"
+        )
@@ -0,0 +1,315 @@
+"""
+Monthly range partitioning for the append-mostly tables.
+
+payment (by date) and appointment_service (by start) only grow, and the
+analytics aggregates scan them in full. Partitioning them by month lets
+time-windowed queries skip (prune) the months outside the window, and lets old
+months be detached as a cheap metadata change instead of a large DELETE.
+
+Partitioning is optional: the models describe plain tables, and
+scripts/partition_tables.py migrates an existing database. Each partitioned
+table has one partition per month, named <table>_YYYY_MM, plus a DEFAULT
+partition (<table>_default) that catches rows outside every monthly range;
+ensure_partitions() creates upcoming months and moves rows out of the DEFAULT
+partition into partitions for their month.
+
+All functions take a Connection inside a transaction and leave committing to
+the caller.
+"""
+
+import re
+from datetime import date, datetime
+
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import AddConstraint, CreateIndex
+
+from changefeed.triggers import WATCHED_TABLES, trigger_statements
+
+# Partitioned table -> partition key column
+PARTITION_KEYS = {
+    "payment": "date",
+    "appointment_service": "start",
+}
+
+# Months created ahead of the current one, so inserts never land in DEFAULT
+DEFAULT_MONTHS_AHEAD = 3
+
+# e.g. FOR VALUES FROM ('2024-01-01 00:00:00') TO ('2024-02-01 00:00:00')
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(value: date) -> date:
+    """First day of the month containing value."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """The first day of the month `months` after `month` (may be negative)."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    """Name of the partition holding a month, e.g. payment_2024_01."""
+    return f"{table_name}_{month:%Y_%m}"
+
+
+def default_partition_name(table_name: str) -> str:
+    """Name of the DEFAULT partition of a table."""
+    return f"{table_name}_default"
+
+
+def is_partitioned(conn: Connection, table_name: str) -> bool:
+    """Whether a table in the current schema is a partitioned table."""
+    return bool(
+        conn.execute(
+            text(
+                """
+                SELECT 1
+                FROM pg_partitioned_table
+                JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+                WHERE pg_class.relname = :table_name
+                  AND pg_class.relnamespace = current_schema()::regnamespace
+                """
+            ),
+            {"table_name": table_name},
+        ).scalar()
+    )
+
+
+def list_partitions(conn: Connection, table_name: str) -> list[dict]:
+    """
+    Partitions attached to a table.
+
+    Returns:
+        {"name", "is_default", "lower", "upper"} per partition, ordered by
+        lower bound (DEFAULT last, with no bounds)
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table_name
+              AND parent.relnamespace = current_schema()::regnamespace
+            """
+        ),
+        {"table_name": table_name},
+    )
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_PATTERN.search(bound)
+        partitions.append(
+            {
+                "name": name,
+                "is_default": bound == "DEFAULT",
+                "lower": datetime.fromisoformat(match.group(1)).date() if match else None,
+                "upper": datetime.fromisoformat(match.group(2)).date() if match else None,
+            }
+        )
+    partitions.sort(key=lambda partition: (partition["lower"] is None, partition["lower"]))
+    return partitions
+
+
+def create_month_partition(conn: Connection, table_name: str, month: date) -> str:
+    """
+    Create the partition for a month.
+
+    Postgres refuses to create a partition while the DEFAULT partition holds
+    rows for its range, so those rows are moved: DEFAULT is detached, the new
+    partition is created and filled from it, and DEFAULT is attached again.
+
+    Returns:
+        Name of the new partition
+    """
+    key = PARTITION_KEYS[table_name]
+    name = partition_name(table_name, month)
+    default = default_partition_name(table_name)
+    bounds = {"lower": month, "upper": add_months(month, 1)}
+    create_sql = (
+        f'CREATE TABLE "{name}" PARTITION OF "{table_name}" '
+        f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+    )
+    in_range = f'"{key}" >= :lower AND "{key}" < :upper'
+
+    has_default = any(
+        partition["is_default"] for partition in list_partitions(conn, table_name)
+    )
+    misplaced = has_default and conn.execute(
+        text(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE {in_range})'), bounds
+    ).scalar()
+
+    if not misplaced:
+        conn.execute(text(create_sql))
+        return name
+
+    conn.execute(text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{default}"'))
+    conn.execute(text(create_sql))
+    conn.execute(
+        text(f'INSERT INTO "{name}" SELECT * FROM "{default}" WHERE {in_range}'), bounds
+    )
+    conn.execute(text(f'DELETE FROM "{default}" WHERE {in_range}'), bounds)
+    conn.execute(text(f'ALTER TABLE "{table_name}" ATTACH PARTITION "{default}" DEFAULT'))
+    return name
+
+
+def ensure_partitions(
+    conn: Connection,
+    table_name: str,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    today: date | None = None,
+) -> list[str]:
+    """
+    Create missing monthly partitions.
+
+    Covers the current month through `months_ahead` months from now, plus
+    every month that has rows in the DEFAULT partition, so those rows are
+    moved into their month.
+
+    Returns:
+        Names of the partitions created
+    """
+    key = PARTITION_KEYS[table_name]
+    partitions = list_partitions(conn, table_name)
+    existing = {partition["lower"] for partition in partitions}
+
+    current = month_start(today or date.today())
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    if any(partition["is_default"] for partition in partitions):
+        rows = conn.execute(
+            text(
+                f'SELECT DISTINCT date_trunc(\'month\', "{key}")::date '
+                f'FROM "{default_partition_name(table_name)}"'
+            )
+        )
+        months.update(month for (month,) in rows)
+
+    return [
+        create_month_partition(conn, table_name, month)
+        for month in sorted(months - existing)
+    ]
+
+
+def detach_partitions(
+    conn: Connection, table_name: str, before: date, drop: bool = False
+) -> list[str]:
+    """
+    Detach (and optionally drop) the monthly partitions entirely before a date.
+
+    Detaching only updates the catalog: the month's rows leave the parent
+    without a DELETE, and the partition stays as a standalone table that can
+    be archived or dropped later.
+
+    Returns:
+        Names of the partitions detached
+    """
+    detached = []
+    for partition in list_partitions(conn, table_name):
+        if partition["is_default"] or partition["upper"] > before:
+            continue
+        conn.execute(
+            text(f'ALTER TABLE "{table_name}" DETACH PARTITION "{partition["name"]}"')
+        )
+        if drop:
+            conn.execute(text(f'DROP TABLE "{partition["name"]}"'))
+        detached.append(partition["name"])
+    return detached
+
+
+def partition_table(
+    conn: Connection,
+    table: Table,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    today: date | None = None,
+) -> int:
+    """
+    Migrate a plain table to a table range-partitioned by month.
+
+    A partitioned copy is created with the same columns, one partition per
+    month from the oldest row through `months_ahead` months from now and a
+    DEFAULT partition; rows are copied over, the old table is dropped and the
+    copy takes its name. Foreign keys and indexes are recreated from the
+    model, and so are the change-feed triggers if the old table had them
+    (see changefeed/triggers.py), so the change feed keeps firing. Postgres requires the partition key in the primary key, so the
+    primary key becomes (model primary key..., partition key).
+
+    Run inside a single transaction: if anything fails, nothing changes.
+
+    Returns:
+        Number of rows copied
+    """
+    table_name = table.name
+    key = PARTITION_KEYS[table_name]
+    staging = f"{table_name}_partitioned"
+    primary_key = [column.name for column in table.primary_key.columns] + [key]
+
+    conn.execute(
+        text(
+            f'CREATE TABLE "{staging}" (LIKE "{table_name}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("{key}")'
+        )
+    )
+    conn.execute(
+        text(
+            f'ALTER TABLE "{staging}" ADD CONSTRAINT "{staging}_pkey" PRIMARY KEY ('
+            + ", ".join(f'"{column}"' for column in primary_key)
+            + ")"
+        )
+    )
+
+    oldest = conn.execute(text(f'SELECT min("{key}") FROM "{table_name}"')).scalar()
+    current = month_start(today or date.today())
+    month = min(month_start(oldest), current) if oldest is not None else current
+    while month <= add_months(current, months_ahead):
+        lower, upper = month, add_months(month, 1)
+        conn.execute(
+            text(
+                f'CREATE TABLE "{partition_name(table_name, month)}" '
+                f'PARTITION OF "{staging}" '
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+        )
+        month = upper
+    conn.execute(
+        text(
+            f'CREATE TABLE "{default_partition_name(table_name)}" '
+            f'PARTITION OF "{staging}" DEFAULT'
+        )
+    )
+
+    copied = conn.execute(
+        text(f'INSERT INTO "{staging}" SELECT * FROM "{table_name}"')
+    ).rowcount
+
+    # Dropping the table drops its change triggers along with it
+    had_change_triggers = table_name in WATCHED_TABLES and conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+            "WHERE tgrelid = CAST(:table_name AS regclass) AND tgname LIKE :pattern)"
+        ),
+        {"table_name": table_name, "pattern": f"{table_name}_notify_%"},
+    ).scalar()
+
+    conn.execute(text(f'DROP TABLE "{table_name}"'))
+    conn.execute(text(f'ALTER TABLE "{staging}" RENAME TO "{table_name}"'))
+    conn.execute(
+        text(
+            f'ALTER TABLE "{table_name}" '
+            f'RENAME CONSTRAINT "{staging}_pkey" TO "{table_name}_pkey"'
+        )
+    )
+
+    # Indexes on the parent cascade to every partition, including future ones
+    for constraint in table.foreign_key_constraints:
+        conn.execute(AddConstraint(constraint))
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+    if had_change_triggers:
+        for statement in trigger_statements(table_name, WATCHED_TABLES[table_name]):
+            conn.execute(text(statement))
+
+    return copied
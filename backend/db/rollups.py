@@ -0,0 +1,436 @@
+"""
+Daily rollups and sketches behind approximate analytics (approximate=true).
+
+Exact COUNT(DISTINCT ...) and per-service rankings scan every payment and
+appointment service of the window. Approximate analytics instead merge a few
+stored rows per day of the window:
+
+- analytics_daily_rollup: exact additive totals (revenue, paid payments,
+  appointment services, appointments), summed over the window
+- analytics_daily_sketch: mergeable sketches (see sketches/), by name:
+
+    customers               HyperLogLog of patients with a paid payment
+    appointments            HyperLogLog of appointments with a service starting
+    appointments:<status>   the same, per appointment status
+    service_bookings        Count-Min/top-K of appointment services per service
+    service_revenue         Count-Min/top-K of paid amounts per service
+    provider_appointments   Count-Min/top-K of appointments per provider
+    provider_revenue        Count-Min/top-K of paid amounts per provider
+    payment_amount          KLL quantiles of paid amounts (cents)
+    appointment_duration    KLL quantiles of appointment service durations
+                            (minutes, end - start)
+    visit_interval          KLL quantiles of the days since the patient's
+                            previous visit, on the day of the later visit
+
+- analytics_daily_service_pair: exact appointments per pair of services booked
+  together (and per service), summed over the window by service affinity
+
+Payments count on their payment date and appointment services on their start
+date, like the windows of the exact analytics; an appointment counts on the
+day its services start. A visit is an appointment
+that was not cancelled, at the start of its first service.
+
+scripts/build_rollups.py builds and stores the rollups (once over the whole
+history, then e.g. nightly for the last few days). Days of a window with no
+stored rollup yet are sketched from the raw rows on the fly, see
+load_daily_rollups().
+
+A stored day is a snapshot: nothing invalidates it when its payments or
+appointment services change later, including through the change feed. The
+nightly rebuild of the last few days picks up late edits; edits to older
+days (backfills, bulk corrections) show up only after rebuilding those days
+with --start/--end. scripts/generate_data.py rebuilds every day after a load.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from itertools import combinations_with_replacement
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from db.models import (
+    AnalyticsDailyRollup,
+    AnalyticsDailyServicePair,
+    AnalyticsDailySketch,
+    Appointment,
+    AppointmentService,
+    AppointmentStatusEnum,
+    Payment,
+    PaymentStatusEnum,
+)
+from sketches import CountMinSketch, HyperLogLog, KLLSketch
+
+# Rows fetched per round trip while sketching raw rows
+_BATCH_SIZE = 10000
+
+
+@dataclass
+class DailyRollup:
+    """Totals and serialized sketches (by name) of one day."""
+
+    day: date
+    revenue: int = 0
+    paid_payments: int = 0
+    appointment_services: int = 0
+    appointments: int | None = 0
+    sketches: dict[str, bytes] = field(default_factory=dict)
+    # Appointments per (service id, companion id), see count_service_pairs()
+    service_pairs: Counter = field(default_factory=Counter)
+
+
+def days_between(start: date, end: date) -> list[date]:
+    """Every day from start to end, inclusive."""
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def compute_daily_rollups(db: Session, start: date, end: date) -> dict[date, DailyRollup]:
+    """
+    Rollups of every day from start to end (inclusive) from the raw rows,
+    including empty days.
+    """
+    window_start = datetime.combine(start, time.min)
+    window_end = datetime.combine(end + timedelta(days=1), time.min)
+    totals = {day: DailyRollup(day) for day in days_between(start, end)}
+    sketches: dict[date, dict] = {day: {} for day in totals}
+    services_by_appointment: dict[date, dict] = {day: defaultdict(list) for day in totals}
+
+    payments = (
+        db.query(
+            Payment.date,
+            Payment.patient_id,
+            Payment.service_id,
+            Payment.provider_id,
+            Payment.amount,
+        )
+        .filter(
+            Payment.status == PaymentStatusEnum.PAID,
+            Payment.date >= window_start,
+            Payment.date < window_end,
+        )
+        .yield_per(_BATCH_SIZE)
+    )
+    for paid_at, patient_id, service_id, provider_id, amount in payments:
+        day = paid_at.date()
+        rollup = totals[day]
+        rollup.revenue += amount
+        rollup.paid_payments += 1
+        day_sketches = sketches[day]
+        day_sketches.setdefault("customers", HyperLogLog()).add(patient_id)
+        day_sketches.setdefault("service_revenue", CountMinSketch()).add(
+            service_id, amount
+        )
+        day_sketches.setdefault("provider_revenue", CountMinSketch()).add(
+            provider_id, amount
+        )
+        day_sketches.setdefault("payment_amount", KLLSketch()).add(amount)
+
+    appointment_services = (
+        db.query(
+            AppointmentService.start,
+            AppointmentService.end,
+            AppointmentService.appointment_id,
+            AppointmentService.service_id,
+            AppointmentService.provider_id,
+            Appointment.status,
+        )
+        .join(Appointment, Appointment.id == AppointmentService.appointment_id)
+        .filter(
+            AppointmentService.start >= window_start,
+            AppointmentService.start < window_end,
+        )
+        .yield_per(_BATCH_SIZE)
+    )
+    # Each day's (provider, appointment) pairs, so an appointment with several
+    # services by one provider counts once for the provider
+    provider_appointments: dict[date, set] = {day: set() for day in totals}
+    for (
+        starts_at,
+        ends_at,
+        appointment_id,
+        service_id,
+        provider_id,
+        status,
+    ) in appointment_services:
+        day = starts_at.date()
+        totals[day].appointment_services += 1
+        services_by_appointment[day][appointment_id].append(service_id)
+        provider_appointments[day].add((provider_id, appointment_id))
+        day_sketches = sketches[day]
+        day_sketches.setdefault("appointments", HyperLogLog()).add(appointment_id)
+        day_sketches.setdefault(f"appointments:{status.value}", HyperLogLog()).add(
+            appointment_id
+        )
+        day_sketches.setdefault("service_bookings", CountMinSketch()).add(service_id)
+        day_sketches.setdefault("appointment_duration", KLLSketch()).add(
+            (ends_at - starts_at).total_seconds() / 60
+        )
+
+    for day, pairs in provider_appointments.items():
+        for provider_id, _ in pairs:
+            sketches[day].setdefault("provider_appointments", CountMinSketch()).add(
+                provider_id
+            )
+
+    for visited_at, interval in visit_intervals(db, window_start, window_end):
+        sketches[visited_at.date()].setdefault("visit_interval", KLLSketch()).add(
+            interval
+        )
+
+    for day, rollup in totals.items():
+        rollup.sketches = {
+            name: sketch.to_bytes() for name, sketch in sketches[day].items()
+        }
+        appointments = services_by_appointment[day].values()
+        rollup.appointments = len(appointments)
+        rollup.service_pairs = count_service_pairs(appointments)
+    return totals
+
+
+def count_service_pairs(appointments) -> Counter:
+    """
+    Appointments per (service id, companion id) pair of services booked
+    together, smaller id first, given each appointment's service ids. The
+    pair of a service with itself counts the appointments with the service.
+
+    This is the product A^T A of the sparse appointment x service incidence
+    matrix A: work grows with each appointment's services, not with a
+    self-join of appointment_service.
+    """
+    pairs = Counter()
+    for service_ids in appointments:
+        pairs.update(combinations_with_replacement(sorted(service_ids), 2))
+    return pairs
+
+
+def visit_intervals(db: Session, window_start: datetime, window_end: datetime):
+    """
+    (visit time, days since the patient's previous visit) of the visits in
+    the window that have a previous visit, possibly before the window.
+    """
+    visits = (
+        select(
+            Appointment.patient_id,
+            func.min(AppointmentService.start).label("start"),
+        )
+        .join(AppointmentService, AppointmentService.appointment_id == Appointment.id)
+        .where(Appointment.status != AppointmentStatusEnum.CANCELLED)
+        .group_by(Appointment.id)
+    )
+    # Only the histories of patients visiting in the window
+    window_patients = (
+        select(Appointment.patient_id)
+        .join(AppointmentService, AppointmentService.appointment_id == Appointment.id)
+        .where(
+            AppointmentService.start >= window_start,
+            AppointmentService.start < window_end,
+        )
+    )
+    visits = visits.where(Appointment.patient_id.in_(window_patients)).subquery()
+    intervals = select(
+        visits.c.start,
+        (
+            visits.c.start
+            - func.lag(visits.c.start).over(
+                partition_by=visits.c.patient_id, order_by=visits.c.start
+            )
+        ).label("interval"),
+    ).subquery()
+    return db.execute(
+        select(intervals.c.start, extract("epoch", intervals.c.interval) / 86400).where(
+            intervals.c.start >= window_start,
+            intervals.c.start < window_end,
+            intervals.c.interval.is_not(None),
+        )
+    ).all()
+
+
+def store_daily_rollups(db: Session, rollups: dict[date, DailyRollup]):
+    """
+    Replace the stored rollups of the given days. Leaves committing to the caller.
+
+    The stored days stay as computed here until they are rebuilt: later
+    changes to their raw rows do not reach them (see the module docstring).
+    """
+    days = list(rollups)
+    db.query(AnalyticsDailyServicePair).filter(
+        AnalyticsDailyServicePair.day.in_(days)
+    ).delete(synchronize_session=False)
+    db.query(AnalyticsDailySketch).filter(AnalyticsDailySketch.day.in_(days)).delete(
+        synchronize_session=False
+    )
+    db.query(AnalyticsDailyRollup).filter(AnalyticsDailyRollup.day.in_(days)).delete(
+        synchronize_session=False
+    )
+    built_at = datetime.now()
+    db.add_all(
+        AnalyticsDailyRollup(
+            day=rollup.day,
+            revenue=rollup.revenue,
+            paid_payments=rollup.paid_payments,
+            appointment_services=rollup.appointment_services,
+            appointments=rollup.appointments,
+            built_at=built_at,
+        )
+        for rollup in rollups.values()
+    )
+    db.add_all(
+        AnalyticsDailySketch(day=rollup.day, name=name, sketch=sketch)
+        for rollup in rollups.values()
+        for name, sketch in rollup.sketches.items()
+    )
+    db.add_all(
+        AnalyticsDailyServicePair(
+            day=rollup.day,
+            service_id=service_id,
+            companion_id=companion_id,
+            appointments=appointments,
+        )
+        for rollup in rollups.values()
+        for (service_id, companion_id), appointments in rollup.service_pairs.items()
+    )
+    db.flush()
+
+
+def stored_rollup_range(db: Session) -> tuple[date, date] | None:
+    """First and last day with a stored rollup, or None if none is stored."""
+    first, last = db.query(
+        func.min(AnalyticsDailyRollup.day), func.max(AnalyticsDailyRollup.day)
+    ).one()
+    return (first, last) if first is not None else None
+
+
+def load_daily_rollups(
+    db: Session, start: date, end: date
+) -> tuple[list[DailyRollup], int]:
+    """
+    Rollups of every day from start to end (inclusive): the stored ones, and
+    the days without one computed from the raw rows.
+
+    Returns:
+        Tuple of (rollups in day order, number of days computed on the fly)
+    """
+    rollups = {
+        row.day: DailyRollup(*row)
+        for row in db.query(
+            AnalyticsDailyRollup.day,
+            AnalyticsDailyRollup.revenue,
+            AnalyticsDailyRollup.paid_payments,
+            AnalyticsDailyRollup.appointment_services,
+            AnalyticsDailyRollup.appointments,
+        ).filter(AnalyticsDailyRollup.day >= start, AnalyticsDailyRollup.day <= end)
+    }
+    for day, name, sketch in db.query(
+        AnalyticsDailySketch.day, AnalyticsDailySketch.name, AnalyticsDailySketch.sketch
+    ).filter(AnalyticsDailySketch.day >= start, AnalyticsDailySketch.day <= end):
+        rollups[day].sketches[name] = sketch
+
+    # Usually the days since the last build. Each run of consecutive missing
+    # days is sketched on its own, never the stored days between runs.
+    missing = [day for day in days_between(start, end) if day not in rollups]
+    for run_start, run_end in day_runs(missing):
+        rollups.update(compute_daily_rollups(db, run_start, run_end))
+    return [rollups[day] for day in sorted(rollups)], len(missing)
+
+
+def load_service_pairs(
+    db: Session, start: date, end: date
+) -> tuple[int, Counter, int]:
+    """
+    Appointments with a service starting from start to end (inclusive), and
+    appointments per pair of services (see count_service_pairs()), summed in
+    SQL from the stored days. Days without stored pair counts are counted
+    from the raw rows.
+
+    Returns:
+        Tuple of (appointments, appointments per pair, number of days counted
+        on the fly)
+    """
+    stored_days = {
+        day
+        for (day,) in db.query(AnalyticsDailyRollup.day).filter(
+            AnalyticsDailyRollup.day >= start,
+            AnalyticsDailyRollup.day <= end,
+            AnalyticsDailyRollup.appointments.is_not(None),
+        )
+    }
+    appointments = (
+        db.query(func.coalesce(func.sum(AnalyticsDailyRollup.appointments), 0))
+        .filter(AnalyticsDailyRollup.day >= start, AnalyticsDailyRollup.day <= end)
+        .scalar()
+    )
+    pairs = Counter(
+        {
+            (service_id, companion_id): count
+            for service_id, companion_id, count in db.query(
+                AnalyticsDailyServicePair.service_id,
+                AnalyticsDailyServicePair.companion_id,
+                func.sum(AnalyticsDailyServicePair.appointments),
+            )
+            .filter(
+                AnalyticsDailyServicePair.day >= start,
+                AnalyticsDailyServicePair.day <= end,
+            )
+            .group_by(
+                AnalyticsDailyServicePair.service_id,
+                AnalyticsDailyServicePair.companion_id,
+            )
+        }
+    )
+
+    missing = [day for day in days_between(start, end) if day not in stored_days]
+    for run_start, run_end in day_runs(missing):
+        services_by_appointment = defaultdict(list)
+        for starts_at, appointment_id, service_id in (
+            db.query(
+                AppointmentService.start,
+                AppointmentService.appointment_id,
+                AppointmentService.service_id,
+            )
+            .filter(
+                AppointmentService.start >= datetime.combine(run_start, time.min),
+                AppointmentService.start
+                < datetime.combine(run_end + timedelta(days=1), time.min),
+            )
+            .yield_per(_BATCH_SIZE)
+        ):
+            services_by_appointment[starts_at.date(), appointment_id].append(service_id)
+        appointments += len(services_by_appointment)
+        pairs.update(count_service_pairs(services_by_appointment.values()))
+    return int(appointments), pairs, len(missing)
+
+
+def day_runs(days: list[date]) -> list[tuple[date, date]]:
+    """First and last day of each run of consecutive days in a sorted list."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def merge_hll(blobs: list[bytes]) -> HyperLogLog:
+    """Merge serialized HyperLogLog sketches (an empty sketch if none)."""
+    merged = HyperLogLog.from_bytes(blobs[0]) if blobs else HyperLogLog()
+    for blob in blobs[1:]:
+        merged.merge_bytes(blob)
+    return merged
+
+
+def merge_kll(blobs: list[bytes]) -> KLLSketch:
+    """Merge serialized KLL sketches (an empty sketch if none)."""
+    merged = KLLSketch.from_bytes(blobs[0]) if blobs else KLLSketch()
+    for blob in blobs[1:]:
+        merged.merge_bytes(blob)
+    return merged
+
+
+def merge_count_min(blobs: list[bytes]) -> CountMinSketch:
+    """Merge serialized Count-Min sketches (an empty sketch if none)."""
+    merged = CountMinSketch.from_bytes(blobs[0]) if blobs else CountMinSketch()
+    for blob in blobs[1:]:
+        merged.merge_bytes(blob)
+    return merged
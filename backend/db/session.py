@@ -2,21 +2,94 @@
 Database session management for FastAPI dependency injection.
 """
 
+import os
 from collections.abc import Generator
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session, sessionmaker
+from db.cancellation import instrument_cancellation
 from db.engine import create_sqlalchemy_engine
+from db.instrumentation import SESSION_SETUP_OPTION, instrument_engine
 
-# Create engine and session factory
-engine = create_sqlalchemy_engine()
+# Create engine (with per-request SQL timing and cancellation hooks) and session factory
+engine = instrument_cancellation(instrument_engine(create_sqlalchemy_engine()))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Longest a single statement may run (ms, 0 = no limit); analytics aggregates
+# scan much more data than list and detail reads
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+ROUTE_STATEMENT_TIMEOUTS_MS = {
+    "/api/analytics/": int(os.getenv("DB_ANALYTICS_STATEMENT_TIMEOUT_MS", "30000")),
+}
+
+
+class SharedConnection:
+    """A connection opened on first use, for requests running one after the other."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connection: Connection | None = None
+
+    def connect(self) -> Connection:
+        if self.connection is None:
+            self.connection = self.engine.connect()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# Connection shared by the sub-requests of a batch (see routers/batch.py):
+# sessions are bound to it instead of opening a connection each
+shared_connection: ContextVar[SharedConnection | None] = ContextVar(
+    "shared_connection", default=None
+)
+
+
+def statement_timeout_for(route_path: str) -> int:
+    """Statement timeout (ms) for a route template."""
+    for prefix, timeout in ROUTE_STATEMENT_TIMEOUTS_MS.items():
+        if route_path.startswith(prefix):
+            return timeout
+    return STATEMENT_TIMEOUT_MS
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    # SET LOCAL lasts for the transaction only, so pooled connections are not
+    # left with another route's timeout
+    timeout = session.info.get("statement_timeout_ms")
+    if timeout:
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {int(timeout)}",
+            execution_options={SESSION_SETUP_OPTION: True},
+        )
+
+
+def open_session(route_path: str) -> Session:
+    """
+    New session whose statements run with the route's statement timeout.
+    The caller closes it.
+    """
+    shared = shared_connection.get()
+    db = SessionLocal() if shared is None else SessionLocal(bind=shared.connect())
+    db.info["statement_timeout_ms"] = statement_timeout_for(route_path)
+    return db
+
 
-def get_db() -> Generator[Session, None, None]:
+def get_db(request: Request) -> Generator[Session, None, None]:
     """
     Dependency that provides a database session.
     Yields a session and ensures it's closed after use.
+    Statements run with the statement timeout of the request's route.
     """
-    db = SessionLocal()
+    route = request.scope.get("route")
+    db = open_session(getattr(route, "path", ""))
     try:
         yield db
     finally:
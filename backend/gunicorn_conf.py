@@ -0,0 +1,89 @@
+"""
+Gunicorn configuration for the production server (python run_server.py --production).
+
+Gunicorn supervises several uvicorn worker processes serving main:app:
+
+- one worker per available CPU core by default (WEB_CONCURRENCY overrides)
+- uvloop event loop and httptools HTTP parser in every worker
+- workers are recycled after MAX_REQUESTS requests (plus random jitter, so
+  they do not all restart at once): a worker stops accepting connections,
+  finishes its in-flight requests and is replaced, which bounds memory growth
+- the app is imported once in the master before forking (preload), so heavy
+  imports are paid once and their memory is shared copy-on-write
+
+Can also be used directly: gunicorn -c gunicorn_conf.py main:app
+"""
+
+import glob
+import os
+import tempfile
+
+from uvicorn_worker import UvicornWorker
+
+
+def available_cpus() -> int:
+    """CPU cores this process may run on (respects container CPU sets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        return os.cpu_count() or 1
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """Uvicorn worker forcing the uvloop event loop and httptools parser."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{env_int('PORT', 8000)}"
+worker_class = "gunicorn_conf.ProductionUvicornWorker"
+workers = env_int("WEB_CONCURRENCY", available_cpus())
+
+# Connections waiting to be accepted; beyond this, clients get refused
+backlog = env_int("BACKLOG", 2048)
+# Idle keep-alive connections are closed after this many seconds. Keep it
+# above the idle timeout of any load balancer in front (60s on most), so the
+# server never closes a connection the balancer is about to reuse
+keepalive = env_int("KEEPALIVE", 75)
+
+# Recycle each worker after about MAX_REQUESTS requests (0 disables)
+max_requests = env_int("MAX_REQUESTS", 10000)
+max_requests_jitter = env_int("MAX_REQUESTS_JITTER", max_requests // 10)
+
+# Workers silent for this long are killed and replaced
+timeout = env_int("WORKER_TIMEOUT", 60)
+# Time a worker gets to finish in-flight requests on restart or shutdown
+graceful_timeout = env_int("GRACEFUL_TIMEOUT", 30)
+
+preload_app = os.getenv("PRELOAD", "1").lower() in ("1", "true", "yes")
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Metrics of every worker are aggregated through per-process files. This
+# must be set before prometheus_client is imported, i.e. before the app is
+# preloaded, and the directory must start empty
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(path)
+
+
+def post_fork(server, worker):
+    # Connections opened by the master must not be shared with the workers
+    from db.session import engine
+
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (e.g. requests in flight)
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -2,18 +2,79 @@
 FastAPI application entry point.
 """
 
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import patients_router, providers_router, analytics_router
+from changefeed import start_change_listener
+from db.session import engine
+from metrics import render_metrics
+from middleware import (
+    AdmissionControlMiddleware,
+    CompressionMiddleware,
+    PrometheusMiddleware,
+    QueryCancellationMiddleware,
+    RequestTimingMiddleware,
+    ResponseCacheMiddleware,
+    SingleFlightMiddleware,
+    TimedJSONResponse,
+)
+from routers import (
+    patients_router,
+    providers_router,
+    analytics_router,
+    appointments_router,
+    payments_router,
+    live_router,
+    batch_router,
+)
+from warmup import start_warmup, stop_warmup, warmup_state
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the change listener (when CHANGE_FEED is enabled) for the app's
+    lifetime, and warm up connections and caches in the background.
+    """
+    listener = start_change_listener(engine)
+    warmup_task = start_warmup(app, engine)
+    yield
+    if warmup_task is not None:
+        await stop_warmup(warmup_task)
+    if listener is not None:
+        listener.stop(timeout=5)
 
 # Create FastAPI app
 app = FastAPI(
     title="Decoda Health API",
     description="Backend API for Decoda Health patient management system",
     version="1.0.0",
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan,
 )
 
+# Middleware added later wraps middleware added earlier (last added runs first)
+
+# Per-route-group concurrency limits and load shedding (innermost, so cache
+# hits and coalesced requests never wait for a slot)
+app.add_middleware(AdmissionControlMiddleware)
+
+# Cached, precompressed responses for analytics and detail routes (inside
+# CORS, so CORS headers are still computed per request)
+app.add_middleware(ResponseCacheMiddleware)
+# Cancel the queries of requests whose client disconnected (inside
+# single-flight, so an aborted leader releases its followers to compute
+# instead of failing them)
+app.add_middleware(QueryCancellationMiddleware, engine=engine)
+# Concurrent identical requests share one computation (also on cache misses)
+app.add_middleware(SingleFlightMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,10 +92,21 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Brotli/gzip compression (skips bodies the cache already compressed)
+app.add_middleware(CompressionMiddleware)
+# Per-request SQL timing (Server-Timing header + structured log line)
+app.add_middleware(RequestTimingMiddleware)
+# Prometheus request counts, latency histograms and in-flight requests
+app.add_middleware(PrometheusMiddleware)
+
 # Include routers
 app.include_router(patients_router)
 app.include_router(providers_router)
 app.include_router(analytics_router)
+app.include_router(appointments_router)
+app.include_router(payments_router)
+app.include_router(live_router)
+app.include_router(batch_router)
 
 
 @app.get("/")
@@ -47,3 +119,19 @@ def root():
 def health_check():
     """Health check endpoint for monitoring."""
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+def readiness_check(response: Response):
+    """Readiness check for load balancers: 503 until the startup warm-up completes."""
+    if not warmup_state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "warming_up"}
+    return {"status": "ready", "warmupMs": warmup_state.duration_ms}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
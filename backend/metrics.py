@@ -0,0 +1,139 @@
+"""
+Prometheus metrics for the API.
+
+All metrics are defined here so every module records into the same registry.
+When PROMETHEUS_MULTIPROC_DIR is set (required when running several uvicorn
+workers), prometheus_client stores values in per-process memory-mapped files
+and /metrics aggregates them across workers at scrape time, so recording a
+value never needs cross-process coordination.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# Latency buckets (seconds) tuned for API requests and SQL statements
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, by route template",
+    ["method", "route"],
+    buckets=REQUEST_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    buckets=QUERY_BUCKETS,
+)
+DB_CONNECT_DURATION = Histogram(
+    "db_connect_duration_seconds",
+    "Time to open a new database connection",
+    buckets=REQUEST_BUCKETS,
+)
+DB_CONNECTIONS_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened_total",
+    "Database connections opened by the pool",
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups, by cache name and result (hit or miss)",
+    ["cache", "result"],
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for admission, by route group",
+    ["group"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests shed with 503, by route group and reason (queue_full or timeout)",
+    ["group", "reason"],
+)
+
+CANCELLED_REQUESTS = Counter(
+    "cancelled_requests_total",
+    "Requests whose database statements were cancelled after the client disconnected, by route",
+    ["route"],
+)
+
+COALESCED_REQUESTS = Counter(
+    "coalesced_requests_total",
+    "Requests served with the response of an identical in-flight request, by route",
+    ["route"],
+)
+
+LIVE_SUBSCRIBERS = Gauge(
+    "live_analytics_subscribers",
+    "Dashboards subscribed to live analytics updates",
+    multiprocess_mode="livesum",
+)
+LIVE_UPDATES = Counter(
+    "live_analytics_updates_total",
+    "Live analytics section updates pushed to subscribers, by section",
+    ["section"],
+)
+
+CHANGE_NOTIFICATIONS = Counter(
+    "change_notifications_total",
+    "Table change notifications received from the database, by table",
+    ["table"],
+)
+CHANGE_FEED_FLUSHES = Counter(
+    "change_feed_flushes_total",
+    "Debounced invalidation batches delivered to caches",
+)
+CHANGE_FEED_RECONNECTS = Counter(
+    "change_feed_reconnects_total",
+    "Times the change listener lost its database connection",
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup; hit ratio = hits / (hits + misses) per cache."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Returns:
+        Tuple of (body, content type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate the per-worker files written by every process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
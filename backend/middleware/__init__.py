@@ -0,0 +1,21 @@
+"""ASGI middleware for the API."""
+
+from middleware.admission import AdmissionControlMiddleware
+from middleware.cancellation import QueryCancellationMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import PrometheusMiddleware
+from middleware.response_cache import ResponseCacheMiddleware, add_cache_tags
+from middleware.single_flight import SingleFlightMiddleware
+from middleware.timing import RequestTimingMiddleware, TimedJSONResponse
+
+__all__ = [
+    "AdmissionControlMiddleware",
+    "CompressionMiddleware",
+    "PrometheusMiddleware",
+    "QueryCancellationMiddleware",
+    "RequestTimingMiddleware",
+    "ResponseCacheMiddleware",
+    "SingleFlightMiddleware",
+    "TimedJSONResponse",
+    "add_cache_tags",
+]
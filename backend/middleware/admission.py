@@ -0,0 +1,252 @@
+"""
+Admission control middleware.
+
+Requests to the API are split into route groups (detail reads, lists,
+analytics), each with its own concurrency limit, bounded wait queue and
+queue timeout, so a burst of heavy analytics requests cannot take every
+database connection and threadpool slot away from cheap patient lookups.
+
+Admitted requests then take a slot of a shared limit (MAX_CONCURRENCY,
+sized to the threadpool). When that limit is reached, waiting requests are
+admitted by priority: interactive detail reads first, then lists, then
+analytics.
+
+Requests are shed with 503 and a Retry-After header when their group's
+queue is full, or when they waited longer than the group's timeout.
+
+Every setting can be overridden with environment variables, e.g.
+ADMISSION_ANALYTICS_CONCURRENCY, ADMISSION_ANALYTICS_QUEUE and
+ADMISSION_ANALYTICS_TIMEOUT_MS for the "analytics" group.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+from dataclasses import dataclass, field
+
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+
+# Requests running at once across all groups (anyio's default threadpool size:
+# sync endpoints cannot run more than this many at a time anyway)
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "40"))
+
+
+class AdmissionRejected(Exception):
+    """A request could not be admitted ("queue_full" or "timeout")."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionQueue:
+    """
+    Concurrency limit with a bounded priority wait queue.
+
+    Waiters are admitted lowest priority value first, FIFO within a
+    priority. Must only be used from the event loop thread.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int | None = None):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def depth(self) -> int:
+        """Requests waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self, priority: int = 0, timeout: float | None = None):
+        """
+        Wait for a slot.
+
+        Raises:
+            AdmissionRejected: The queue is full, or no slot freed up in time
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, waiter)
+        self._record_depth()
+        try:
+            async with asyncio.timeout(timeout):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait ended: pass it on
+                self.release()
+            else:
+                future.cancel()
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+                self._record_depth()
+            if isinstance(exc, TimeoutError):
+                raise AdmissionRejected("timeout") from None
+            raise
+
+    def release(self):
+        """Free a slot, handing it to the next waiter if there is one."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The slot changes hands: `active` stays the same
+                future.set_result(None)
+                self._record_depth()
+                return
+        self.active -= 1
+        self._record_depth()
+
+    def _record_depth(self):
+        ADMISSION_QUEUE_DEPTH.labels(group=self.name).set(len(self._waiters))
+
+
+@dataclass
+class RouteGroup:
+    """Routes sharing a concurrency limit, wait queue and queue timeout."""
+
+    name: str
+    routes: list[str]
+    # Lower is admitted first when the shared limit is reached
+    priority: int
+    concurrency: int
+    max_queue: int
+    timeout: float
+    queue: AdmissionQueue = field(init=False)
+
+    def __post_init__(self):
+        prefix = f"ADMISSION_{self.name.upper()}"
+        self.concurrency = int(os.getenv(f"{prefix}_CONCURRENCY", self.concurrency))
+        self.max_queue = int(os.getenv(f"{prefix}_QUEUE", self.max_queue))
+        timeout_ms = os.getenv(f"{prefix}_TIMEOUT_MS")
+        if timeout_ms:
+            self.timeout = float(timeout_ms) / 1000
+        self.queue = AdmissionQueue(self.name, self.concurrency, self.max_queue)
+        self.patterns = [compile_path(path)[0] for path in self.routes]
+
+    def matches(self, path: str) -> bool:
+        return any(pattern.match(path) for pattern in self.patterns)
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds clients are told to wait before retrying a shed request."""
+        return max(1, math.ceil(self.timeout))
+
+
+def default_route_groups() -> list[RouteGroup]:
+    """Route groups of the API, most interactive first."""
+    return [
+        RouteGroup(
+            name="detail",
+            routes=["/api/patients/{patient_id}"],
+            priority=0,
+            concurrency=16,
+            max_queue=64,
+            timeout=1.0,
+        ),
+        RouteGroup(
+            name="list",
+            routes=[
+                "/api/patients",
+                "/api/providers",
+                "/api/appointments",
+                "/api/payments",
+            ],
+            priority=1,
+            concurrency=12,
+            max_queue=48,
+            timeout=2.0,
+        ),
+        RouteGroup(
+            name="analytics",
+            routes=["/api/analytics/{section:path}"],
+            priority=2,
+            concurrency=4,
+            max_queue=16,
+            timeout=5.0,
+        ),
+    ]
+
+
+def admission_control_enabled() -> bool:
+    """Whether admission control is enabled (ADMISSION_CONTROL, on by default)."""
+    return os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware limiting concurrency per route group and shedding load."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        groups: list[RouteGroup] | None = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        enabled: bool | None = None,
+    ):
+        self.app = app
+        self.groups = default_route_groups() if groups is None else groups
+        self.shared = AdmissionQueue("shared", max_concurrency)
+        self.enabled = admission_control_enabled() if enabled is None else enabled
+
+    def group_for(self, path: str) -> RouteGroup | None:
+        for group in self.groups:
+            if group.matches(path):
+                return group
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        group = None
+        if self.enabled and scope["type"] == "http":
+            group = self.group_for(scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + group.timeout
+        try:
+            await group.queue.acquire(timeout=group.timeout)
+        except AdmissionRejected as exc:
+            await self.reject(group, exc.reason, scope, receive, send)
+            return
+
+        try:
+            try:
+                await self.shared.acquire(
+                    group.priority, timeout=max(deadline - loop.time(), 0)
+                )
+            except AdmissionRejected as exc:
+                await self.reject(group, exc.reason, scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.shared.release()
+        finally:
+            group.queue.release()
+
+    async def reject(
+        self, group: RouteGroup, reason: str, scope: Scope, receive: Receive, send: Send
+    ):
+        """Shed the request with 503 and a Retry-After hint."""
+        ADMISSION_REJECTIONS.labels(group=group.name, reason=reason).inc()
+        response = JSONResponse(
+            {"detail": "Server is busy, please retry shortly"},
+            status_code=503,
+            headers={"Retry-After": str(group.retry_after)},
+        )
+        await response(scope, receive, send)
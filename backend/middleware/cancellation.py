@@ -0,0 +1,88 @@
+"""
+Query cancellation on client disconnect.
+
+The frontend aborts superseded requests (e.g. every keystroke of a patient
+search aborts the previous search), but a sync endpoint keeps running its
+queries in the threadpool until they finish. This middleware watches the
+connection while the request is handled and, when the client disconnects,
+cancels the request's running statements (see db/cancellation.py). The
+endpoint then fails fast; its error is logged at INFO and dropped, since
+there is nobody left to send a response to.
+
+The middleware is the only reader of the ASGI receive channel: it forwards
+request body messages to the app through a queue, so watching for the
+disconnect never steals a body chunk from the endpoint.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db.cancellation import QueryScope, cancel_queries, current_query_scope
+from metrics import CANCELLED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCancellationMiddleware:
+    """Pure ASGI middleware cancelling a request's queries when its client disconnects."""
+
+    def __init__(self, app: ASGIApp, engine: Engine):
+        self.app = app
+        # Used for pg_cancel_backend() when a cancel request fails
+        self.engine = engine
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_scope = QueryScope()
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_complete = False
+
+        async def watch():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    break
+            disconnected.set()
+            if response_complete:
+                return
+            cancelled = await asyncio.to_thread(cancel_queries, query_scope, self.engine)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            CANCELLED_REQUESTS.labels(route=route).inc()
+            logger.info(
+                "Client disconnected from %s, cancelled %d running statements",
+                scope["path"],
+                cancelled,
+            )
+
+        async def receive_forwarded() -> Message:
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def send_tracked(message: Message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch())
+        token = current_query_scope.set(query_scope)
+        try:
+            await self.app(scope, receive_forwarded, send_tracked)
+        except Exception as exc:
+            if not query_scope.cancelled:
+                raise
+            logger.info("Dropped error of cancelled request to %s: %r", scope["path"], exc)
+        finally:
+            current_query_scope.reset(token)
+            watcher.cancel()
@@ -0,0 +1,211 @@
+"""
+Response compression middleware.
+
+Negotiates brotli or gzip from the request's Accept-Encoding header and
+compresses text-like responses (JSON, NDJSON, text) of at least
+COMPRESSION_MIN_BYTES. Streaming responses are compressed chunk by chunk and
+flushed after every chunk, so streamed rows still reach the client as they
+are produced.
+
+Responses that already carry a Content-Encoding (e.g. precompressed bodies
+served by the response cache) pass through untouched.
+
+Brotli is used when the brotli package is installed and the client accepts
+it; otherwise gzip.
+"""
+
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Smaller bodies are sent as-is: compression would save next to nothing
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Levels for responses compressed on every request (favor speed)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this server can produce, in order of preference."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the preferred supported encoding the client accepts.
+
+    Args:
+        accept_encoding: Accept-Encoding header value, e.g. "gzip, br;q=0.9"
+
+    Returns:
+        "br", "gzip" or None (send uncompressed)
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """
+    Compress a whole body.
+
+    Args:
+        body: Uncompressed body
+        encoding: "br" or "gzip"
+        best: Use the highest compression levels (for bodies that are stored
+            and served many times)
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else BROTLI_QUALITY)
+    compressor = zlib.compressobj(9 if best else GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def is_compressible(headers: Headers) -> bool:
+    """Whether a response's content type is worth compressing."""
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def add_vary_accept_encoding(headers: MutableHeaders):
+    """Tell caches that the body depends on Accept-Encoding."""
+    vary = headers.get("vary")
+    if vary is None:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+class StreamCompressor:
+    """Incremental compressor flushing after every chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away."""
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """End the compressed stream."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with brotli or gzip."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: StreamCompressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if passthrough or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows the size
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                chunk = compressor.compress(body)
+                if not more_body:
+                    chunk += compressor.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                "content-encoding" in headers
+                or not is_compressible(headers)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["content-encoding"] = encoding
+            add_vary_accept_encoding(headers)
+            if more_body:
+                # Streaming: the compressed length is unknown up front
+                del headers["content-length"]
+                compressor = StreamCompressor(encoding)
+                await send(start_message)
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": compressor.compress(body),
+                        "more_body": True,
+                    }
+                )
+                return
+
+            compressed = compress(body, encoding)
+            headers["content-length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,50 @@
+"""
+Prometheus request metrics middleware.
+
+Counts requests and observes latency per route template (e.g.
+/api/patients/{patient_id}, not the raw path, to keep label cardinality
+bounded) and tracks the number of requests in flight.
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, HTTP_REQUESTS_IN_FLIGHT
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording HTTP request metrics."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.labels(
+                method=method, route=route_path, status=str(status_code)
+            ).inc()
+            HTTP_REQUEST_DURATION.labels(method=method, route=route_path).observe(
+                time.perf_counter() - started
+            )
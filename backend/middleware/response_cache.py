@@ -0,0 +1,328 @@
+"""
+Response cache middleware.
+
+Caches successful GET responses of the routes in CACHED_ROUTES (analytics,
+provider list, patient detail), keyed by path and query string. Bodies are
+stored compressed: each encoding ("br", "gzip") is compressed once, at the
+highest level, the first time a client asks for it, and every later hit is
+served from memory without compressing again.
+
+Entries are invalidated through the change feed (changefeed/): every entry
+carries tags (its route path, entity tags from path parameters such as
+"patient:<id>", and any tags added by the handler with add_cache_tags()),
+and entries sharing a tag with a delivered invalidation are dropped.
+RESPONSE_CACHE_TTL bounds staleness for tables the change feed does not
+watch (provider, service).
+
+Caching is only safe when invalidations arrive, so the cache is enabled only
+when the change feed is (CHANGE_FEED=1).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from changefeed import ALL, change_feed_enabled, invalidation_bus
+from metrics import record_cache_lookup
+from middleware.compression import (
+    MINIMUM_SIZE,
+    add_vary_accept_encoding,
+    choose_encoding,
+    compress,
+    is_compressible,
+)
+
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Route templates whose GET responses are cached
+CACHED_ROUTES = [
+    "/api/providers",
+    "/api/patients/{patient_id}",
+    "/api/analytics/patients",
+    "/api/analytics/business",
+    "/api/analytics/providers",
+    "/api/analytics/patient-behavior",
+    "/api/analytics/timeseries",
+    "/api/analytics/distributions",
+    "/api/analytics/service-affinity",
+]
+
+# Headers recomputed for every response served from the cache
+_VOLATILE_HEADERS = {b"content-length", b"content-encoding", b"vary"}
+
+# Tags of the response being computed; handlers add to the set
+current_cache_tags: ContextVar[set[str] | None] = ContextVar(
+    "current_cache_tags", default=None
+)
+
+
+def add_cache_tags(tags: Iterable[str]):
+    """
+    Tag the response being computed, so it is invalidated with these tags.
+
+    Use for data the route path does not identify, e.g. the appointments
+    embedded in a patient detail response. No-op outside a cached route.
+    """
+    current = current_cache_tags.get()
+    if current is not None:
+        current.update(tags)
+
+
+@dataclass
+class CachedResponse:
+    """A stored response, with its body in every encoding requested so far."""
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    bodies: dict[str, bytes]
+    tags: frozenset[str]
+    expires_at: float
+    compressible: bool = True
+    # Matched route, restored into the scope on hits for metrics and logs
+    route: object | None = None
+
+    async def body_for(self, encoding: str | None) -> tuple[bytes, str | None]:
+        """
+        Body in the requested encoding, compressing it on first use.
+
+        Compression runs in a worker thread: at the highest levels it is too
+        slow for the event loop, and it only happens once per encoding.
+
+        Returns:
+            Tuple of (body, encoding actually used; None for identity)
+        """
+        identity = self.bodies["identity"]
+        if encoding is None or not self.compressible or len(identity) < MINIMUM_SIZE:
+            return identity, None
+        body = self.bodies.get(encoding)
+        if body is None:
+            body = await anyio.to_thread.run_sync(compress, identity, encoding, True)
+            self.bodies[encoding] = body
+        return body, encoding
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedResponse with tag-based invalidation."""
+
+    def __init__(
+        self,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Bumped on every invalidation, so a response computed while an
+        # invalidation was delivered is not stored
+        self.generation = 0
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        """Fresh entry for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: tuple, entry: CachedResponse, generation: int) -> bool:
+        """
+        Store an entry unless an invalidation happened since `generation`.
+
+        Returns:
+            Whether the entry was stored
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, tags: frozenset[str]) -> int:
+        """
+        Drop entries carrying any of the tags ("entity:*" matches every id).
+
+        Returns:
+            Number of entries dropped
+        """
+        wildcard_prefixes = tuple(tag[:-1] for tag in tags if tag.endswith(":*"))
+        with self._lock:
+            self.generation += 1
+            if ALL in tags:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.tags & tags
+                or (
+                    wildcard_prefixes
+                    and any(tag.startswith(wildcard_prefixes) for tag in entry.tags)
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        """Drop every entry."""
+        self.invalidate(frozenset({ALL}))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Process-wide cache, invalidated by the change feed
+response_cache = ResponseCache()
+invalidation_bus.subscribe(response_cache.invalidate)
+
+
+def cache_key(scope: Scope) -> tuple:
+    """Cache key: path plus query parameters in a canonical order."""
+    query = scope.get("query_string", b"").decode("latin-1")
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    return scope["path"], urlencode(params)
+
+
+def entity_tags(path_params: dict[str, str]) -> set[str]:
+    """Entity tags from path parameters, e.g. patient_id=pat_1 -> patient:pat_1."""
+    return {
+        f"{name.removesuffix('_id')}:{value}"
+        for name, value in path_params.items()
+        if name.endswith("_id")
+    }
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware serving cached, precompressed GET responses."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: ResponseCache = response_cache,
+        routes: list[str] = CACHED_ROUTES,
+        enabled: bool | None = None,
+    ):
+        self.app = app
+        self.cache = cache
+        self.routes = [(path, compile_path(path)[0]) for path in routes]
+        self.enabled = change_feed_enabled() if enabled is None else enabled
+
+    def match(self, path: str) -> tuple[str, dict[str, str]] | None:
+        """Route template and path parameters of a cached route, or None."""
+        for template, regex in self.routes:
+            match = regex.match(path)
+            if match:
+                return template, match.groupdict()
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        matched = self.match(scope["path"])
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+        template, path_params = matched
+
+        key = cache_key(scope)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+
+        entry = self.cache.get(key)
+        record_cache_lookup("response", entry is not None)
+        if entry is not None:
+            scope["route"] = entry.route
+            await self.send_entry(entry, encoding, send, "HIT")
+            return
+
+        generation = self.cache.generation
+        tags = {template} | entity_tags(path_params)
+        start_message: Message | None = None
+        chunks: list[bytes] = []
+        streaming = False
+
+        async def capture(message: Message):
+            nonlocal start_message, streaming
+            if streaming or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            more_body = message.get("more_body", False)
+            if start_message["status"] != 200 or (more_body and not chunks):
+                # Errors and streamed responses are not cached
+                streaming = True
+                await send(start_message)
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+
+        token = current_cache_tags.set(tags)
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            current_cache_tags.reset(token)
+
+        if streaming or start_message is None:
+            return
+
+        headers = [
+            (name, value)
+            for name, value in start_message["headers"]
+            if name.lower() not in _VOLATILE_HEADERS
+        ]
+        entry = CachedResponse(
+            status=start_message["status"],
+            headers=headers,
+            bodies={"identity": b"".join(chunks)},
+            tags=frozenset(tags),
+            expires_at=time.monotonic() + self.cache.ttl,
+            compressible=is_compressible(Headers(raw=headers)),
+            route=scope.get("route"),
+        )
+        self.cache.set(key, entry, generation)
+        await self.send_entry(entry, encoding, send, "MISS")
+
+    async def send_entry(
+        self, entry: CachedResponse, encoding: str | None, send: Send, status: str
+    ):
+        """Send a cached response in the client's preferred encoding."""
+        body, used_encoding = await entry.body_for(encoding)
+        headers = MutableHeaders(raw=list(entry.headers))
+        headers["content-length"] = str(len(body))
+        headers["x-cache"] = status
+        if used_encoding is not None:
+            headers["content-encoding"] = used_encoding
+        if entry.compressible:
+            add_vary_accept_encoding(headers)
+        await send(
+            {"type": "http.response.start", "status": entry.status, "headers": headers.raw}
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,187 @@
+"""
+Single-flight request coalescing.
+
+When several identical GET requests for the same expensive route arrive
+while the first one is still being computed (e.g. every staff member loading
+the dashboard when the clinic opens), only the first one (the leader) runs
+the endpoint. The others (followers) wait for it and are sent a copy of its
+response, so a burst of identical requests costs one set of queries.
+
+Requests are identical when they share the path, the query parameters (in
+any order) and the negotiated response encoding (the response cache below
+this middleware may return a precompressed body). Only complete responses
+are shared: if the leader streams its response, or is cancelled, followers
+run the endpoint themselves. An exception raised by the leader is raised in
+every follower.
+
+Coalescing only merges requests that overlap in time; caching across time is
+the response cache's job.
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import COALESCED_REQUESTS
+from middleware.compression import choose_encoding
+from middleware.response_cache import cache_key
+
+# Route templates whose concurrent identical GET requests are coalesced
+COALESCED_ROUTES = [
+    "/api/providers",
+    "/api/analytics/patients",
+    "/api/analytics/business",
+    "/api/analytics/providers",
+    "/api/analytics/patient-behavior",
+    "/api/analytics/timeseries",
+    "/api/analytics/distributions",
+    "/api/analytics/service-affinity",
+]
+
+
+def single_flight_enabled() -> bool:
+    """Whether request coalescing is enabled (SINGLE_FLIGHT, on by default)."""
+    return os.getenv("SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class SharedResponse:
+    """A complete response computed by a leader, replayed to its followers."""
+
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    route: object | None = None
+
+
+def _mark_retrieved(future: asyncio.Future):
+    # An exception nobody waited for must not be reported as "never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlightMiddleware:
+    """Pure ASGI middleware sharing one in-flight response between identical requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: list[str] = COALESCED_ROUTES,
+        enabled: bool | None = None,
+    ):
+        self.app = app
+        self.routes = [compile_path(path)[0] for path in routes]
+        self.enabled = single_flight_enabled() if enabled is None else enabled
+        # Key -> future resolved with the leader's SharedResponse (None when
+        # the response could not be shared)
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+
+    def matches(self, path: str) -> bool:
+        return any(regex.match(path) for regex in self.routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not self.matches(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        key = (*cache_key(scope), encoding)
+
+        leader = self._in_flight.get(key)
+        if leader is not None:
+            # shield: a follower giving up must not cancel the shared result
+            shared = await asyncio.shield(leader)
+            if shared is not None:
+                scope["route"] = shared.route
+                route_path = getattr(shared.route, "path", None) or "unmatched"
+                COALESCED_REQUESTS.labels(route=route_path).inc()
+                await self.send_shared(shared, send)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_mark_retrieved)
+        self._in_flight[key] = future
+        try:
+            shared = await self.run_leader(scope, receive, send, future)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_result(None)
+            raise
+        except BaseException as exc:
+            if not future.done():
+                future.set_exception(exc)
+            raise
+        finally:
+            del self._in_flight[key]
+
+        if not future.done():
+            future.set_result(shared)
+        if shared is not None:
+            await self.send_shared(shared, send)
+
+    async def run_leader(
+        self, scope: Scope, receive: Receive, send: Send, future: asyncio.Future
+    ) -> SharedResponse | None:
+        """
+        Run the endpoint, capturing its response.
+
+        If the endpoint streams, followers are released right away (future
+        resolved with None) to run the endpoint themselves.
+
+        Returns:
+            The captured response (not sent yet), or None when the response
+            was streamed straight to the client instead
+        """
+        start_message: Message | None = None
+        chunks: list[bytes] = []
+        streaming = False
+
+        async def capture(message: Message):
+            nonlocal start_message, streaming
+            if streaming or message["type"] not in (
+                "http.response.start",
+                "http.response.body",
+            ):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message.get("more_body", False) and not chunks:
+                # Streamed responses are not shared
+                streaming = True
+                future.set_result(None)
+                await send(start_message)
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        if streaming or start_message is None:
+            return None
+        return SharedResponse(
+            status=start_message["status"],
+            headers=list(start_message["headers"]),
+            body=b"".join(chunks),
+            route=scope.get("route"),
+        )
+
+    async def send_shared(self, shared: SharedResponse, send: Send):
+        headers = MutableHeaders(raw=list(shared.headers))
+        headers["content-length"] = str(len(shared.body))
+        await send(
+            {"type": "http.response.start", "status": shared.status, "headers": headers.raw}
+        )
+        await send({"type": "http.response.body", "body": shared.body})
@@ -0,0 +1,102 @@
+"""
+Request timing middleware.
+
+For every HTTP request this middleware installs a fresh RequestStats (see
+db/instrumentation.py), lets the SQLAlchemy hooks and the JSON response class
+fill it in, then:
+
+- adds a Server-Timing header with statement count, DB time, connection time,
+  serialization time and total time, so the numbers show up in browser devtools
+- logs one structured JSON line per request on the "request_timing" logger
+"""
+
+import json
+import logging
+import time
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db.instrumentation import RequestStats, current_request_stats
+
+logger = logging.getLogger("request_timing")
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long rendering the body took."""
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.serialize_ms += (time.perf_counter() - started) * 1000
+        return body
+
+
+def server_timing_header(stats: RequestStats) -> str:
+    """
+    Format request stats as a Server-Timing header value.
+
+    Args:
+        stats: Stats collected for the request so far
+
+    Returns:
+        Header value, e.g. 'db;dur=12.3;desc="4 statements", total;dur=20.1'
+    """
+    metrics = [
+        f'db;dur={stats.db_ms:.1f};desc="{stats.statements} statements"',
+        f'db-connect;dur={stats.connect_ms:.1f};desc="{stats.connections} connections"',
+        f"serialize;dur={stats.serialize_ms:.1f}",
+        f"total;dur={stats.elapsed_ms():.1f}",
+    ]
+    return ", ".join(metrics)
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware emitting Server-Timing headers and timing logs."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append(
+                    (b"server-timing", server_timing_header(stats).encode("latin-1"))
+                )
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            logger.info(
+                json.dumps(
+                    {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": getattr(route, "path", None),
+                        "status": status_code,
+                        "statements": stats.statements,
+                        "db_ms": round(stats.db_ms, 2),
+                        "connections": stats.connections,
+                        "connect_ms": round(stats.connect_ms, 2),
+                        "serialize_ms": round(stats.serialize_ms, 2),
+                        "total_ms": round(stats.elapsed_ms(), 2),
+                    }
+                )
+            )
@@ -3,6 +3,18 @@
 from routers.patients import router as patients_router
 from routers.providers import router as providers_router
 from routers.analytics import router as analytics_router
+from routers.appointments import router as appointments_router
+from routers.payments import router as payments_router
+from routers.live import router as live_router
+from routers.batch import router as batch_router
 
-__all__ = ["patients_router", "providers_router", "analytics_router"]
+__all__ = [
+    "patients_router",
+    "providers_router",
+    "analytics_router",
+    "appointments_router",
+    "payments_router",
+    "live_router",
+    "batch_router",
+]
 
@@ -1,11 +1,33 @@
 """Analytics API routes."""
 
-from datetime import datetime, date
-from fastapi import APIRouter, Depends
+import asyncio
+import logging
+import math
+import os
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime, date, time, timedelta
+from typing import Literal
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
 
-from db.session import get_db
+from changefeed import Memo
+from db.cancellation import current_query_scope
+from db.session import get_db, open_session, shared_connection
+from db.partitions import add_months, month_start
+from db.rollups import (
+    load_daily_rollups,
+    load_service_pairs,
+    merge_count_min,
+    merge_hll,
+    merge_kll,
+    stored_rollup_range,
+)
 from db.models import (
     Patient,
     Appointment,
@@ -13,35 +35,130 @@ from db.models import (
     Service,
     Payment,
     Provider,
+    AppointmentStatusEnum,
 )
+from sketches import CountMinSketch, HyperLogLog
+from utils import date_window, validate_window
 from schemas.analytics import (
     ServiceByRevenueResponse,
     ServiceByBookingsResponse,
     PatientAnalyticsResponse,
     BusinessAnalyticsResponse,
+    ApproximationBounds,
     TopProviderResponse,
     ProviderAnalyticsResponse,
     PatientBehaviorResponse,
+    TimeseriesPoint,
+    TimeseriesResponse,
+    AnalyticsSectionChunk,
+    DistributionSummary,
+    DistributionsResponse,
+    ServiceCompanionResponse,
+    ServiceAffinityItem,
+    ServicePairResponse,
+    ServiceAffinityResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
+# Sections of a streamed dashboard computed at once, each on its own connection
+STREAM_CONCURRENCY = int(os.getenv("ANALYTICS_STREAM_CONCURRENCY", "4"))
 
-@router.get("/patients", response_model=PatientAnalyticsResponse)
-def get_patient_analytics(db: Session = Depends(get_db)):
+
+def check_window(start_date: date | None, end_date: date | None):
+    """Reject a window whose start is after its end with a 400."""
+    try:
+        validate_window(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_top_services_by_revenue(
+    db: Session,
+    limit: int = 10,
+    start_date: date | None = None,
+    end_date: date | None = None,
+):
     """
-    Get consolidated patient analytics including demographics and sources.
+    Top services by revenue (paid payments only).
+
+    Payments are summed per service_id before joining Service, so the sum is
+    an index-only scan of idx_payment_paid_service and only the top rows are
+    joined.
     """
-    # Total patients
-    total_patients = db.query(func.count(Patient.id)).scalar()
+    revenue_subq = (
+        db.query(
+            Payment.service_id,
+            func.sum(Payment.amount).label("revenue"),
+        )
+        .filter(
+            Payment.status == "paid",
+            *date_window(Payment.date, start_date, end_date),
+        )
+        .group_by(Payment.service_id)
+        .order_by(func.sum(Payment.amount).desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    top_by_revenue_query = (
+        db.query(Service.id, Service.name, revenue_subq.c.revenue)
+        .join(revenue_subq, Service.id == revenue_subq.c.service_id)
+        .order_by(revenue_subq.c.revenue.desc())
+        .all()
+    )
+
+    return [
+        ServiceByRevenueResponse(id=service_id, name=name, revenue=revenue)
+        for service_id, name, revenue in top_by_revenue_query
+    ]
+
+
+def get_top_services_by_bookings(
+    db: Session,
+    limit: int = 10,
+    start_date: date | None = None,
+    end_date: date | None = None,
+):
+    """Top services by bookings (appointment services starting in the window)."""
+    # Service INNER JOIN AppointmentService, COUNT(*), GROUP BY service_id, ORDER DESC
+    top_by_bookings_query = (
+        db.query(
+            Service.id,
+            Service.name,
+            func.count(AppointmentService.appointment_id).label("count"),
+        )
+        .join(AppointmentService, Service.id == AppointmentService.service_id)
+        .filter(*date_window(AppointmentService.start, start_date, end_date))
+        .group_by(Service.id, Service.name)
+        .order_by(func.count(AppointmentService.appointment_id).desc())
+        .limit(limit)
+        .all()
+    )
 
-    # Gender distribution
+    return [
+        ServiceByBookingsResponse(id=service_id, name=name, count=count)
+        for service_id, name, count in top_by_bookings_query
+    ]
+
+
+def count_patients(db: Session) -> int:
+    """Total patients."""
+    return db.query(func.count(Patient.id)).scalar()
+
+
+def get_gender_distribution(db: Session) -> dict[str, int]:
+    """Patients per gender."""
     gender_counts = (
         db.query(Patient.gender, func.count(Patient.id)).group_by(Patient.gender).all()
     )
-    gender_distribution = {str(gender.value): count for gender, count in gender_counts}
+    return {str(gender.value): count for gender, count in gender_counts}
+
 
-    # Age distribution
+def get_age_distribution(db: Session) -> dict[str, int]:
+    """Patients per age range (every range present, possibly 0)."""
     today = date.today()
     age_ranges = {
         "0-17": (0, 17),
@@ -132,14 +249,19 @@ def get_patient_analytics(db: Session = Depends(get_db)):
     age_distribution.update(
         {range_name: count for range_name, count in age_counts if range_name}
     )
+    return age_distribution
+
 
-    # Source distribution
+def get_source_distribution(db: Session) -> dict[str, int]:
+    """Patients per acquisition source."""
     source_counts = (
         db.query(Patient.source, func.count(Patient.id)).group_by(Patient.source).all()
     )
-    source_distribution = {str(source.value): count for source, count in source_counts}
+    return {str(source.value): count for source, count in source_counts}
 
-    # Patients by month
+
+def get_patients_by_month(db: Session) -> dict[str, int]:
+    """New patients per month ("YYYY-MM")."""
     patients_by_month = (
         db.query(
             func.to_char(Patient.created_date, "YYYY-MM").label("month"),
@@ -149,125 +271,102 @@ def get_patient_analytics(db: Session = Depends(get_db)):
         .order_by(func.to_char(Patient.created_date, "YYYY-MM"))
         .all()
     )
-    patients_by_month_dict = {month: count for month, count in patients_by_month}
-
-    return PatientAnalyticsResponse(
-        totalPatients=total_patients,
-        genderDistribution=gender_distribution,
-        ageDistribution=age_distribution,
-        sourceDistribution=source_distribution,
-        patientsByMonth=patients_by_month_dict,
-    )
+    return {month: count for month, count in patients_by_month}
 
 
-@router.get("/business", response_model=BusinessAnalyticsResponse)
-def get_business_analytics(db: Session = Depends(get_db)):
+def get_revenue_totals(
+    db: Session, start_date: date | None = None, end_date: date | None = None
+) -> tuple[int, int, int]:
     """
-    Get consolidated business analytics including services and appointments.
+    Revenue totals of paid payments in the window.
+
+    Returns:
+        Tuple of (total revenue, average payment per customer, customers)
     """
-    # Top 10 services by revenue: Service JOIN Payment, SUM(amount), GROUP BY service_id, ORDER DESC
-    top_by_revenue_query = (
+    # Total revenue and customers (paid payments only), in one index-only scan
+    # of idx_payment_paid_patient
+    total_revenue, total_customers = (
         db.query(
-            Service.id,
-            Service.name,
-            func.sum(Payment.amount).label("revenue"),
+            func.coalesce(func.sum(Payment.amount), 0),
+            func.count(func.distinct(Payment.patient_id)),
         )
-        .join(Payment, Service.id == Payment.service_id)
-        .filter(Payment.status == "paid")
-        .group_by(Service.id, Service.name)
-        .order_by(func.sum(Payment.amount).desc())
-        .limit(10)
-        .all()
+        .filter(Payment.status == "paid", *date_window(Payment.date, start_date, end_date))
+        .one()
     )
 
-    top_services_by_revenue = [
-        ServiceByRevenueResponse(id=service_id, name=name, revenue=revenue)
-        for service_id, name, revenue in top_by_revenue_query
-    ]
-
-    # Top 10 services by bookings: Service INNER JOIN AppointmentService, COUNT(*), GROUP BY service_id, ORDER DESC
-    top_by_bookings_query = (
-        db.query(
-            Service.id,
-            Service.name,
-            func.count(AppointmentService.appointment_id).label("count"),
-        )
-        .join(AppointmentService, Service.id == AppointmentService.service_id)
-        .group_by(Service.id, Service.name)
-        .order_by(func.count(AppointmentService.appointment_id).desc())
-        .limit(10)
-        .all()
-    )
+    # Average payment per
+    average_payment = total_revenue // total_customers if total_customers > 0 else 0
+    return total_revenue, average_payment, total_customers
 
-    top_services_by_bookings = [
-        ServiceByBookingsResponse(id=service_id, name=name, count=count)
-        for service_id, name, count in top_by_bookings_query
-    ]
 
-    # Total revenue (paid payments only)
-    total_revenue = (
-        db.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(Payment.status == "paid")
-        .scalar()
-    )
+def get_appointment_totals(
+    db: Session, start_date: date | None = None, end_date: date | None = None
+) -> tuple[dict[str, int], int, str]:
+    """
+    Appointment counts; with a window, of the appointments with a service in it.
 
-    # Total customers count
-    total_customers = (
-        db.query(func.count(func.distinct(Payment.patient_id)))
-        .filter(Payment.status == "paid")
-        .scalar()
+    Returns:
+        Tuple of (status distribution, total appointments, average services
+        per appointment formatted with 2 decimals)
+    """
+    service_window = date_window(AppointmentService.start, start_date, end_date)
+    appointment_window = (
+        [
+            Appointment.id.in_(
+                db.query(AppointmentService.appointment_id).filter(*service_window)
+            )
+        ]
+        if service_window
+        else []
     )
 
-    # Average payment per
-    average_payment = total_revenue // total_customers if total_customers > 0 else 0
-
     # Status distribution
     status_counts = (
         db.query(Appointment.status, func.count(Appointment.id))
+        .filter(*appointment_window)
         .group_by(Appointment.status)
         .all()
     )
     status_distribution = {str(status.value): count for status, count in status_counts}
 
     # Total appointments
-    total_appointments = db.query(func.count(Appointment.id)).scalar()
+    total_appointments = (
+        db.query(func.count(Appointment.id)).filter(*appointment_window).scalar()
+    )
 
     # Average services per appointment
-    total_services = db.query(func.count(AppointmentService.appointment_id)).scalar()
+    total_services = (
+        db.query(func.count(AppointmentService.appointment_id))
+        .filter(*service_window)
+        .scalar()
+    )
     avg_services = total_services / total_appointments if total_appointments > 0 else 0
-    avg_services_per_appointment = f"{avg_services:.2f}"
+    return status_distribution, total_appointments, f"{avg_services:.2f}"
+
 
-    # Appointments by day of week
+def get_appointments_by_day(
+    db: Session, start_date: date | None = None, end_date: date | None = None
+) -> dict[str, int]:
+    """Appointments per day of the week of their services' start."""
     appointments_by_day = (
         db.query(
             func.to_char(AppointmentService.start, "Day").label("day"),
             func.count(func.distinct(AppointmentService.appointment_id)).label("count"),
         )
+        .filter(*date_window(AppointmentService.start, start_date, end_date))
         .group_by(func.to_char(AppointmentService.start, "Day"))
         .all()
     )
-    appointments_by_day_dict = {
-        day.strip(): count for day, count in appointments_by_day
-    }
-
-    return BusinessAnalyticsResponse(
-        topServicesByRevenue=top_services_by_revenue,
-        topServicesByBookings=top_services_by_bookings,
-        totalRevenue=total_revenue,
-        averagePayment=average_payment,
-        totalCustomers=total_customers,
-        statusDistribution=status_distribution,
-        avgServicesPerAppointment=avg_services_per_appointment,
-        appointmentsByDay=appointments_by_day_dict,
-        totalAppointments=total_appointments,
-    )
+    return {day.strip(): count for day, count in appointments_by_day}
 
 
-@router.get("/providers", response_model=ProviderAnalyticsResponse)
-def get_provider_analytics(db: Session = Depends(get_db)):
-    """
-    Get top 5 busiest providers by appointment count.
-    """
+def get_top_providers(
+    db: Session,
+    limit: int = 5,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[TopProviderResponse]:
+    """Busiest providers by appointment count, with their revenue."""
     # Subquery for appointment count per provider
     appointment_count_subq = (
         db.query(
@@ -276,22 +375,27 @@ def get_provider_analytics(db: Session = Depends(get_db)):
                 "appointment_count"
             ),
         )
+        .filter(*date_window(AppointmentService.start, start_date, end_date))
         .group_by(AppointmentService.provider_id)
         .subquery()
     )
 
-    # Subquery for revenue per provider (sum of paid payments)
+    # Subquery for revenue per provider (sum of paid payments), an index-only
+    # scan of idx_payment_paid_provider
     revenue_subq = (
         db.query(
             Payment.provider_id,
             func.coalesce(func.sum(Payment.amount), 0).label("revenue"),
         )
-        .filter(Payment.status == "paid")
+        .filter(
+            Payment.status == "paid",
+            *date_window(Payment.date, start_date, end_date),
+        )
         .group_by(Payment.provider_id)
         .subquery()
     )
 
-    # Main query with joins - get top 5 by appointment count
+    # Main query with joins - get top providers by appointment count
     top_providers_query = (
         db.query(
             Provider,
@@ -309,11 +413,11 @@ def get_provider_analytics(db: Session = Depends(get_db)):
             func.coalesce(appointment_count_subq.c.appointment_count, 0).desc(),
             Provider.id.asc(),
         )
-        .limit(5)
+        .limit(limit)
         .all()
     )
 
-    top_providers = [
+    return [
         TopProviderResponse(
             id=provider.id,
             name=f"{provider.first_name} {provider.last_name}",
@@ -325,16 +429,9 @@ def get_provider_analytics(db: Session = Depends(get_db)):
         for provider, appointment_count, revenue in top_providers_query
     ]
 
-    return ProviderAnalyticsResponse(topProviders=top_providers)
-
 
-@router.get("/patient-behavior", response_model=PatientBehaviorResponse)
-def get_patient_behavior_analytics(db: Session = Depends(get_db)):
-    """
-    Get patient behavior patterns including:
-    - Distribution of patients by number of appointments (all statuses)
-    - Top services booked by patients (all appointments)
-    """
+def get_patients_by_appointment_count(db: Session) -> dict[str, int]:
+    """Patients per number of appointments (all statuses): "0" to "5", then "6+"."""
     # Count all appointments per patient (any status)
     appointments_per_patient = (
         db.query(
@@ -393,48 +490,793 @@ def get_patient_behavior_analytics(db: Session = Depends(get_db)):
             if range_name
         }
     )
+    return patients_by_appointment_count
 
-    # Top 10 services by revenue: Service JOIN Payment, SUM(amount), GROUP BY service_id, ORDER DESC
-    top_by_revenue_query = (
-        db.query(
-            Service.id,
-            Service.name,
-            func.sum(Payment.amount).label("revenue"),
+
+@router.get("/patients", response_model=PatientAnalyticsResponse)
+def get_patient_analytics(db: Session = Depends(get_db)):
+    """
+    Get consolidated patient analytics including demographics and sources.
+    """
+    return PatientAnalyticsResponse(
+        totalPatients=count_patients(db),
+        genderDistribution=get_gender_distribution(db),
+        ageDistribution=get_age_distribution(db),
+        sourceDistribution=get_source_distribution(db),
+        patientsByMonth=get_patients_by_month(db),
+    )
+
+
+def rollup_window(
+    db: Session, start_date: date | None, end_date: date | None
+) -> tuple[date, date]:
+    """
+    Window of analytics merged from the daily rollups (see db/rollups.py).
+
+    An open start begins at the first stored rollup; an open end stops today
+    (or at the last stored rollup, if later).
+    """
+    check_window(start_date, end_date)
+    stored = stored_rollup_range(db)
+    if start_date is None and stored is None:
+        raise HTTPException(
+            status_code=503,
+            detail="No analytics rollups yet: run scripts/build_rollups.py or pass startDate",
         )
-        .join(Payment, Service.id == Payment.service_id)
-        .filter(Payment.status == "paid")
-        .group_by(Service.id, Service.name)
-        .order_by(func.sum(Payment.amount).desc())
-        .limit(10)
+    start = start_date or stored[0]
+    end = end_date or max(date.today(), stored[1] if stored else start, start)
+    return start, end
+
+
+def sketch_blobs(rollups: list, name: str) -> list[bytes]:
+    """Serialized sketches of one name, from the days of the rollups that have one."""
+    return [rollup.sketches[name] for rollup in rollups if name in rollup.sketches]
+
+
+def rank_services_from_sketches(
+    db: Session, rollups: list, limit: int = 10
+) -> tuple[
+    list[ServiceByRevenueResponse],
+    list[ServiceByBookingsResponse],
+    CountMinSketch,
+    CountMinSketch,
+]:
+    """
+    Top services by revenue and by bookings, from the merged Count-Min/top-K
+    sketches of the rollups.
+
+    Returns:
+        Tuple of (top by revenue, top by bookings, merged bookings sketch,
+        merged revenue sketch)
+    """
+    bookings = merge_count_min(sketch_blobs(rollups, "service_bookings"))
+    revenue = merge_count_min(sketch_blobs(rollups, "service_revenue"))
+    top_by_bookings = bookings.most_common(limit)
+    top_by_revenue = revenue.most_common(limit)
+    service_ids = {service_id for service_id, _ in top_by_bookings + top_by_revenue}
+    names = dict(
+        db.query(Service.id, Service.name).filter(Service.id.in_(service_ids)).all()
+    )
+    return (
+        [
+            ServiceByRevenueResponse(id=service_id, name=names[service_id], revenue=amount)
+            for service_id, amount in top_by_revenue
+            if service_id in names
+        ],
+        [
+            ServiceByBookingsResponse(id=service_id, name=names[service_id], count=count)
+            for service_id, count in top_by_bookings
+            if service_id in names
+        ],
+        bookings,
+        revenue,
+    )
+
+
+def get_approximate_business_analytics(
+    db: Session, start_date: date | None, end_date: date | None
+) -> BusinessAnalyticsResponse:
+    """
+    Business analytics merged from the daily rollups and sketches of the
+    window, without scanning payments or appointment services: distinct
+    counts from HyperLogLog, service rankings from Count-Min/top-K, totals
+    summed exactly.
+    """
+    start, end = rollup_window(db, start_date, end_date)
+    rollups, sketched_on_the_fly = load_daily_rollups(db, start, end)
+
+    def blobs(name: str, days: list = rollups) -> list[bytes]:
+        return sketch_blobs(days, name)
+
+    total_revenue = sum(rollup.revenue for rollup in rollups)
+    customers = merge_hll(blobs("customers"))
+    total_customers = customers.count()
+    average_payment = total_revenue // total_customers if total_customers > 0 else 0
+
+    # Appointments per weekday, merged into the window's appointments
+    appointments = HyperLogLog()
+    appointments_by_day = {}
+    for weekday in range(7):
+        days = [rollup for rollup in rollups if rollup.day.weekday() == weekday]
+        day_appointments = merge_hll(blobs("appointments", days))
+        if any(rollup.appointment_services for rollup in days):
+            appointments_by_day[days[0].day.strftime("%A")] = day_appointments.count()
+            appointments.merge(day_appointments)
+    total_appointments = appointments.count()
+    status_distribution = {
+        status.value: merge_hll(blobs(f"appointments:{status.value}")).count()
+        for status in AppointmentStatusEnum
+        if blobs(f"appointments:{status.value}")
+    }
+    total_services = sum(rollup.appointment_services for rollup in rollups)
+    avg_services = total_services / total_appointments if total_appointments > 0 else 0
+
+    top_by_revenue, top_by_bookings, bookings, revenue = rank_services_from_sketches(
+        db, rollups
+    )
+
+    return BusinessAnalyticsResponse(
+        topServicesByRevenue=top_by_revenue,
+        topServicesByBookings=top_by_bookings,
+        totalRevenue=total_revenue,
+        averagePayment=average_payment,
+        totalCustomers=total_customers,
+        statusDistribution=status_distribution,
+        avgServicesPerAppointment=f"{avg_services:.2f}",
+        appointmentsByDay=appointments_by_day,
+        totalAppointments=total_appointments,
+        approximation=ApproximationBounds(
+            distinctCountError=round(customers.relative_error, 4),
+            bookingsMaxOvercount=bookings.max_overcount,
+            revenueMaxOvercount=revenue.max_overcount,
+            confidence=round(bookings.confidence, 4),
+            startDate=start.isoformat(),
+            endDate=end.isoformat(),
+            daysSketchedOnTheFly=sketched_on_the_fly,
+        ),
+    )
+
+
+@router.get("/business", response_model=BusinessAnalyticsResponse)
+def get_business_analytics(
+    startDate: date | None = Query(
+        None, description="Only include payments and services on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only include payments and services on or before this date"
+    ),
+    approximate: bool = Query(
+        False, description="Estimate from the daily rollups and sketches"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get consolidated business analytics including services and appointments.
+
+    With startDate/endDate, payments are windowed by payment date and
+    appointment services by start time; appointment counts cover appointments
+    with a service in the window.
+
+    With approximate=true, distinct counts and service rankings are estimated
+    from per-day sketches, reported with their error bounds (see
+    get_approximate_business_analytics).
+    """
+    if approximate:
+        return get_approximate_business_analytics(db, startDate, endDate)
+
+    check_window(startDate, endDate)
+
+    top_services_by_revenue = get_top_services_by_revenue(
+        db, start_date=startDate, end_date=endDate
+    )
+    top_services_by_bookings = get_top_services_by_bookings(
+        db, start_date=startDate, end_date=endDate
+    )
+    total_revenue, average_payment, total_customers = get_revenue_totals(
+        db, startDate, endDate
+    )
+    status_distribution, total_appointments, avg_services_per_appointment = (
+        get_appointment_totals(db, startDate, endDate)
+    )
+
+    return BusinessAnalyticsResponse(
+        topServicesByRevenue=top_services_by_revenue,
+        topServicesByBookings=top_services_by_bookings,
+        totalRevenue=total_revenue,
+        averagePayment=average_payment,
+        totalCustomers=total_customers,
+        statusDistribution=status_distribution,
+        avgServicesPerAppointment=avg_services_per_appointment,
+        appointmentsByDay=get_appointments_by_day(db, startDate, endDate),
+        totalAppointments=total_appointments,
+    )
+
+
+@router.get("/providers", response_model=ProviderAnalyticsResponse)
+def get_provider_analytics(
+    startDate: date | None = Query(
+        None, description="Only count appointments and payments on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only count appointments and payments on or before this date"
+    ),
+    approximate: bool = Query(
+        False, description="Estimate from the daily rollups and sketches"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get top 5 busiest providers by appointment count.
+
+    With approximate=true, appointment counts and revenue are estimated from
+    per-day Count-Min sketches (see get_approximate_provider_analytics).
+    """
+    if approximate:
+        return get_approximate_provider_analytics(db, startDate, endDate)
+
+    check_window(startDate, endDate)
+    return ProviderAnalyticsResponse(
+        topProviders=get_top_providers(db, start_date=startDate, end_date=endDate)
+    )
+
+
+def get_approximate_provider_analytics(
+    db: Session, start_date: date | None, end_date: date | None, limit: int = 5
+) -> ProviderAnalyticsResponse:
+    """
+    Busiest providers merged from the daily Count-Min/top-K sketches of the
+    window, without COUNT(DISTINCT appointment_id) per provider over the
+    window's appointment services.
+    """
+    start, end = rollup_window(db, start_date, end_date)
+    rollups, sketched_on_the_fly = load_daily_rollups(db, start, end)
+    appointments = merge_count_min(sketch_blobs(rollups, "provider_appointments"))
+    revenue = merge_count_min(sketch_blobs(rollups, "provider_revenue"))
+    top = appointments.most_common(limit)
+    providers = {
+        provider.id: provider
+        for provider in db.query(Provider).filter(
+            Provider.id.in_([provider_id for provider_id, _ in top])
+        )
+    }
+
+    top_providers = []
+    for provider_id, count in top:
+        provider = providers.get(provider_id)
+        if provider is None:
+            continue
+        top_providers.append(
+            TopProviderResponse(
+                id=provider.id,
+                name=f"{provider.first_name} {provider.last_name}",
+                email=provider.email,
+                phone=provider.phone,
+                appointmentCount=count,
+                revenue=revenue.estimate(provider_id),
+            )
+        )
+
+    return ProviderAnalyticsResponse(
+        topProviders=top_providers,
+        approximation=ApproximationBounds(
+            bookingsMaxOvercount=appointments.max_overcount,
+            revenueMaxOvercount=revenue.max_overcount,
+            confidence=round(appointments.confidence, 4),
+            startDate=start.isoformat(),
+            endDate=end.isoformat(),
+            daysSketchedOnTheFly=sketched_on_the_fly,
+        ),
+    )
+
+
+@router.get("/patient-behavior", response_model=PatientBehaviorResponse)
+def get_patient_behavior_analytics(
+    approximate: bool = Query(
+        False, description="Estimate the top services from the daily rollups"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get patient behavior patterns including:
+    - Distribution of patients by number of appointments (all statuses)
+    - Top services booked by patients (all appointments)
+
+    With approximate=true, the top services come from the merged Count-Min
+    sketches of every stored day instead of scanning all payments and
+    appointment services. The distribution stays exact: a per-patient count
+    over all time has no mergeable daily sketch.
+    """
+    if approximate:
+        start, end = rollup_window(db, None, None)
+        rollups, sketched_on_the_fly = load_daily_rollups(db, start, end)
+        top_by_revenue, top_by_bookings, bookings, revenue = (
+            rank_services_from_sketches(db, rollups)
+        )
+        return PatientBehaviorResponse(
+            patientsByAppointmentCount=get_patients_by_appointment_count(db),
+            topServicesByRevenue=top_by_revenue,
+            topServicesByBookings=top_by_bookings,
+            approximation=ApproximationBounds(
+                bookingsMaxOvercount=bookings.max_overcount,
+                revenueMaxOvercount=revenue.max_overcount,
+                confidence=round(bookings.confidence, 4),
+                startDate=start.isoformat(),
+                endDate=end.isoformat(),
+                daysSketchedOnTheFly=sketched_on_the_fly,
+            ),
+        )
+
+    return PatientBehaviorResponse(
+        patientsByAppointmentCount=get_patients_by_appointment_count(db),
+        topServicesByRevenue=get_top_services_by_revenue(db),
+        topServicesByBookings=get_top_services_by_bookings(db),
+    )
+
+
+# Time series metric -> (time column, aggregate per bucket, filter conditions)
+TIMESERIES_METRICS = {
+    # Paid amounts by payment date
+    "revenue": (
+        Payment.date,
+        func.coalesce(func.sum(Payment.amount), 0),
+        [Payment.status == "paid"],
+    ),
+    # Appointments by booking (creation) date
+    "bookings": (Appointment.created_date, func.count(Appointment.id), []),
+}
+
+# Buckets returned when startDate is omitted
+DEFAULT_TIMESERIES_BUCKETS = {"day": 90, "week": 52, "month": 24}
+
+# Most buckets a series may span (ten years of days). Every bucket is computed
+# and memoized before maxPoints downsamples, so the window itself is capped.
+MAX_TIMESERIES_BUCKETS = 3660
+
+# Bucket values keyed by (metric, granularity, bucket start). Buckets are
+# whole days, weeks or months, so overlapping windows share them; cleared
+# whenever a payment or appointment changes.
+timeseries_memo: Memo[int] = Memo(tags=["/api/analytics/timeseries"], max_entries=20000)
+
+
+def shift_bucket(start: date, granularity: str, buckets: int) -> date:
+    """Start of the bucket `buckets` buckets after start (may be negative)."""
+    if granularity == "month":
+        return add_months(start, buckets)
+    return start + timedelta(days=buckets * (7 if granularity == "week" else 1))
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """Start of the bucket containing day, like date_trunc() (weeks start on Monday)."""
+    if granularity == "month":
+        return month_start(day)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def compute_buckets(
+    db: Session, metric: str, granularity: str, start: date, end: date
+) -> dict[date, int]:
+    """
+    Values of every bucket in [start, end) (bucket starts), zero for empty
+    buckets, in one GROUP BY date_trunc() over a range of the metric's time
+    column.
+    """
+    column, aggregate, conditions = TIMESERIES_METRICS[metric]
+    bucket = func.date_trunc(granularity, column)
+    rows = (
+        db.query(bucket, aggregate)
+        .filter(
+            *conditions,
+            column >= datetime.combine(start, time.min),
+            column < datetime.combine(end, time.min),
+        )
+        .group_by(bucket)
         .all()
     )
+    values = {bucket_value.date(): value for bucket_value, value in rows}
 
-    top_services_by_revenue = [
-        ServiceByRevenueResponse(id=service_id, name=name, revenue=revenue)
-        for service_id, name, revenue in top_by_revenue_query
+    buckets = {}
+    current = start
+    while current < end:
+        buckets[current] = values.get(current, 0)
+        current = shift_bucket(current, granularity, 1)
+    return buckets
+
+
+@router.get("/timeseries", response_model=TimeseriesResponse)
+def get_timeseries(
+    metric: Literal["revenue", "bookings"] = Query(..., description="Metric to chart"),
+    granularity: Literal["day", "week", "month"] = Query(
+        "day", description="Bucket size"
+    ),
+    startDate: date | None = Query(
+        None,
+        description="First day of the series (default: 90 days, 52 weeks or 24 months back)",
+    ),
+    endDate: date | None = Query(
+        None, description="Last day of the series (default: today)"
+    ),
+    maxPoints: int = Query(
+        200,
+        ge=2,
+        le=1000,
+        description="Most points returned; longer series are downsampled",
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get revenue or booking counts over time, bucketed by day, week or month.
+
+    The window is widened to whole buckets. Bucket values are memoized per
+    granularity, so only the buckets a previous window did not cover are
+    queried. Series longer than maxPoints are downsampled by summing runs of
+    consecutive buckets into one point. Windows spanning more than
+    MAX_TIMESERIES_BUCKETS buckets are rejected with a 400.
+    """
+    end_day = endDate or date.today()
+    check_window(startDate, end_day)
+    end = shift_bucket(bucket_start(end_day, granularity), granularity, 1)
+    if startDate:
+        start = bucket_start(startDate, granularity)
+    else:
+        start = shift_bucket(end, granularity, -DEFAULT_TIMESERIES_BUCKETS[granularity])
+
+    buckets = []
+    current = start
+    while current < end:
+        if len(buckets) == MAX_TIMESERIES_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"The window spans more than {MAX_TIMESERIES_BUCKETS} "
+                f"{granularity} buckets: use a coarser granularity or a later startDate",
+            )
+        buckets.append(current)
+        current = shift_bucket(current, granularity, 1)
+
+    keys = [(metric, granularity, bucket) for bucket in buckets]
+    memoized, generation = timeseries_memo.lookup(keys)
+    missing = [bucket for bucket, key in zip(buckets, keys) if key not in memoized]
+    if missing:
+        # One query spanning the missing buckets (usually one run at an edge
+        # of the window)
+        computed = compute_buckets(
+            db, metric, granularity, missing[0], shift_bucket(missing[-1], granularity, 1)
+        )
+        computed_by_key = {
+            (metric, granularity, bucket): value for bucket, value in computed.items()
+        }
+        timeseries_memo.store(computed_by_key, generation)
+        memoized.update(computed_by_key)
+    values = [memoized[key] for key in keys]
+
+    buckets_per_point = math.ceil(len(buckets) / maxPoints)
+    points = [
+        TimeseriesPoint(
+            start=buckets[index].isoformat(),
+            value=sum(values[index : index + buckets_per_point]),
+        )
+        for index in range(0, len(buckets), buckets_per_point)
     ]
 
-    # Top 10 services by bookings: Service INNER JOIN AppointmentService, COUNT(*), GROUP BY service_id, ORDER DESC
-    top_by_bookings_query = (
-        db.query(
-            Service.id,
-            Service.name,
-            func.count(AppointmentService.appointment_id).label("count"),
+    return TimeseriesResponse(
+        metric=metric,
+        granularity=granularity,
+        bucketsPerPoint=buckets_per_point,
+        startDate=start.isoformat(),
+        endDate=(end - timedelta(days=1)).isoformat(),
+        points=points,
+    )
+
+
+# Distribution in the response -> daily KLL sketch it is merged from
+DISTRIBUTION_SKETCHES = {
+    "paymentAmount": "payment_amount",
+    "visitInterval": "visit_interval",
+    "appointmentDuration": "appointment_duration",
+}
+
+
+@router.get("/distributions", response_model=DistributionsResponse)
+def get_distributions(
+    startDate: date | None = Query(
+        None, description="Only include payments and visits on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only include payments and visits on or before this date"
+    ),
+    percentiles: str = Query(
+        "50,90,99", description="Comma-separated percentiles (0-100) to estimate"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get percentiles of payment amounts, intervals between a patient's visits
+    and appointment service durations.
+
+    Percentiles are estimated from the daily KLL sketches of the window,
+    merged (see db/rollups.py), never by sorting the window's rows; rankError
+    bounds how far off each percentile's rank may be. The window works like
+    /business?approximate=true.
+    """
+    try:
+        requested = [float(value) for value in percentiles.split(",")]
+    except ValueError:
+        requested = []
+    if not requested or not all(0 <= value <= 100 for value in requested):
+        raise HTTPException(
+            status_code=400,
+            detail="percentiles must be comma-separated numbers from 0 to 100",
         )
-        .join(AppointmentService, Service.id == AppointmentService.service_id)
-        .group_by(Service.id, Service.name)
-        .order_by(func.count(AppointmentService.appointment_id).desc())
-        .limit(10)
-        .all()
+
+    start, end = rollup_window(db, startDate, endDate)
+    rollups, sketched_on_the_fly = load_daily_rollups(db, start, end)
+
+    distributions = {}
+    rank_error = 0.0
+    for field, name in DISTRIBUTION_SKETCHES.items():
+        sketch = merge_kll(
+            [rollup.sketches[name] for rollup in rollups if name in rollup.sketches]
+        )
+        values = sketch.quantiles(value / 100 for value in requested)
+        rank_error = max(rank_error, sketch.rank_error)
+        distributions[field] = DistributionSummary(
+            count=sketch.count,
+            min=round(sketch.min, 2) if sketch.count else None,
+            max=round(sketch.max, 2) if sketch.count else None,
+            percentiles={
+                f"p{percentile:g}": None if value is None else round(value, 2)
+                for percentile, value in zip(requested, values)
+            },
+        )
+
+    return DistributionsResponse(
+        **distributions,
+        rankError=round(rank_error, 4),
+        startDate=start.isoformat(),
+        endDate=end.isoformat(),
+        daysSketchedOnTheFly=sketched_on_the_fly,
     )
 
-    top_services_by_bookings = [
-        ServiceByBookingsResponse(id=service_id, name=name, count=count)
-        for service_id, name, count in top_by_bookings_query
+
+@router.get("/service-affinity", response_model=ServiceAffinityResponse)
+def get_service_affinity(
+    startDate: date | None = Query(
+        None,
+        description="Only include appointment services on or after this date "
+        "(default: first stored rollup)",
+    ),
+    endDate: date | None = Query(
+        None,
+        description="Only include appointment services on or before this date "
+        "(default: today)",
+    ),
+    minCount: int = Query(
+        1, ge=1, description="Leave out pairs booked together fewer times"
+    ),
+    sortBy: Literal["count", "lift"] = Query(
+        "count", description="Rank pairs and companions by count or lift"
+    ),
+    limit: int = Query(50, ge=1, le=500, description="Number of pairs"),
+    companions: int = Query(
+        5, ge=1, le=20, description="Top companions listed per service"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Get which services are booked together in the same appointment.
+
+    For a pair of services, count is the appointments with both and lift is
+    count * appointments / (appointments with the first * appointments with
+    the second): above 1, the pair is booked together more often than if
+    bookings were independent. confidence is the share of a service's
+    appointments that also include the companion.
+
+    The counts are summed from the daily service pair counts stored with the
+    rollups (see db/rollups.py), not from the window's appointment services.
+    """
+    start, end = rollup_window(db, startDate, endDate)
+    total, counts, counted_on_the_fly = load_service_pairs(db, start, end)
+    services = Counter()
+    pairs = Counter()
+    for (first, second), count in counts.items():
+        if first == second:
+            services[first] = count
+        else:
+            pairs[first, second] = count
+    names = dict(db.query(Service.id, Service.name).all())
+
+    def lift(first: str, second: str, count: int) -> float:
+        return round(count * total / (services[first] * services[second]), 4)
+
+    ranked = [
+        (first, second, count, lift(first, second, count))
+        for (first, second), count in pairs.items()
+        if count >= minCount
     ]
+    rank_index = 2 if sortBy == "count" else 3
+    ranked.sort(key=lambda pair: (-pair[rank_index], pair[0], pair[1]))
 
-    return PatientBehaviorResponse(
-        patientsByAppointmentCount=patients_by_appointment_count,
-        topServicesByRevenue=top_services_by_revenue,
-        topServicesByBookings=top_services_by_bookings,
+    companions_by_service: dict[str, list] = {service_id: [] for service_id in services}
+    for first, second, count, pair_lift in ranked:
+        for service_id, companion_id in ((first, second), (second, first)):
+            if len(companions_by_service[service_id]) < companions:
+                companions_by_service[service_id].append(
+                    ServiceCompanionResponse(
+                        id=companion_id,
+                        name=names.get(companion_id, ""),
+                        count=count,
+                        lift=pair_lift,
+                        confidence=round(count / services[service_id], 4),
+                    )
+                )
+
+    return ServiceAffinityResponse(
+        totalAppointments=total,
+        pairs=[
+            ServicePairResponse(
+                serviceId=first,
+                serviceName=names.get(first, ""),
+                companionId=second,
+                companionName=names.get(second, ""),
+                count=count,
+                lift=pair_lift,
+            )
+            for first, second, count, pair_lift in ranked[:limit]
+        ],
+        services=[
+            ServiceAffinityItem(
+                id=service_id,
+                name=names.get(service_id, ""),
+                appointments=appointments,
+                topCompanions=companions_by_service[service_id],
+            )
+            for service_id, appointments in services.most_common()
+        ],
+        startDate=start.isoformat(),
+        endDate=end.isoformat(),
+        daysCountedOnTheFly=counted_on_the_fly,
+    )
+
+
+def get_totals_section(db: Session, start_date: date | None, end_date: date | None) -> dict:
+    """Headline numbers of the dashboard."""
+    total_revenue, average_payment, total_customers = get_revenue_totals(
+        db, start_date, end_date
     )
+    return {
+        "totalPatients": count_patients(db),
+        "totalRevenue": total_revenue,
+        "averagePayment": average_payment,
+        "totalCustomers": total_customers,
+    }
+
+
+def get_appointments_section(
+    db: Session, start_date: date | None, end_date: date | None
+) -> dict:
+    """Appointment counts and their spread over the week."""
+    status_distribution, total_appointments, avg_services_per_appointment = (
+        get_appointment_totals(db, start_date, end_date)
+    )
+    return {
+        "statusDistribution": status_distribution,
+        "totalAppointments": total_appointments,
+        "avgServicesPerAppointment": avg_services_per_appointment,
+        "appointmentsByDay": get_appointments_by_day(db, start_date, end_date),
+    }
+
+
+# Streamed section -> function(db, start_date, end_date) returning its fields,
+# named like the fields of the analytics responses. Patient demographics and
+# behavior are not windowed, like /patients and /patient-behavior.
+ANALYTICS_SECTIONS: dict[str, Callable[[Session, date | None, date | None], dict]] = {
+    "totals": get_totals_section,
+    "gender": lambda db, start, end: {"genderDistribution": get_gender_distribution(db)},
+    "age": lambda db, start, end: {"ageDistribution": get_age_distribution(db)},
+    "source": lambda db, start, end: {"sourceDistribution": get_source_distribution(db)},
+    "patientsByMonth": lambda db, start, end: {
+        "patientsByMonth": get_patients_by_month(db)
+    },
+    "appointments": get_appointments_section,
+    "topServices": lambda db, start, end: {
+        "topServicesByRevenue": get_top_services_by_revenue(
+            db, start_date=start, end_date=end
+        ),
+        "topServicesByBookings": get_top_services_by_bookings(
+            db, start_date=start, end_date=end
+        ),
+    },
+    "providers": lambda db, start, end: {
+        "topProviders": get_top_providers(db, start_date=start, end_date=end)
+    },
+    "behavior": lambda db, start, end: {
+        "patientsByAppointmentCount": get_patients_by_appointment_count(db)
+    },
+}
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One AnalyticsSectionChunk per line, in completion order",
+            "content": {
+                "application/x-ndjson": {
+                    "schema": AnalyticsSectionChunk.model_json_schema()
+                }
+            },
+        }
+    },
+)
+async def stream_analytics(
+    request: Request,
+    startDate: date | None = Query(
+        None, description="Only include payments and services on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only include payments and services on or before this date"
+    ),
+    sections: str | None = Query(
+        None, description="Comma-separated sections to stream (default: all)"
+    ),
+):
+    """
+    Stream the dashboard as NDJSON, one line per section, each sent as soon
+    as its queries finish, so the first cards render without waiting for the
+    slowest aggregate.
+
+    Sections run concurrently (up to ANALYTICS_STREAM_CONCURRENCY), each in
+    its own session. A failing section sends a line with an error instead of
+    its data; the other sections are still sent.
+    """
+    # Reject bad windows and sections before the 200 response starts
+    check_window(startDate, endDate)
+    names = list(ANALYTICS_SECTIONS)
+    if sections:
+        names = [name.strip() for name in sections.split(",") if name.strip()]
+        unknown = [name for name in names if name not in ANALYTICS_SECTIONS]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown sections: {', '.join(unknown)}"
+            )
+
+    route_path = request.scope["route"].path
+    # A batch's shared connection runs one statement at a time
+    limiter = anyio.CapacityLimiter(
+        STREAM_CONCURRENCY if shared_connection.get() is None else 1
+    )
+
+    def run_section(name: str) -> bytes:
+        db = open_session(route_path)
+        try:
+            data = ANALYTICS_SECTIONS[name](db, startDate, endDate)
+            chunk = AnalyticsSectionChunk(section=name, data=jsonable_encoder(data))
+        except Exception:
+            query_scope = current_query_scope.get()
+            if query_scope is None or not query_scope.cancelled:
+                logger.exception("Analytics section %s failed", name)
+            chunk = AnalyticsSectionChunk(
+                section=name, error="Section could not be computed"
+            )
+        finally:
+            db.close()
+        return chunk.model_dump_json(exclude_none=True).encode() + b"\n"
+
+    async def stream_sections():
+        tasks = [
+            asyncio.ensure_future(
+                anyio.to_thread.run_sync(run_section, name, limiter=limiter)
+            )
+            for name in names
+        ]
+        try:
+            for next_chunk in asyncio.as_completed(tasks):
+                yield await next_chunk
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_sections(), media_type="application/x-ndjson")
+
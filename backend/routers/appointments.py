@@ -0,0 +1,194 @@
+"""Appointment API routes."""
+
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import exists, tuple_
+
+from db.session import get_db
+from db.models import (
+    Appointment,
+    AppointmentService,
+    AppointmentStatusEnum,
+    Patient,
+    Payment,
+    Provider,
+    Service,
+)
+from schemas.appointment import (
+    AppointmentListItem,
+    AppointmentListResponse,
+    AppointmentServiceResponse,
+)
+from schemas.patient import PaymentResponse
+from utils import date_window, decode_cursor, encode_cursor, validate_window
+
+router = APIRouter(prefix="/api/appointments", tags=["appointments"])
+
+
+def load_page_details(db: Session, appointment_ids: list[str]) -> tuple[dict, dict]:
+    """
+    Fetch the services and payments of a page of appointments.
+
+    One query each for the whole page (not one per appointment), both
+    looked up by appointment_id through its indexes.
+
+    Returns:
+        Tuple of (services by appointment id, payment by appointment id)
+    """
+    services_by_appointment: dict[str, list[AppointmentServiceResponse]] = {}
+    payments_by_appointment: dict[str, PaymentResponse] = {}
+    if not appointment_ids:
+        return services_by_appointment, payments_by_appointment
+
+    appointment_services_data = (
+        db.query(AppointmentService, Service, Provider.first_name, Provider.last_name)
+        .join(Service, AppointmentService.service_id == Service.id)
+        .join(Provider, AppointmentService.provider_id == Provider.id)
+        .filter(AppointmentService.appointment_id.in_(appointment_ids))
+        .order_by(AppointmentService.start)
+        .all()
+    )
+    for appointment_service, service, first_name, last_name in appointment_services_data:
+        services_by_appointment.setdefault(appointment_service.appointment_id, []).append(
+            AppointmentServiceResponse(
+                id=service.id,
+                name=service.name,
+                price=service.price,
+                providerId=appointment_service.provider_id,
+                providerName=f"{first_name} {last_name}",
+                start=appointment_service.start.isoformat(),
+                end=appointment_service.end.isoformat(),
+            )
+        )
+
+    payments = (
+        db.query(Payment).filter(Payment.appointment_id.in_(appointment_ids)).all()
+    )
+    for payment in payments:
+        payments_by_appointment[payment.appointment_id] = PaymentResponse(
+            id=payment.id,
+            appointment_id=payment.appointment_id,
+            amount=payment.amount,
+            payment_date=payment.date.isoformat(),
+            created_date=payment.created_date.isoformat(),
+        )
+
+    return services_by_appointment, payments_by_appointment
+
+
+@router.get("", response_model=AppointmentListResponse)
+def get_appointments(
+    cursor: str | None = Query(None, description="Cursor for pagination"),
+    limit: int = Query(20, ge=1, le=100, description="Number of items per page"),
+    status: AppointmentStatusEnum | None = Query(None, description="Filter by status"),
+    startDate: date | None = Query(
+        None, description="Only include appointments created on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only include appointments created on or before this date"
+    ),
+    providerId: str | None = Query(
+        None, description="Only include appointments with a service by this provider"
+    ),
+    serviceId: str | None = Query(
+        None, description="Only include appointments including this service"
+    ),
+    sortOrder: str = Query("desc", description="Sort order by creation date (asc or desc)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Get a paginated list of appointments across all patients, with their
+    services and payment.
+
+    Uses keyset pagination on (created_date, id), served by
+    idx_appointment_created_id (idx_appointment_status_created_id when
+    filtered by status): every page reads only its own rows from the index,
+    so deep pages cost the same as the first one.
+    """
+    try:
+        validate_window(startDate, endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = db.query(Appointment, Patient.first_name, Patient.last_name).join(
+        Patient, Appointment.patient_id == Patient.id
+    )
+
+    if status:
+        query = query.filter(Appointment.status == status)
+
+    query = query.filter(*date_window(Appointment.created_date, startDate, endDate))
+
+    # Provider and service filters are semi-joins on appointment_service (one
+    # appointment matches once, however many of its services match); with
+    # both, the same service must match both
+    if providerId or serviceId:
+        service_filter = AppointmentService.appointment_id == Appointment.id
+        if providerId:
+            service_filter &= AppointmentService.provider_id == providerId
+        if serviceId:
+            service_filter &= AppointmentService.service_id == serviceId
+        query = query.filter(exists().where(service_filter))
+
+    # Count only for the first page (see AppointmentListResponse.total)
+    total = query.count() if not cursor else None
+
+    sort_key = tuple_(Appointment.created_date, Appointment.id)
+    is_desc = sortOrder == "desc"
+
+    # Apply cursor-based pagination. A row-value comparison, unlike the
+    # equivalent OR of conditions, is used by Postgres as an index bound.
+    if cursor:
+        cursor_data = decode_cursor(cursor)
+        if cursor_data:
+            cursor_key = tuple_(
+                datetime.fromisoformat(cursor_data["created_date"]), cursor_data["id"]
+            )
+            query = query.filter(sort_key < cursor_key if is_desc else sort_key > cursor_key)
+
+    if is_desc:
+        query = query.order_by(Appointment.created_date.desc(), Appointment.id.desc())
+    else:
+        query = query.order_by(Appointment.created_date.asc(), Appointment.id.asc())
+
+    # Fetch one extra to determine if there are more
+    results = query.limit(limit + 1).all()
+
+    has_more = len(results) > limit
+    if has_more:
+        results = results[:limit]
+
+    next_cursor = None
+    if has_more and results:
+        last_appointment = results[-1][0]
+        next_cursor = encode_cursor(
+            {
+                "created_date": last_appointment.created_date.isoformat(),
+                "id": last_appointment.id,
+            }
+        )
+
+    services_by_appointment, payments_by_appointment = load_page_details(
+        db, [appointment.id for appointment, _, _ in results]
+    )
+
+    appointments = [
+        AppointmentListItem(
+            id=appointment.id,
+            patient_id=appointment.patient_id,
+            patientName=f"{first_name} {last_name}",
+            status=appointment.status.value,
+            created_date=appointment.created_date.isoformat(),
+            services=services_by_appointment.get(appointment.id, []),
+            payment=payments_by_appointment.get(appointment.id),
+        )
+        for appointment, first_name, last_name in results
+    ]
+
+    return AppointmentListResponse(
+        data=appointments,
+        nextCursor=next_cursor,
+        hasMore=has_more,
+        total=total,
+    )
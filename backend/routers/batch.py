@@ -0,0 +1,193 @@
+"""
+Batch API route.
+
+POST /api/batch runs several GET requests to existing routes in one round
+trip, e.g. every section of the analytics dashboard. Each sub-request is
+dispatched in-process through the full application (middleware included),
+so it is validated, cached, coalesced and admitted exactly like the same
+request sent on its own, and gets the same response.
+
+Sharing a database connection between sub-requests saves a connect per
+sub-request, but a connection can only run one statement at a time:
+
+- without a client-side pool (NullPool, the default), sub-requests run one
+  after the other on one shared connection, each in its own transaction
+- with a pool (DB_POOL_SIZE > 0), connecting is cheap, so sub-requests run
+  concurrently, each with its own pooled connection
+
+When the batch's client disconnects, every running sub-request sees the
+disconnect (so its queries get cancelled) and no further sub-request starts.
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import urlsplit
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request, Response
+from sqlalchemy.pool import NullPool
+from starlette.datastructures import Headers
+
+from db.session import SharedConnection, engine, shared_connection
+from schemas.batch import BatchRequest, BatchRequestItem, BatchResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+# Status of the sub-requests skipped because the client disconnected
+CLIENT_CLOSED_REQUEST = 499
+
+
+def validate_path(path: str) -> tuple[str, str]:
+    """
+    Split a sub-request path into path and query string.
+
+    Raises:
+        HTTPException: 400 for paths outside the API or nested batches
+    """
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/api/"):
+        raise HTTPException(status_code=400, detail=f"Not an API path: {path}")
+    if parts.path.rstrip("/") == router.prefix:
+        raise HTTPException(status_code=400, detail="Batches cannot be nested")
+    return parts.path, parts.query
+
+
+async def watch_disconnect(request: Request, client_gone: asyncio.Event):
+    """
+    Set client_gone once the batch's client disconnects. The only reader of
+    the batch's receive channel, which hands its disconnect to one caller.
+    """
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    client_gone.set()
+
+
+async def dispatch(
+    request: Request, path: str, query: str, client_gone: asyncio.Event
+) -> tuple[int, str, bytes]:
+    """
+    Run a GET request in-process through the application, unless the batch's
+    client is already gone.
+
+    Returns:
+        Tuple of (status code, content type, uncompressed response body)
+    """
+    if client_gone.is_set():
+        return CLIENT_CLOSED_REQUEST, "", b""
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": request.url.scheme,
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "query_string": query.encode(),
+        "headers": [
+            (b"host", request.headers.get("host", "localhost").encode()),
+            (b"accept", b"application/json"),
+            (b"accept-encoding", b"identity"),
+        ],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server"),
+        "state": dict(request.scope.get("state", {})),
+    }
+    response_complete = asyncio.Event()
+    request_sent = False
+    status = 500
+    content_type = ""
+    chunks: list[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Disconnect when the response is complete, or when the batch's own
+        # client disconnects (so the sub-request's queries get cancelled)
+        waits = [
+            asyncio.ensure_future(response_complete.wait()),
+            asyncio.ensure_future(client_gone.wait()),
+        ]
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for wait in waits:
+                wait.cancel()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # Unhandled errors are re-raised after the 500 response is sent; keep
+        # them from failing the whole batch
+        logger.exception("Batch sub-request to %s failed", path)
+        status = 500
+    finally:
+        response_complete.set()
+    return status, content_type, b"".join(chunks)
+
+
+def encode_item(item: BatchRequestItem, status: int, content_type: str, body: bytes) -> bytes:
+    """One element of the responses array; JSON bodies are embedded without re-encoding."""
+    if not content_type.startswith("application/json"):
+        body = json.dumps(body.decode("utf-8", "replace")).encode()
+    return b'{"id":%s,"status":%d,"body":%s}' % (
+        json.dumps(item.id).encode(),
+        status,
+        body or b"null",
+    )
+
+
+@router.post("", response_class=Response, responses={200: {"model": BatchResponse}})
+async def run_batch(batch: BatchRequest, request: Request):
+    """
+    Run several GET requests to API routes and return their responses together.
+
+    Responses are returned in request order, each with its status code, so
+    one failing request does not fail the batch.
+    """
+    targets = [validate_path(item.path) for item in batch.requests]
+
+    client_gone = asyncio.Event()
+    watcher = asyncio.create_task(watch_disconnect(request, client_gone))
+    try:
+        if isinstance(engine.pool, NullPool):
+            # Opened by the first sub-request that queries (cache hits do not)
+            shared = SharedConnection(engine)
+            token = shared_connection.set(shared)
+            try:
+                results = [
+                    await dispatch(request, path, query, client_gone)
+                    for path, query in targets
+                ]
+            finally:
+                shared_connection.reset(token)
+                await anyio.to_thread.run_sync(shared.close)
+        else:
+            results = await asyncio.gather(
+                *(dispatch(request, path, query, client_gone) for path, query in targets)
+            )
+    finally:
+        watcher.cancel()
+
+    items = [
+        encode_item(item, status, content_type, body)
+        for item, (status, content_type, body) in zip(batch.requests, results)
+    ]
+    content = b'{"responses":[' + b",".join(items) + b"]}"
+    return Response(content=content, media_type="application/json")
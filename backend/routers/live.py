@@ -0,0 +1,290 @@
+"""
+Live analytics over WebSockets.
+
+Dashboards connected to /api/analytics/live receive a snapshot of every
+dashboard section (see ANALYTICS_SECTIONS), then a delta whenever a section
+changes: only the counters that changed, and top lists whenever they are
+re-ranked.
+
+The sections are computed once per process for all subscribers, not per
+client. With the change feed (CHANGE_FEED=1), only the sections whose
+tables changed are recomputed, after the bus's debounce. Without it, every
+section is recomputed every LIVE_ANALYTICS_REFRESH_SECONDS. Nothing runs
+while no dashboard is connected.
+
+Messages are JSON text frames:
+
+    {"type": "snapshot", "sections": {"gender": {"genderDistribution": {...}}, ...}}
+    {"type": "update", "section": "gender", "changes": {"genderDistribution": {"female": 8275}}}
+
+In a changed distribution, a key that disappeared is sent as null.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Iterable
+
+import anyio
+from fastapi import APIRouter, WebSocket
+from fastapi.encoders import jsonable_encoder
+
+from changefeed import ALL, change_feed_enabled, invalidation_bus
+from db.session import open_session
+from metrics import LIVE_SUBSCRIBERS, LIVE_UPDATES
+from routers.analytics import ANALYTICS_SECTIONS, STREAM_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+# Section recompute interval when the change feed is disabled
+REFRESH_SECONDS = float(os.getenv("LIVE_ANALYTICS_REFRESH_SECONDS", "30"))
+
+# Messages queued for a subscriber before it is considered too slow and
+# disconnected (it gets a fresh snapshot when it reconnects)
+MAX_PENDING_MESSAGES = int(os.getenv("LIVE_ANALYTICS_MAX_PENDING", "100"))
+
+# Invalidation tag (route path) -> dashboard sections computed from its data
+SECTIONS_BY_TAG = {
+    "/api/analytics/patients": ["totals", "gender", "age", "source", "patientsByMonth"],
+    "/api/analytics/business": ["totals", "appointments", "topServices"],
+    "/api/analytics/providers": ["providers"],
+    "/api/analytics/patient-behavior": ["behavior"],
+}
+
+
+def sections_for(tags: Iterable[str]) -> set[str]:
+    """Dashboard sections affected by a set of invalidation tags."""
+    if ALL in tags:
+        return set(ANALYTICS_SECTIONS)
+    return {section for tag in tags for section in SECTIONS_BY_TAG.get(tag, [])}
+
+
+def diff_section(old: dict, new: dict) -> dict:
+    """
+    Fields of a section that changed: changed keys only for distributions,
+    the whole value for counters and (re-ranked) lists.
+    """
+    changes = {}
+    for field, value in new.items():
+        previous = old.get(field)
+        if value == previous:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            changes[field] = {
+                key: value.get(key)
+                for key in previous.keys() | value.keys()
+                if value.get(key) != previous.get(key)
+            }
+        else:
+            changes[field] = value
+    return changes
+
+
+class Subscriber:
+    """A connected dashboard's queue of serialized messages."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self.overflowed = False
+
+    def push(self, message: str):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= MAX_PENDING_MESSAGES:
+            # Too slow to keep up: end its stream (None) instead of buffering
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(message)
+
+
+class LiveAnalyticsHub:
+    """
+    Computes the dashboard sections once and fans changes out to subscribers.
+
+    Must be used from the event loop thread, except invalidate(), which the
+    invalidation bus calls from the change listener thread.
+    """
+
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        # Latest data of every section (None while nobody is subscribed)
+        self.state: dict[str, dict] | None = None
+        # Dashboards connected or connecting; work runs while there are any
+        self._users = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Sections to recompute, and the task recomputing them
+        self._pending: set[str] = set()
+        self._refresh_task: asyncio.Task | None = None
+        self._periodic_task: asyncio.Task | None = None
+        # One computation at a time, so updates are applied in order
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self) -> tuple[Subscriber, dict[str, dict]]:
+        """
+        Add a subscriber, computing the sections if nobody was subscribed.
+
+        Returns:
+            Tuple of (subscriber, snapshot of every section)
+        """
+        if self._users == 0:
+            self._start()
+        self._users += 1
+
+        subscriber = Subscriber()
+        try:
+            async with self._lock:
+                if self.state is None:
+                    self.state = await self._compute(ANALYTICS_SECTIONS)
+                # Added under the lock: every update after this snapshot reaches it
+                self.subscribers.add(subscriber)
+                snapshot = dict(self.state)
+        except BaseException:
+            self._release()
+            raise
+        LIVE_SUBSCRIBERS.inc()
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Remove a subscriber, stopping all work when it was the last one."""
+        self.subscribers.remove(subscriber)
+        LIVE_SUBSCRIBERS.dec()
+        self._release()
+
+    def _start(self):
+        self._loop = asyncio.get_running_loop()
+        if change_feed_enabled():
+            invalidation_bus.subscribe(self.invalidate)
+        else:
+            self._periodic_task = asyncio.create_task(self._refresh_periodically())
+
+    def _release(self):
+        self._users -= 1
+        if self._users > 0:
+            return
+        if self._periodic_task is not None:
+            self._periodic_task.cancel()
+            self._periodic_task = None
+        else:
+            invalidation_bus.unsubscribe(self.invalidate)
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        self._pending.clear()
+        self.state = None
+        self._loop = None
+
+    def invalidate(self, tags: frozenset[str]):
+        """Invalidation bus callback: recompute the affected sections."""
+        sections = sections_for(tags)
+        loop = self._loop
+        if sections and loop is not None:
+            loop.call_soon_threadsafe(self._schedule, sections)
+
+    def _schedule(self, sections: set[str]):
+        if self._users == 0:
+            return
+        self._pending |= sections
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh_periodically(self):
+        while True:
+            await asyncio.sleep(REFRESH_SECONDS)
+            self._schedule(set(ANALYTICS_SECTIONS))
+
+    async def _refresh(self):
+        # Sections invalidated while computing are picked up by the next round
+        while self._pending:
+            names = set(self._pending)
+            self._pending.clear()
+            async with self._lock:
+                if self.state is None:
+                    return
+                computed = await self._compute(names)
+                for name, data in computed.items():
+                    changes = diff_section(self.state.get(name, {}), data)
+                    self.state[name] = data
+                    if changes:
+                        LIVE_UPDATES.labels(section=name).inc()
+                        self.broadcast(
+                            {"type": "update", "section": name, "changes": changes}
+                        )
+
+    async def _compute(self, names: Iterable[str]) -> dict[str, dict]:
+        """
+        Compute sections concurrently in worker threads, each in its own session.
+
+        Failed sections are logged and left out, so subscribers keep their
+        previous data.
+        """
+        limiter = anyio.CapacityLimiter(STREAM_CONCURRENCY)
+
+        def compute_section(name: str) -> dict | None:
+            db = open_session(router.prefix + "/live")
+            try:
+                return jsonable_encoder(ANALYTICS_SECTIONS[name](db, None, None))
+            except Exception:
+                logger.exception("Live analytics section %s failed", name)
+                return None
+            finally:
+                db.close()
+
+        names = list(names)
+        results = await asyncio.gather(
+            *(
+                anyio.to_thread.run_sync(compute_section, name, limiter=limiter)
+                for name in names
+            )
+        )
+        return {name: data for name, data in zip(names, results) if data is not None}
+
+    def broadcast(self, message: dict):
+        """Serialize a message once and queue it for every subscriber."""
+        text = json.dumps(message)
+        for subscriber in self.subscribers:
+            subscriber.push(text)
+
+
+# Process-wide hub shared by every live dashboard
+live_hub = LiveAnalyticsHub()
+
+
+@router.websocket("/live")
+async def live_analytics(websocket: WebSocket):
+    """
+    Push dashboard sections and their changes to a connected dashboard.
+
+    Messages from the client are ignored; the connection stays open until
+    either side closes it.
+    """
+    await websocket.accept()
+    subscriber, snapshot = await live_hub.subscribe()
+
+    async def send_updates():
+        await websocket.send_text(json.dumps({"type": "snapshot", "sections": snapshot}))
+        while (message := await subscriber.queue.get()) is not None:
+            await websocket.send_text(message)
+        # Overflowed: "try again later", the client reconnects for a snapshot
+        await websocket.close(code=1013)
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [
+        asyncio.ensure_future(send_updates()),
+        asyncio.ensure_future(wait_for_disconnect()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.info("Live analytics connection ended: %r", task.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+        live_hub.unsubscribe(subscriber)
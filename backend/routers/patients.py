@@ -7,6 +7,7 @@ from sqlalchemy import or_, and_
 
 from db.session import get_db
 from db.models import Patient, Appointment, AppointmentService, Service, Payment
+from middleware import add_cache_tags
 from schemas.patient import (
     PatientResponse,
     PatientListResponse,
@@ -174,6 +175,9 @@ def get_patient_by_id(
 
     # Get all appointment IDs
     appointment_ids = [appointment.id for appointment in appointments]
+    # Services are keyed by appointment, so the cached response must be
+    # invalidated when they change
+    add_cache_tags(f"appointment:{appointment_id}" for appointment_id in appointment_ids)
 
     # Fetch all appointment services and services in one query
     appointment_services_data = (
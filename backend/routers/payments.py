@@ -0,0 +1,260 @@
+"""Payments ledger API routes."""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from datetime import date, datetime, time, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import Integer, case, func, literal, tuple_
+
+from changefeed import Memo
+from db.session import get_db
+from db.models import Payment, PaymentMethodEnum, PaymentStatusEnum
+from schemas.payment import LedgerEntryResponse, PaymentLedgerResponse
+from utils import date_window, decode_cursor, encode_cursor, validate_window
+
+router = APIRouter(prefix="/api/payments", tags=["payments"])
+
+# Key signing the running revenue carried in ledger cursors, so clients
+# cannot alter the totals of later pages. Workers forked from a preloaded app
+# share the random default; set it to keep cursors valid across restarts.
+CURSOR_SECRET = os.getenv("LEDGER_CURSOR_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Revenue before a ledger boundary, per method, keyed by filters and boundary.
+# Cleared whenever a payment changes.
+prefix_revenue_memo: Memo[dict[str, int]] = Memo(tags=[router.prefix])
+
+
+def prefix_revenue(
+    db: Session, filters: tuple, conditions: list, before: datetime | None
+) -> dict[str, int]:
+    """
+    Revenue per method of the ledger payments dated before `before` (all
+    payments when None): the running revenue the first page starts from.
+
+    Summed once per filter set and boundary, then memoized, so later
+    requests (and every following page, which carries its running revenue
+    in the cursor) never re-sum the ledger from the beginning.
+    """
+
+    def compute() -> dict[str, int]:
+        query = db.query(Payment.method, func.sum(Payment.amount)).filter(
+            *conditions, Payment.status == PaymentStatusEnum.PAID
+        )
+        if before is not None:
+            query = query.filter(Payment.date < before)
+        revenue = {method.value: 0 for method in PaymentMethodEnum}
+        for method, amount in query.group_by(Payment.method).all():
+            revenue[method.value] = amount
+        return revenue
+
+    return prefix_revenue_memo.get_or_compute((*filters, before), compute)
+
+
+def sign_cursor(filters: tuple, sort_order: str, cursor_data: dict) -> str:
+    """HMAC of a ledger cursor, bound to the filters and order it was issued for."""
+    message = json.dumps(
+        [[str(value) for value in filters], sort_order, cursor_data], sort_keys=True
+    )
+    return hmac.new(CURSOR_SECRET, message.encode(), hashlib.sha256).hexdigest()
+
+
+def read_cursor(
+    cursor: str, filters: tuple, sort_order: str
+) -> tuple[datetime, str, dict[str, int]]:
+    """
+    Position and running revenue of a ledger cursor.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed, was issued for other
+            filters or order, or its signature does not match
+    """
+    cursor_data = decode_cursor(cursor)
+    try:
+        signature = cursor_data.pop("signature")
+        cursor_date = datetime.fromisoformat(cursor_data["date"])
+        payment_id = cursor_data["id"]
+        revenue = cursor_data["revenue"]
+        valid = (
+            isinstance(payment_id, str)
+            and isinstance(revenue, dict)
+            and set(revenue) == {method.value for method in PaymentMethodEnum}
+            and all(type(amount) is int for amount in revenue.values())
+            and isinstance(signature, str)
+            and hmac.compare_digest(
+                signature, sign_cursor(filters, sort_order, cursor_data)
+            )
+        )
+    except (AttributeError, KeyError, TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return cursor_date, payment_id, revenue
+
+
+@router.get("", response_model=PaymentLedgerResponse)
+def get_payments_ledger(
+    cursor: str | None = Query(None, description="Cursor for pagination"),
+    limit: int = Query(50, ge=1, le=200, description="Number of items per page"),
+    status: PaymentStatusEnum | None = Query(None, description="Filter by status"),
+    method: PaymentMethodEnum | None = Query(None, description="Filter by method"),
+    providerId: str | None = Query(None, description="Filter by provider"),
+    serviceId: str | None = Query(None, description="Filter by service"),
+    startDate: date | None = Query(
+        None, description="Only include payments on or after this date"
+    ),
+    endDate: date | None = Query(
+        None, description="Only include payments on or before this date"
+    ),
+    sortOrder: str = Query("desc", description="Sort order by payment date (asc or desc)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Get a page of the payments ledger with running revenue totals.
+
+    Running revenue sums the paid amounts of the ledger (the payments matching
+    status, method, provider and service) in date order, from the first
+    payment ever, also when startDate/endDate only show part of it. It is
+    computed with window functions over the page, anchored on:
+
+    - the first page: the memoized revenue before the page (see prefix_revenue)
+    - later pages: the running revenue carried in the cursor, which is
+      signed (see sign_cursor) so it cannot be altered
+
+    Pages use keyset pagination on (date, id), served by idx_payment_date_id
+    (or the provider/service variants), so deep pages cost the same as the
+    first one.
+    """
+    try:
+        validate_window(startDate, endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    conditions = []
+    if status:
+        conditions.append(Payment.status == status)
+    if method:
+        conditions.append(Payment.method == method)
+    if providerId:
+        conditions.append(Payment.provider_id == providerId)
+    if serviceId:
+        conditions.append(Payment.service_id == serviceId)
+    filters = (status, method, providerId, serviceId)
+
+    query = db.query(Payment).filter(
+        *conditions, *date_window(Payment.date, startDate, endDate)
+    )
+
+    # Count only for the first page
+    total = query.count() if not cursor else None
+
+    is_desc = sortOrder == "desc"
+    sort_key = tuple_(Payment.date, Payment.id)
+
+    # Running revenue per method just before the page's first payment
+    # (ascending) or just after it (descending)
+    if cursor:
+        cursor_date, cursor_id, anchor = read_cursor(cursor, filters, sortOrder)
+        cursor_key = tuple_(cursor_date, cursor_id)
+        # The redundant bound on date alone lets Postgres skip the monthly
+        # partitions (db/partitions.py) on the other side of the cursor,
+        # which a row-value comparison does not
+        if is_desc:
+            query = query.filter(sort_key < cursor_key, Payment.date <= cursor_date)
+        else:
+            query = query.filter(sort_key > cursor_key, Payment.date >= cursor_date)
+    elif is_desc:
+        # Everything up to the end of the window
+        before = (
+            datetime.combine(endDate + timedelta(days=1), time.min) if endDate else None
+        )
+        anchor = prefix_revenue(db, filters, conditions, before)
+    elif startDate:
+        anchor = prefix_revenue(
+            db, filters, conditions, datetime.combine(startDate, time.min)
+        )
+    else:
+        anchor = {method.value: 0 for method in PaymentMethodEnum}
+
+    if is_desc:
+        order_by = (Payment.date.desc(), Payment.id.desc())
+    else:
+        order_by = (Payment.date.asc(), Payment.id.asc())
+
+    # Running revenue per method, in SQL: a cumulative sum of paid amounts in
+    # page order, added to the anchor (ascending) or, walking back in time,
+    # subtracted from it (descending)
+    running_columns = []
+    for payment_method in PaymentMethodEnum:
+        is_revenue = (Payment.status == PaymentStatusEnum.PAID) & (
+            Payment.method == payment_method
+        )
+        cumulative = func.coalesce(
+            func.sum(Payment.amount)
+            .filter(is_revenue)
+            .over(order_by=order_by, rows=(None, 0)),
+            0,
+        )
+        base = literal(anchor.get(payment_method.value, 0), Integer)
+        if is_desc:
+            running = base - cumulative + case((is_revenue, Payment.amount), else_=0)
+        else:
+            running = base + cumulative
+        running_columns.append(running.label(f"running_{payment_method.value}"))
+
+    # Fetch one extra to determine if there are more
+    results = (
+        query.add_columns(*running_columns).order_by(*order_by).limit(limit + 1).all()
+    )
+
+    has_more = len(results) > limit
+    if has_more:
+        results = results[:limit]
+
+    entries = []
+    running_by_method = dict(anchor)
+    for payment, *running in results:
+        running_by_method = {
+            payment_method.value: amount
+            for payment_method, amount in zip(PaymentMethodEnum, running)
+        }
+        entries.append(
+            LedgerEntryResponse(
+                id=payment.id,
+                appointment_id=payment.appointment_id,
+                patient_id=payment.patient_id,
+                provider_id=payment.provider_id,
+                service_id=payment.service_id,
+                amount=payment.amount,
+                method=payment.method.value,
+                status=payment.status.value,
+                payment_date=payment.date.isoformat(),
+                runningRevenue=sum(running_by_method.values()),
+            )
+        )
+
+    next_cursor = None
+    if has_more and results:
+        last_payment = results[-1][0]
+        next_anchor = dict(running_by_method)
+        if is_desc and last_payment.status == PaymentStatusEnum.PAID:
+            # The next page starts just before the last payment
+            next_anchor[last_payment.method.value] -= last_payment.amount
+        cursor_data = {
+            "date": last_payment.date.isoformat(),
+            "id": last_payment.id,
+            "revenue": next_anchor,
+        }
+        cursor_data["signature"] = sign_cursor(filters, sortOrder, cursor_data)
+        next_cursor = encode_cursor(cursor_data)
+
+    return PaymentLedgerResponse(
+        data=entries,
+        nextCursor=next_cursor,
+        hasMore=has_more,
+        runningRevenueByMethod=running_by_method,
+        total=total,
+    )
@@ -35,7 +35,8 @@ def get_providers(
         .subquery()
     )
 
-    # Subquery for revenue per provider (sum of paid payments)
+    # Subquery for revenue per provider (sum of paid payments), an index-only
+    # scan of idx_payment_paid_provider
     revenue_subq = (
         db.query(
             Payment.provider_id,
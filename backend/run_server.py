@@ -1,23 +1,82 @@
 #!/usr/bin/env python3
 """
 Simple script to run the FastAPI server.
-Usage: python run_server.py
+
+Usage:
+    python run_server.py                 # development: one uvicorn process with reload
+    python run_server.py --production    # production: gunicorn + uvicorn workers
+
+Production mode is the default when PORT is set (Render sets it) or when
+SERVER_MODE=production. Its settings (workers, keep-alive, backlog, worker
+recycling, preload) live in gunicorn_conf.py and are read from environment
+variables.
 """
 
+import argparse
 import os
+import sys
+
 import uvicorn
 
-if __name__ == "__main__":
-    # Get port from environment variable (Render sets PORT, default to 8000 for local dev)
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_production():
+    """Replace this process with gunicorn, so signals reach its master directly."""
+    os.execv(
+        sys.executable,
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--chdir",
+            BACKEND_DIR,
+            "--config",
+            os.path.join(BACKEND_DIR, "gunicorn_conf.py"),
+            "main:app",
+        ],
+    )
+
+
+def run_development():
+    # Get port from environment variable (default to 8000 for local dev)
     port = int(os.environ.get("PORT", 8000))
     # Get host from environment variable (default to 0.0.0.0 for production, 127.0.0.1 for local)
     host = os.environ.get("HOST", "0.0.0.0")
-    # Only enable reload in development (when PORT is not set by Render)
-    reload = os.environ.get("PORT") is None
 
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
-        reload=reload,
+        reload=True,
     )
+
+
+if __name__ == "__main__":
+    # Render sets PORT; locally it is usually unset
+    default_mode = os.environ.get(
+        "SERVER_MODE", "production" if os.environ.get("PORT") else "development"
+    )
+
+    parser = argparse.ArgumentParser(description="Run the FastAPI server")
+    parser.add_argument(
+        "--production",
+        action="store_const",
+        const="production",
+        dest="mode",
+        help="Run gunicorn with one uvicorn worker per CPU core",
+    )
+    parser.add_argument(
+        "--development",
+        action="store_const",
+        const="development",
+        dest="mode",
+        help="Run a single uvicorn process with auto-reload",
+    )
+    parser.set_defaults(mode=default_mode)
+    args = parser.parse_args()
+
+    if args.mode == "production":
+        run_production()
+    else:
+        run_development()
@@ -8,13 +8,30 @@ from schemas.patient import (
     ServiceResponse,
     PaymentResponse,
 )
+from schemas.appointment import (
+    AppointmentListItem,
+    AppointmentListResponse,
+    AppointmentServiceResponse,
+)
+from schemas.payment import LedgerEntryResponse, PaymentLedgerResponse
 from schemas.provider import ProviderResponse, ProviderListResponse
 from schemas.analytics import (
     ServiceByRevenueResponse,
     ServiceByBookingsResponse,
     PatientAnalyticsResponse,
     BusinessAnalyticsResponse,
+    ApproximationBounds,
+    TimeseriesPoint,
+    TimeseriesResponse,
+    AnalyticsSectionChunk,
+    DistributionSummary,
+    DistributionsResponse,
+    ServicePairResponse,
+    ServiceCompanionResponse,
+    ServiceAffinityItem,
+    ServiceAffinityResponse,
 )
+from schemas.batch import BatchRequest, BatchRequestItem, BatchResponse, BatchResponseItem
 from schemas.common import PaginatedResponse
 
 __all__ = [
@@ -24,11 +41,30 @@ __all__ = [
     "AppointmentWithServices",
     "ServiceResponse",
     "PaymentResponse",
+    "AppointmentListItem",
+    "AppointmentListResponse",
+    "AppointmentServiceResponse",
+    "LedgerEntryResponse",
+    "PaymentLedgerResponse",
     "ProviderResponse",
     "ProviderListResponse",
     "ServiceByRevenueResponse",
     "ServiceByBookingsResponse",
     "PatientAnalyticsResponse",
     "BusinessAnalyticsResponse",
+    "ApproximationBounds",
+    "TimeseriesPoint",
+    "TimeseriesResponse",
+    "AnalyticsSectionChunk",
+    "DistributionSummary",
+    "DistributionsResponse",
+    "ServicePairResponse",
+    "ServiceCompanionResponse",
+    "ServiceAffinityItem",
+    "ServiceAffinityResponse",
+    "BatchRequest",
+    "BatchRequestItem",
+    "BatchResponse",
+    "BatchResponseItem",
     "PaginatedResponse",
 ]
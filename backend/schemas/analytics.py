@@ -31,6 +31,25 @@ class PatientAnalyticsResponse(BaseModel):
     patientsByMonth: dict[str, int]
 
 
+class ApproximationBounds(BaseModel):
+    """Error bounds of approximate analytics (approximate=true)."""
+
+    # Relative standard error of the distinct counts (HyperLogLog):
+    # totalCustomers, totalAppointments, statusDistribution, appointmentsByDay.
+    # None when a response estimates no distinct count.
+    distinctCountError: float | None = None
+    # Largest overestimate of a ranked count (service bookings, provider
+    # appointments) and revenue (Count-Min), each with probability `confidence`
+    bookingsMaxOvercount: int
+    revenueMaxOvercount: int
+    confidence: float
+    # Window the sketches cover, and its days without a stored rollup
+    # (sketched from the raw rows for this response)
+    startDate: str
+    endDate: str
+    daysSketchedOnTheFly: int
+
+
 class BusinessAnalyticsResponse(BaseModel):
     """Consolidated schema for business analytics (services + appointments)."""
 
@@ -45,6 +64,8 @@ class BusinessAnalyticsResponse(BaseModel):
     avgServicesPerAppointment: str
     appointmentsByDay: dict[str, int]
     totalAppointments: int
+    # Only for approximate=true (totalRevenue stays exact)
+    approximation: ApproximationBounds | None = None
 
 
 class TopProviderResponse(BaseModel):
@@ -62,6 +83,8 @@ class ProviderAnalyticsResponse(BaseModel):
     """Schema for provider analytics (busiest providers)."""
 
     topProviders: list[TopProviderResponse]
+    # Only for approximate=true
+    approximation: ApproximationBounds | None = None
 
 
 class PatientBehaviorResponse(BaseModel):
@@ -72,3 +95,109 @@ class PatientBehaviorResponse(BaseModel):
     # Top services - separate lists for revenue and bookings
     topServicesByRevenue: list[ServiceByRevenueResponse]
     topServicesByBookings: list[ServiceByBookingsResponse]
+    # Only for approximate=true (patientsByAppointmentCount stays exact)
+    approximation: ApproximationBounds | None = None
+
+
+class TimeseriesPoint(BaseModel):
+    """One point of a time series: a bucket (or run of buckets) and its value."""
+
+    # First day of the point's first bucket
+    start: str
+    value: int
+
+
+class TimeseriesResponse(BaseModel):
+    """Schema for a bucketed time series."""
+
+    metric: str
+    granularity: str
+    # Buckets summed into each point when downsampled to maxPoints (1 otherwise)
+    bucketsPerPoint: int
+    # Window actually covered: the requested one widened to whole buckets
+    startDate: str
+    endDate: str
+    points: list[TimeseriesPoint]
+
+
+class DistributionSummary(BaseModel):
+    """Size, range and estimated percentiles of a distribution."""
+
+    count: int
+    min: float | None
+    max: float | None
+    # Percentile ("p50", "p99.9", ...) -> estimated value (None if empty)
+    percentiles: dict[str, float | None]
+
+
+class DistributionsResponse(BaseModel):
+    """Schema for payment, visit interval and appointment duration distributions."""
+
+    # Paid payment amounts (cents), by payment date
+    paymentAmount: DistributionSummary
+    # Days since the patient's previous visit, by the date of the later visit
+    visitInterval: DistributionSummary
+    # Appointment service durations (minutes), by start date
+    appointmentDuration: DistributionSummary
+    # Largest expected error of a percentile's rank, as a fraction of count
+    rankError: float
+    # Window the sketches cover (see ApproximationBounds)
+    startDate: str
+    endDate: str
+    daysSketchedOnTheFly: int
+
+
+class ServicePairResponse(BaseModel):
+    """Schema for two services booked together in the same appointments."""
+
+    serviceId: str
+    serviceName: str
+    companionId: str
+    companionName: str
+    # Appointments with both services
+    count: int
+    # count relative to what independent bookings would give (1 = no affinity)
+    lift: float
+
+
+class ServiceCompanionResponse(BaseModel):
+    """Schema for a service often booked with another one."""
+
+    id: str
+    name: str
+    count: int
+    lift: float
+    # Share of the other service's appointments that include this one
+    confidence: float
+
+
+class ServiceAffinityItem(BaseModel):
+    """Schema for a service and the services most booked with it."""
+
+    id: str
+    name: str
+    # Appointments including the service
+    appointments: int
+    topCompanions: list[ServiceCompanionResponse]
+
+
+class ServiceAffinityResponse(BaseModel):
+    """Schema for service co-booking analytics."""
+
+    # Appointments with a service in the window
+    totalAppointments: int
+    pairs: list[ServicePairResponse]
+    services: list[ServiceAffinityItem]
+    # Window covered, and days without stored service pair counts
+    startDate: str
+    endDate: str
+    daysCountedOnTheFly: int
+
+
+class AnalyticsSectionChunk(BaseModel):
+    """One line of the streamed dashboard: a section's fields, or its error."""
+
+    section: str
+    # Fields of the section, named like the analytics responses' fields
+    data: dict | None = None
+    error: str | None = None
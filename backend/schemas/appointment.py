@@ -0,0 +1,46 @@
+"""Appointment-related schemas."""
+
+from pydantic import BaseModel
+
+from schemas.patient import PaymentResponse
+
+
+class AppointmentServiceResponse(BaseModel):
+    """Schema for a service booked in an appointment, with its provider and time slot."""
+
+    id: str
+    name: str
+    price: int
+    providerId: str
+    providerName: str
+    start: str
+    end: str
+
+    class Config:
+        from_attributes = True
+
+
+class AppointmentListItem(BaseModel):
+    """Schema for an appointment in the appointment list."""
+
+    id: str
+    patient_id: str
+    patientName: str
+    status: str
+    created_date: str
+    services: list[AppointmentServiceResponse]
+    payment: PaymentResponse | None
+
+    class Config:
+        from_attributes = True
+
+
+class AppointmentListResponse(BaseModel):
+    """Schema for paginated appointment list."""
+
+    data: list[AppointmentListItem]
+    nextCursor: str | None
+    hasMore: bool
+    # Only counted for the first page: counting every match would make deep
+    # pages as expensive as a full scan
+    total: int | None
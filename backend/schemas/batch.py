@@ -0,0 +1,35 @@
+"""Batch request schemas."""
+
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+# Most sub-requests accepted in one batch
+MAX_BATCH_REQUESTS = 20
+
+
+class BatchRequestItem(BaseModel):
+    """One GET request to run as part of a batch."""
+
+    id: str | None = Field(None, description="Client-chosen id echoed in the response")
+    path: str = Field(..., description="Path and query string, e.g. /api/analytics/business?startDate=2025-01-01")
+
+
+class BatchRequest(BaseModel):
+    """Schema for a batch of GET requests."""
+
+    requests: list[BatchRequestItem] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+
+
+class BatchResponseItem(BaseModel):
+    """Response to one request of a batch."""
+
+    id: str | None
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    """Schema for the responses to a batch, in request order."""
+
+    responses: list[BatchResponseItem]
@@ -0,0 +1,35 @@
+"""Payment ledger schemas."""
+
+from pydantic import BaseModel
+
+
+class LedgerEntryResponse(BaseModel):
+    """Schema for a payment in the ledger, with the running revenue through it."""
+
+    id: str
+    appointment_id: str
+    patient_id: str
+    provider_id: str
+    service_id: str
+    amount: int
+    method: str
+    status: str
+    payment_date: str
+    # Paid amounts of every ledger payment up to and including this one, in
+    # date order (cents)
+    runningRevenue: int
+
+    class Config:
+        from_attributes = True
+
+
+class PaymentLedgerResponse(BaseModel):
+    """Schema for a paginated payments ledger page."""
+
+    data: list[LedgerEntryResponse]
+    nextCursor: str | None
+    hasMore: bool
+    # Running revenue per payment method after the last payment of the page
+    runningRevenueByMethod: dict[str, int]
+    # Only counted for the first page (see AppointmentListResponse.total)
+    total: int | None
@@ -6,11 +6,31 @@ any that are missing from the database. This is useful when:
 - Tables were created before indexes were added to models
 - Indexes were manually dropped
 - You want to ensure all model indexes exist in the database
+
+Partial indexes (postgresql_where) and covering indexes (postgresql_include)
+declared on the models are built with their WHERE and INCLUDE clauses.
+
+Indexes are built with CREATE INDEX CONCURRENTLY so production tables keep
+accepting writes while they build. A concurrent build that fails leaves an
+INVALID index behind; those are detected and rebuilt.
+
+After the index check, the script reports size and scan counts for every
+index (from pg_stat_user_indexes) and recommends indexes to drop: indexes that
+have never been scanned, and single-column indexes on a column with so few
+distinct values that the planner rarely benefits from them as a filter.
+Indexes that exist in the database but are no longer defined on the models
+(e.g. replaced by a partial index) are listed as well.
+
+Usage:
+    python scripts/add_indexes.py            # create/rebuild, then report
+    python scripts/add_indexes.py --dry-run  # report only, change nothing
 """
 
+import argparse
 import sys
 from pathlib import Path
 from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.exc import ProgrammingError
 
 # Add the backend directory to the path so we can import models
@@ -20,14 +40,34 @@ sys.path.insert(0, str(backend_dir))
 from db.models import Base
 from db.engine import create_sqlalchemy_engine
 
+# A leading column with at most this many distinct values (e.g. a status enum)
+# makes a poor index prefix
+LOW_CARDINALITY_THRESHOLD = 5
+
 
-def get_existing_indexes(engine, table_name: str):
+def get_existing_indexes(inspector, table_name: str):
     """Get all existing indexes for a table."""
-    inspector = inspect(engine)
     indexes = inspector.get_indexes(table_name)
     return {idx["name"] for idx in indexes}
 
 
+def get_invalid_indexes(conn) -> set[str]:
+    """Names of indexes left INVALID, e.g. by a failed concurrent build."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT index_class.relname
+            FROM pg_index
+            JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+            JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace
+            WHERE NOT pg_index.indisvalid
+              AND pg_namespace.nspname = current_schema()
+            """
+        )
+    )
+    return {name for (name,) in rows}
+
+
 def get_model_indexes():
     """Extract all indexes defined in the models."""
     model_indexes = {}
@@ -38,17 +78,32 @@ def get_model_indexes():
         # Get all indexes (both from index=True on columns and from __table_args__)
         # SQLAlchemy automatically creates Index objects for columns with index=True
         for index in table.indexes:
-            # Skip primary key indexes
-            if index.name.startswith("pk_") or any(
-                col.primary_key for col in index.columns
-            ):
+            # Skip indexes duplicating the primary key (composite indexes that
+            # include a primary key column, e.g. a keyset (created_date, id),
+            # are kept)
+            if index.name.startswith("pk_") or [col.name for col in index.columns] == [
+                col.name for col in table.primary_key.columns
+            ]:
                 continue
 
+            options = index.dialect_options["postgresql"]
+            where = options["where"]
             indexes.append(
                 {
                     "name": index.name,
                     "columns": [col.name for col in index.columns],
                     "unique": index.unique or False,
+                    "include": [
+                        getattr(col, "name", col) for col in options["include"] or []
+                    ],
+                    "where": str(
+                        where.compile(
+                            dialect=postgresql.dialect(),
+                            compile_kwargs={"literal_binds": True},
+                        )
+                    )
+                    if where is not None
+                    else None,
                 }
             )
 
@@ -57,25 +112,49 @@ def get_model_indexes():
     return model_indexes
 
 
-def create_index(engine, table_name: str, index_info: dict):
-    """Create an index if it doesn't exist."""
+def get_partitioned_tables(conn) -> set[str]:
+    """Names of partitioned tables (see db/partitions.py)."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT pg_class.relname
+            FROM pg_partitioned_table
+            JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+            WHERE pg_class.relnamespace = current_schema()::regnamespace
+            """
+        )
+    )
+    return {name for (name,) in rows}
+
+
+def create_index(conn, table_name: str, index_info: dict, concurrently: bool = True):
+    """
+    Create an index (concurrently by default) if it doesn't exist.
+
+    Postgres cannot build an index on a partitioned table concurrently, so
+    those are built with a plain CREATE INDEX (which blocks writes).
+    """
     index_name = index_info["name"]
     columns = index_info["columns"]
     unique = index_info.get("unique", False)
+    include = index_info.get("include")
+    where = index_info.get("where")
 
     # Build the CREATE INDEX statement with quoted column names
     columns_str = ", ".join(f'"{col}"' for col in columns)
 
+    # CONCURRENTLY avoids blocking writes while the index builds;
     # PostgreSQL supports IF NOT EXISTS for CREATE INDEX
-    if unique:
-        create_sql = f'CREATE UNIQUE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({columns_str})'
-    else:
-        create_sql = f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({columns_str})'
+    unique_str = "UNIQUE " if unique else ""
+    concurrently_str = "CONCURRENTLY " if concurrently else ""
+    create_sql = f'CREATE {unique_str}INDEX {concurrently_str}IF NOT EXISTS "{index_name}" ON "{table_name}" ({columns_str})'
+    if include:
+        create_sql += " INCLUDE (" + ", ".join(f'"{col}"' for col in include) + ")"
+    if where:
+        create_sql += f" WHERE {where}"
 
     try:
-        with engine.connect() as conn:
-            conn.execute(text(create_sql))
-            conn.commit()
+        conn.execute(text(create_sql))
         return True
     except ProgrammingError as e:
         # Index might already exist or there's a constraint issue
@@ -83,8 +162,225 @@ def create_index(engine, table_name: str, index_info: dict):
         return False
 
 
-def add_missing_indexes():
-    """Add any missing indexes to the database."""
+def drop_index(conn, index_name: str, concurrently: bool = True):
+    """
+    Drop an index (concurrently by default, without blocking reads or writes).
+
+    Postgres cannot drop an index of a partitioned table concurrently, so
+    those are dropped with a plain DROP INDEX.
+    """
+    concurrently_str = "CONCURRENTLY " if concurrently else ""
+    conn.execute(text(f'DROP INDEX {concurrently_str}IF EXISTS "{index_name}"'))
+
+
+def get_index_usage(conn) -> list[dict]:
+    """
+    Size, scan count, shape (key columns, partial) and leading-column
+    cardinality for every user index.
+
+    Indexes of a partitioned table's partitions are rolled up into the
+    parent index (see rollup_partition_indexes()).
+
+    Returns:
+        One dict per index, largest first
+    """
+    rows = conn.execute(
+        text(
+            """
+            SELECT
+                stats.relname AS table_name,
+                stats.indexrelname AS index_name,
+                stats.idx_scan AS scans,
+                stats.idx_tup_read AS tuples_read,
+                stats.idx_tup_fetch AS tuples_fetched,
+                pg_relation_size(stats.indexrelid) AS size_bytes,
+                pg_size_pretty(pg_relation_size(stats.indexrelid)) AS size,
+                pg_index.indisunique OR pg_index.indisprimary AS is_constraint,
+                pg_index.indnkeyatts AS key_columns,
+                pg_index.indpred IS NOT NULL AS is_partial,
+                parent_table.relname AS parent_table,
+                parent_index.relname AS parent_index,
+                leading_column.attname AS leading_column,
+                column_stats.n_distinct AS n_distinct,
+                table_class.reltuples AS table_rows
+            FROM pg_stat_user_indexes AS stats
+            JOIN pg_index ON pg_index.indexrelid = stats.indexrelid
+            JOIN pg_class AS table_class ON table_class.oid = stats.relid
+            LEFT JOIN pg_inherits AS index_inherits
+                ON index_inherits.inhrelid = stats.indexrelid
+            LEFT JOIN pg_class AS parent_index
+                ON parent_index.oid = index_inherits.inhparent
+            LEFT JOIN pg_inherits AS table_inherits
+                ON table_inherits.inhrelid = stats.relid
+            LEFT JOIN pg_class AS parent_table
+                ON parent_table.oid = table_inherits.inhparent
+            LEFT JOIN pg_attribute AS leading_column
+                ON leading_column.attrelid = stats.relid
+               AND leading_column.attnum = pg_index.indkey[0]
+            LEFT JOIN pg_stats AS column_stats
+                ON column_stats.schemaname = stats.schemaname
+               AND column_stats.tablename = stats.relname
+               AND column_stats.attname = leading_column.attname
+            ORDER BY pg_relation_size(stats.indexrelid) DESC
+            """
+        )
+    )
+    return rollup_partition_indexes([dict(row._mapping) for row in rows])
+
+
+def format_size(size_bytes: int) -> str:
+    """Human-readable size, like pg_size_pretty()."""
+    size = float(size_bytes)
+    for unit in ["bytes", "kB", "MB", "GB"]:
+        if size < 10240 or unit == "GB":
+            return f"{int(size)} {unit}" if unit == "bytes" else f"{round(size)} {unit}"
+        size /= 1024
+
+
+def rollup_partition_indexes(usage_rows: list[dict]) -> list[dict]:
+    """
+    Merge the per-partition copies of an index into one row for the parent.
+
+    Sizes, scans, tuple counts and row counts are summed; the leading column's distinct
+    value count is the largest seen in any partition.
+    """
+    rolled_up = []
+    parents = {}
+    for usage in usage_rows:
+        if usage["parent_index"] is None:
+            rolled_up.append({**usage, "partitioned": False})
+            continue
+
+        parent = parents.get(usage["parent_index"])
+        if parent is None:
+            parent = parents[usage["parent_index"]] = {
+                **usage,
+                "table_name": usage["parent_table"],
+                "index_name": usage["parent_index"],
+                "size_bytes": 0,
+                "scans": 0,
+                "tuples_read": 0,
+                "tuples_fetched": 0,
+                "n_distinct": None,
+                "table_rows": 0,
+                "partitioned": True,
+            }
+            rolled_up.append(parent)
+        parent["size_bytes"] += usage["size_bytes"]
+        parent["scans"] += usage["scans"]
+        parent["tuples_read"] += usage["tuples_read"]
+        parent["tuples_fetched"] += usage["tuples_fetched"]
+        parent["table_rows"] += max(usage["table_rows"], 0)
+        distinct = distinct_values(usage)
+        if distinct is not None:
+            parent["n_distinct"] = max(parent["n_distinct"] or 0, distinct)
+
+    for parent in parents.values():
+        parent["size"] = format_size(parent["size_bytes"])
+    rolled_up.sort(key=lambda usage: usage["size_bytes"], reverse=True)
+    return rolled_up
+
+
+def distinct_values(usage: dict) -> float | None:
+    """
+    Estimated number of distinct values of an index's leading column.
+
+    pg_stats.n_distinct is either a count (positive) or a fraction of the
+    table's rows (negative).
+    """
+    n_distinct = usage["n_distinct"]
+    if n_distinct is None:
+        return None
+    if n_distinct >= 0:
+        return n_distinct
+    return -n_distinct * max(usage["table_rows"], 0)
+
+
+def recommend_drops(
+    usage_rows: list[dict],
+    skip: set[str] | None = None,
+    model_index_names: set[str] | None = None,
+) -> list[tuple[dict, str]]:
+    """
+    Pick indexes worth dropping.
+
+    Indexes backing primary keys or unique constraints are never recommended.
+    The low-cardinality rule only applies to plain single-column indexes: a
+    composite index with an equality prefix (e.g. status, then a keyset) or a
+    partial index is selective through its other columns or its predicate.
+    Nor does it apply to indexes scanned mostly index-only (e.g. counts per
+    status), which never fetch the many rows a poor filter would.
+
+    Args:
+        usage_rows: Output of get_index_usage()
+        skip: Index names to leave out (e.g. just built, so never scanned yet)
+        model_index_names: Index names defined on the models; any other index
+            is reported as no longer defined
+
+    Returns:
+        (index usage, reason) pairs
+    """
+    skip = skip or set()
+    recommendations = []
+    for usage in usage_rows:
+        if usage["is_constraint"] or usage["index_name"] in skip:
+            continue
+
+        if (
+            model_index_names is not None
+            and usage["index_name"] not in model_index_names
+        ):
+            recommendations.append((usage, "not defined on the models"))
+            continue
+
+        if usage["scans"] == 0:
+            recommendations.append((usage, "never scanned"))
+            continue
+
+        if usage["key_columns"] > 1 or usage["is_partial"]:
+            continue
+        if usage["tuples_fetched"] * 2 < usage["tuples_read"]:
+            continue
+        distinct = distinct_values(usage)
+        if distinct is not None and distinct <= LOW_CARDINALITY_THRESHOLD:
+            recommendations.append(
+                (
+                    usage,
+                    f"leading column '{usage['leading_column']}' has only "
+                    f"~{int(distinct)} distinct values",
+                )
+            )
+    return recommendations
+
+
+def print_index_report(conn, built: set[str], model_index_names: set[str]):
+    """Print index sizes and scan counts, then drop recommendations."""
+    usage_rows = get_index_usage(conn)
+
+    print("\nIndex usage (scans since statistics were last reset):")
+    print("=" * 50)
+    for usage in usage_rows:
+        print(
+            f"  {usage['table_name']}.{usage['index_name']}: "
+            f"{usage['size']}, {usage['scans']} scans"
+        )
+
+    recommendations = recommend_drops(
+        usage_rows, skip=built, model_index_names=model_index_names
+    )
+    print("\nRecommended drops:")
+    print("=" * 50)
+    if not recommendations:
+        print("  ✓ No indexes to drop")
+    for usage, reason in recommendations:
+        print(f"  - {usage['index_name']} ({usage['size']}): {reason}")
+        # Partitioned indexes cannot be dropped concurrently
+        concurrently = "" if usage["partitioned"] else "CONCURRENTLY "
+        print(f'      DROP INDEX {concurrently}"{usage["index_name"]}";')
+
+
+def add_missing_indexes(dry_run: bool = False):
+    """Add any missing indexes to the database and report on index usage."""
     engine = create_sqlalchemy_engine()
 
     try:
@@ -94,36 +390,82 @@ def add_missing_indexes():
         model_indexes = get_model_indexes()
         total_added = 0
         total_existing = 0
+        total_rebuilt = 0
+        built = set()
 
-        for table_name, indexes in model_indexes.items():
-            if not indexes:
-                continue
+        # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            inspector = inspect(conn)
+            invalid_indexes = get_invalid_indexes(conn)
+            partitioned_tables = get_partitioned_tables(conn)
 
-            print(f"\nTable: {table_name}")
-            existing_indexes = get_existing_indexes(engine, table_name)
+            for table_name, indexes in model_indexes.items():
+                if not indexes:
+                    continue
 
-            for index_info in indexes:
-                index_name = index_info["name"]
+                print(f"\nTable: {table_name}")
+                existing_indexes = get_existing_indexes(inspector, table_name)
 
-                if index_name in existing_indexes:
-                    print(f"  ✓ Index '{index_name}' already exists")
-                    total_existing += 1
-                else:
+                for index_info in indexes:
+                    index_name = index_info["name"]
                     columns_display = ", ".join(index_info["columns"])
+                    if index_info["include"]:
+                        columns_display += " INCLUDE " + ", ".join(index_info["include"])
+                    if index_info["where"]:
+                        columns_display += f" WHERE {index_info['where']}"
                     is_composite = len(index_info["columns"]) > 1
                     index_type = "composite" if is_composite else "single-column"
-                    print(
-                        f"  + Creating {index_type} index '{index_name}' on ({columns_display})"
-                    )
-                    if create_index(engine, table_name, index_info):
-                        total_added += 1
+
+                    if index_name in invalid_indexes:
+                        print(f"  ↻ Rebuilding invalid index '{index_name}'")
+                        if not dry_run:
+                            drop_index(
+                                conn,
+                                index_name,
+                                concurrently=table_name not in partitioned_tables,
+                            )
+                            if create_index(
+                                conn,
+                                table_name,
+                                index_info,
+                                concurrently=table_name not in partitioned_tables,
+                            ):
+                                total_rebuilt += 1
+                                built.add(index_name)
+                    elif index_name in existing_indexes:
+                        print(f"  ✓ Index '{index_name}' already exists")
+                        total_existing += 1
                     else:
-                        total_existing += 1  # Count as existing if creation failed (likely already exists)
+                        print(
+                            f"  + Creating {index_type} index '{index_name}' on ({columns_display})"
+                        )
+                        if dry_run:
+                            continue
+                        if create_index(
+                            conn,
+                            table_name,
+                            index_info,
+                            concurrently=table_name not in partitioned_tables,
+                        ):
+                            total_added += 1
+                            built.add(index_name)
+                        else:
+                            total_existing += 1  # Count as existing if creation failed (likely already exists)
+
+            print("\n" + "=" * 50)
+            print(f"✓ Index check completed!")
+            print(f"  - Existing indexes: {total_existing}")
+            print(f"  - New indexes created: {total_added}")
+            print(f"  - Invalid indexes rebuilt: {total_rebuilt}")
+            if dry_run:
+                print("  (dry run: no changes were made)")
 
-        print("\n" + "=" * 50)
-        print(f"✓ Index check completed!")
-        print(f"  - Existing indexes: {total_existing}")
-        print(f"  - New indexes created: {total_added}")
+            model_index_names = {
+                index.name
+                for table in Base.metadata.tables.values()
+                for index in table.indexes
+            }
+            print_index_report(conn, built, model_index_names)
 
     except Exception as e:
         print(f"✗ Failed to add indexes: {e}")
@@ -134,4 +476,11 @@ def add_missing_indexes():
 
 
 if __name__ == "__main__":
-    add_missing_indexes()
+    parser = argparse.ArgumentParser(description="Add missing model indexes.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report missing/invalid indexes and usage, change nothing",
+    )
+    args = parser.parse_args()
+    add_missing_indexes(dry_run=args.dry_run)
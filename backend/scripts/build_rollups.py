@@ -0,0 +1,149 @@
+"""
+Script to build the daily rollups and sketches behind approximate analytics.
+
+Approximate analytics (approximate=true) merge one stored rollup per day of
+the window instead of scanning payments and appointment services; days with
+no stored rollup are sketched from the raw rows on every request. Service
+affinity sums the daily service pair counts stored alongside. Build the
+whole history once, then keep recent days fresh. See db/rollups.py.
+
+Commands:
+    # Build every day with payments or appointment services
+    python scripts/build_rollups.py
+
+    # Rebuild the last 3 days (e.g. nightly from cron, to pick up late edits)
+    python scripts/build_rollups.py --days 3
+
+    # Rebuild a range (after a backfill or bulk edit)
+    python scripts/build_rollups.py --start 2024-01-01 --end 2024-06-30
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+# Add the backend directory to the path so we can import models
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from db.engine import create_sqlalchemy_engine
+from db.models import (
+    AnalyticsDailyRollup,
+    AnalyticsDailyServicePair,
+    AnalyticsDailySketch,
+    AppointmentService,
+    Payment,
+)
+from db.partitions import add_months, month_start
+from db.rollups import compute_daily_rollups, store_daily_rollups
+
+
+def data_range(db: Session) -> tuple[date, date] | None:
+    """First and last day with a payment or appointment service."""
+    days = []
+    for column in (Payment.date, AppointmentService.start):
+        first, last = db.query(func.min(column), func.max(column)).one()
+        if first is not None:
+            days += [first.date(), last.date()]
+    return (min(days), max(days)) if days else None
+
+
+# Tables holding the rollups, emptied whenever the raw data is replaced
+ROLLUP_TABLES = [
+    AnalyticsDailyRollup.__table__,
+    AnalyticsDailySketch.__table__,
+    AnalyticsDailyServicePair.__table__,
+]
+
+
+def upgrade_rollup_tables(engine):
+    """
+    Create the rollup tables if missing, and add the service pair counts to
+    databases whose rollup tables predate them.
+    """
+    for table in ROLLUP_TABLES:
+        table.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE analytics_daily_rollup "
+                "ADD COLUMN IF NOT EXISTS appointments INTEGER"
+            )
+        )
+
+
+def build_range(db: Session, start: date, end: date):
+    """Build and store the rollups of every day from start to end, a month at a time."""
+    print(f"Building daily rollups from {start} to {end}...")
+    # One transaction per month, so sketches of a long history never
+    # pile up in memory and an interrupted build keeps finished months
+    month = month_start(start)
+    while month <= end:
+        chunk_start = max(start, month)
+        chunk_end = min(end, add_months(month, 1) - timedelta(days=1))
+        rollups = compute_daily_rollups(db, chunk_start, chunk_end)
+        store_daily_rollups(db, rollups)
+        db.commit()
+        sketches = sum(len(rollup.sketches) for rollup in rollups.values())
+        pairs = sum(len(rollup.service_pairs) for rollup in rollups.values())
+        print(
+            f"  ✓ {month:%Y-%m}: {len(rollups)} days, {sketches} sketches, "
+            f"{pairs} service pairs"
+        )
+        month = add_months(month, 1)
+
+
+def build_rollups(args):
+    """Build and store the rollups of every day in the range."""
+    engine = create_sqlalchemy_engine()
+    upgrade_rollup_tables(engine)
+    with Session(engine) as db:
+        if args.days:
+            end = date.today()
+            start = end - timedelta(days=args.days - 1)
+        else:
+            bounds = data_range(db)
+            if bounds is None and not (args.start and args.end):
+                print("  - No payments or appointment services to roll up")
+                return
+            start = args.start or bounds[0]
+            end = args.end or bounds[1]
+        if start > end:
+            raise ValueError(f"--start {start} is after --end {end}")
+        build_range(db, start, end)
+    print("✓ Daily rollups built")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the daily rollups and sketches behind approximate analytics."
+    )
+    parser.add_argument(
+        "--start",
+        type=date.fromisoformat,
+        help="First day to build (default: first day with data)",
+    )
+    parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        help="Last day to build (default: last day with data)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        help="Only rebuild the last N days, through today",
+    )
+
+    args = parser.parse_args()
+    try:
+        build_rollups(args)
+    except Exception as e:
+        print(f"✗ Building rollups failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,324 @@
+"""
+Script to capture and check the query plans of every endpoint.
+
+Index changes are easy to get wrong silently: a query that used an index can
+fall back to a sequential scan without any test failing. This script drives
+every route of the in-process app (the same scenarios as the benchmark suite),
+records each SQL statement it issues, runs it again with
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and stores a normalized plan:
+node types, relations and indexes, without costs or timings.
+
+Commands:
+    # Store the current plans as the baseline
+    python scripts/explain_plans.py capture --out plans/baseline.json
+
+    # Compare the current plans against a baseline; exits with status 1 when
+    # a plan regressed (CI friendly)
+    python scripts/explain_plans.py check --baseline plans/baseline.json
+
+Statements are keyed by scenario and ordinal (the order in which the
+scenario first issues each distinct statement), so a rewritten query is still
+compared with the plan of the query it replaced. A plan regresses when:
+- a relation that the baseline reached through an index is now sequentially scanned
+- the number of shared buffers touched grows by more than --buffer-tolerance
+  (and by at least --min-buffer-increase blocks, to ignore noise on small tables)
+
+check also fails when a scenario issues statements the baseline does not have,
+or no longer issues some it has: the statements can then no longer be matched
+up, so recapture the baseline once the change is intended. A scenario whose
+requests fail is reported and skipped; both commands then exit with status 1.
+
+Run both commands against a database seeded the same way (e.g. with
+scripts/generate_data.py at a fixed scale and seed), otherwise plans differ
+for reasons unrelated to the code.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+import httpx
+from sqlalchemy import event
+
+# Add the backend directory to the path so we can import the app
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from benchmarks.scenarios import prepare_scenarios
+
+# Node types that reach a relation through an index
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+
+# Statements that have a plan to explain
+EXPLAINABLE = ("SELECT", "WITH")
+
+# Plan keys kept when normalizing (everything else is cost/timing noise)
+PLAN_KEYS = [
+    "Node Type",
+    "Relation Name",
+    "Index Name",
+    "Join Type",
+    "Strategy",
+    "Parent Relationship",
+]
+
+
+def statement_key(scenario: str, ordinal: int) -> str:
+    """Key of the scenario's ordinal-th distinct statement (from 1)."""
+    return f"{scenario}:{ordinal:03d}"
+
+
+async def collect_statements() -> tuple[dict[str, dict], list[str]]:
+    """
+    Drive every route in-process and record the SQL statements it issues.
+
+    Returns:
+        Tuple of ({key: {"scenario", "sql", "parameters"}} for each distinct
+        statement, description of each failed scenario)
+    """
+    from main import app
+    from db.session import engine
+
+    statements = {}
+    failures = []
+    current = {"scenario": None}
+    # Key of each distinct statement of the current scenario, in issue order
+    keys_by_sql: dict[str, str] = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Only queries have plans (sessions also issue e.g. SET LOCAL)
+        if current["scenario"] and statement.lstrip().upper().startswith(EXPLAINABLE):
+            key = keys_by_sql.setdefault(
+                statement, statement_key(current["scenario"], len(keys_by_sql) + 1)
+            )
+            # Later requests overwrite earlier ones, so cursor scenarios keep
+            # the parameters of the deepest page
+            statements[key] = {
+                "scenario": current["scenario"],
+                "sql": statement,
+                "parameters": parameters,
+            }
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://plans"
+        )
+        async with client:
+            for scenario in await prepare_scenarios(client):
+                current["scenario"] = scenario.name
+                keys_by_sql.clear()
+                # First and last URLs cover e.g. the first and deepest cursor page
+                for url in dict.fromkeys([scenario.urls[0], scenario.urls[-1]]):
+                    response = await client.get(url)
+                    if response.is_error:
+                        failures.append(
+                            f"{scenario.name}: GET {url} returned {response.status_code}"
+                        )
+                        # A partial scenario would look like dropped statements
+                        for key in [
+                            key
+                            for key, info in statements.items()
+                            if info["scenario"] == scenario.name
+                        ]:
+                            del statements[key]
+                        break
+                current["scenario"] = None
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    return statements, failures
+
+
+def normalize_plan(node: dict) -> dict:
+    """Strip costs and timings from an EXPLAIN JSON plan node, recursively."""
+    normalized = {key: node[key] for key in PLAN_KEYS if key in node}
+    children = node.get("Plans")
+    if children:
+        normalized["Plans"] = [normalize_plan(child) for child in children]
+    return normalized
+
+
+def scanned_relations(node: dict, node_types: set[str]) -> set[str]:
+    """Relations scanned by any node of the given types in a plan tree."""
+    relations = set()
+    if node.get("Node Type") in node_types and "Relation Name" in node:
+        relations.add(node["Relation Name"])
+    for child in node.get("Plans", []):
+        relations |= scanned_relations(child, node_types)
+    return relations
+
+
+def explain(statements: dict[str, dict]) -> dict[str, dict]:
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for every recorded statement.
+
+    Each statement runs in a transaction that is rolled back afterwards.
+
+    Returns:
+        {key: {"scenario", "sql", "plan", "buffers", "seq_scans", "index_scans"}}
+    """
+    from db.session import engine
+
+    plans = {}
+    raw_connection = engine.raw_connection()
+    try:
+        cursor = raw_connection.cursor()
+        for key, info in sorted(statements.items()):
+            cursor.execute(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + info["sql"],
+                info["parameters"],
+            )
+            result = cursor.fetchone()[0]
+            raw_connection.rollback()
+
+            root = result[0]["Plan"]
+            plan = normalize_plan(root)
+            plans[key] = {
+                "scenario": info["scenario"],
+                "sql": info["sql"],
+                "plan": plan,
+                "buffers": root.get("Shared Hit Blocks", 0)
+                + root.get("Shared Read Blocks", 0),
+                "seq_scans": sorted(scanned_relations(plan, {"Seq Scan"})),
+                "index_scans": sorted(scanned_relations(plan, INDEX_NODE_TYPES)),
+            }
+    finally:
+        raw_connection.close()
+    return plans
+
+
+def capture_plans() -> tuple[dict[str, dict], list[str]]:
+    """
+    Collect every endpoint's statements and explain them.
+
+    Returns:
+        Tuple of (plans by statement key, description of each failed scenario)
+    """
+    # Per-request timing logs are noise here
+    logging.getLogger("request_timing").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    statements, failures = asyncio.run(collect_statements())
+    for failure in failures:
+        print(f"  ✗ Scenario failed: {failure}")
+    return explain(statements), failures
+
+
+def find_regressions(
+    baseline: dict[str, dict],
+    current: dict[str, dict],
+    buffer_tolerance: float,
+    min_buffer_increase: int,
+) -> list[str]:
+    """
+    Compare current plans against the baseline.
+
+    Returns:
+        Human-readable description of each regression
+    """
+    regressions = []
+    for key, plan in sorted(current.items()):
+        old = baseline.get(key)
+        if old is None:
+            continue
+
+        lost_index = set(plan["seq_scans"]) & set(old["index_scans"])
+        for relation in sorted(lost_index):
+            regressions.append(
+                f"{key}: sequential scan on '{relation}' (baseline used an index)"
+            )
+
+        increase = plan["buffers"] - old["buffers"]
+        if (
+            increase >= min_buffer_increase
+            and plan["buffers"] > old["buffers"] * (1 + buffer_tolerance)
+        ):
+            regressions.append(
+                f"{key}: shared buffers {old['buffers']} -> {plan['buffers']}"
+            )
+    return regressions
+
+
+def capture(args):
+    """Capture plans and write them to a JSON file."""
+    plans, failures = capture_plans()
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(plans, indent=2, sort_keys=True))
+    print(f"✓ Captured {len(plans)} plans to {args.out}")
+    if failures:
+        print(f"✗ {len(failures)} scenario(s) failed and are missing from the baseline")
+        sys.exit(1)
+
+
+def check(args):
+    """Capture plans and compare them against a baseline."""
+    baseline = json.loads(args.baseline.read_text())
+    current, failures = capture_plans()
+
+    new_statements = sorted(set(current) - set(baseline))
+    for key in new_statements:
+        print(f"  ✗ New statement (not in baseline): {key}")
+        print(f"      {current[key]['sql']}")
+    dropped_statements = sorted(set(baseline) - set(current))
+    for key in dropped_statements:
+        print(f"  ✗ Statement no longer issued: {key}")
+        print(f"      {baseline[key]['sql']}")
+    for key in sorted(set(current) & set(baseline)):
+        if current[key]["sql"] != baseline[key]["sql"]:
+            print(f"  ~ Rewritten statement (compared with the baseline's): {key}")
+
+    regressions = find_regressions(
+        baseline, current, args.buffer_tolerance, args.min_buffer_increase
+    )
+    for regression in regressions:
+        print(f"  ✗ {regression}")
+
+    failed = False
+    if failures:
+        print(f"✗ {len(failures)} scenario(s) failed")
+        failed = True
+    if new_statements or dropped_statements:
+        print(
+            f"✗ {len(new_statements)} new and {len(dropped_statements)} dropped "
+            "statement(s): recapture the baseline if this is intended"
+        )
+        failed = True
+    if regressions:
+        print(f"✗ {len(regressions)} plan regression(s) found")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"✓ {len(current)} plans checked, no regressions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture and check endpoint query plans.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = subparsers.add_parser("capture", help="Store the current plans")
+    capture_parser.add_argument("--out", type=Path, default=Path("plans/baseline.json"))
+    capture_parser.set_defaults(func=capture)
+
+    check_parser = subparsers.add_parser("check", help="Compare against a baseline")
+    check_parser.add_argument(
+        "--baseline", type=Path, default=Path("plans/baseline.json")
+    )
+    check_parser.add_argument(
+        "--buffer-tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative growth in shared buffers (default 0.5 = 50%%)",
+    )
+    check_parser.add_argument(
+        "--min-buffer-increase",
+        type=int,
+        default=100,
+        help="Ignore buffer growth smaller than this many blocks (default 100)",
+    )
+    check_parser.set_defaults(func=check)
+
+    args = parser.parse_args()
+    args.func(args)
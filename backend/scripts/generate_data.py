@@ -0,0 +1,540 @@
+"""
+Script to generate synthetic seed data at a configurable scale.
+
+The shipped seed_data is too small to expose scaling problems, so this script
+produces statistically similar data at N times the volume. Enum distributions,
+appointments per patient, services per appointment, scheduling times and payment
+behaviour are all measured from the shipped seed_data and then re-sampled, while
+keeping the same foreign-key structure:
+
+- Services are the shipped catalog (copied as-is)
+- Providers scale with the scale factor
+- Patients, appointments, appointment services and payments scale with the
+  scale factor and are generated in independent chunks across all CPU cores
+
+Output is written as headerless CSV files, one per table and chunk, ready to be
+loaded with PostgreSQL COPY (see --load). Enum columns are written as the enum
+names because that is how SQLAlchemy stores them in the database.
+
+Output is deterministic for a given --seed and --scale, regardless of the
+number of worker processes.
+
+Usage:
+    python scripts/generate_data.py --scale 10 --out /tmp/decoda_x10
+    python scripts/generate_data.py --scale 10 --out /tmp/decoda_x10 --load --truncate
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+# Add the backend directory to the path so we can import models
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from db.models import (
+    Patient,
+    Provider,
+    Service,
+    Appointment,
+    AppointmentService,
+    Payment,
+    GenderEnum,
+    SourceEnum,
+    PaymentMethodEnum,
+    PaymentStatusEnum,
+    AppointmentStatusEnum,
+    SeedChecksum,
+)
+from db.engine import create_sqlalchemy_engine
+from db.partitions import PARTITION_KEYS, ensure_partitions, is_partitioned
+from scripts.build_rollups import (
+    ROLLUP_TABLES,
+    build_range,
+    data_range,
+    upgrade_rollup_tables,
+)
+
+# Get the project root directory (parent of backend)
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+SEED_DATA_DIR = PROJECT_ROOT / "seed_data"
+
+# Patients per generated chunk (the unit of parallel work)
+CHUNK_SIZE = 10_000
+
+# Tables in foreign-key order, with the column order used in the CSV files
+TABLES = [
+    Provider.__table__,
+    Service.__table__,
+    Patient.__table__,
+    Appointment.__table__,
+    AppointmentService.__table__,
+    Payment.__table__,
+]
+COLUMNS = {table.name: [column.name for column in table.columns] for table in TABLES}
+
+# Enum types per (table, column); values are written as the names SQLAlchemy stores
+ENUMS = {
+    ("patient", "gender"): GenderEnum,
+    ("patient", "source"): SourceEnum,
+    ("appointment", "status"): AppointmentStatusEnum,
+    ("payment", "method"): PaymentMethodEnum,
+    ("payment", "status"): PaymentStatusEnum,
+}
+
+
+def enum_name(table_name: str, column: str, value: str) -> str:
+    """Convert an enum value (e.g. "paid") to its stored name (e.g. "PAID")."""
+    return ENUMS[(table_name, column)](value).name
+
+
+def load_json(name: str) -> list:
+    """Load a shipped seed JSON file."""
+    with open(SEED_DATA_DIR / f"{name}.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def weights(counter: Counter) -> tuple[list, list]:
+    """Split a Counter into parallel (values, weights) lists, sorted for determinism."""
+    items = sorted(counter.items(), key=lambda kv: str(kv[0]))
+    return [value for value, _ in items], [count for _, count in items]
+
+
+def build_profile() -> dict:
+    """
+    Measure the distributions of the shipped seed data.
+
+    Returns:
+        Picklable dictionary of (values, weights) pairs and sample pools that
+        workers use to generate statistically similar records
+    """
+    patients = load_json("patient")
+    appointments = load_json("appointment")
+    appointment_services = load_json("appointment_service")
+    payments = load_json("payment")
+    services = load_json("service")
+
+    parse = datetime.fromisoformat
+
+    services_by_appointment = defaultdict(list)
+    for item in appointment_services:
+        services_by_appointment[item["appointment_id"]].append(item)
+    for items in services_by_appointment.values():
+        items.sort(key=lambda item: item["start"])
+
+    paid_appointments = {payment["appointment_id"] for payment in payments}
+    appointments_by_patient = Counter(item["patient_id"] for item in appointments)
+    appointments_per_patient = Counter(appointments_by_patient.values())
+    appointments_per_patient[0] = len(patients) - len(appointments_by_patient)
+
+    # Payment probability per appointment status
+    status_counts = Counter(item["status"] for item in appointments)
+    paid_by_status = Counter(
+        item["status"] for item in appointments if item["id"] in paid_appointments
+    )
+
+    lead_days = []
+    for item in appointments:
+        first = services_by_appointment[item["id"]][0]
+        lead_days.append((parse(first["start"]) - parse(item["created_date"])).days)
+
+    payment_offsets = []
+    payment_created_offsets = []
+    for payment in payments:
+        first = services_by_appointment[payment["appointment_id"]][0]
+        date = parse(payment["date"])
+        payment_offsets.append(int((date - parse(first["start"])).total_seconds() // 60))
+        payment_created_offsets.append((parse(payment["created_date"]) - date).days)
+
+    starts = [parse(item["start"]) for item in appointment_services]
+    created = [parse(item["created_date"]) for item in appointments]
+    patient_created = [parse(item["created_date"]) for item in patients]
+    birth_dates = [parse(item["date_of_birth"]) for item in patients]
+
+    return {
+        "services": services,
+        "first_names": sorted({item["first_name"] for item in patients}),
+        "last_names": sorted({item["last_name"] for item in patients}),
+        "addresses": sorted({item["address"] for item in patients}),
+        "gender": weights(Counter(item["gender"] for item in patients)),
+        "source": weights(Counter(item["source"] for item in patients)),
+        "appointment_status": weights(status_counts),
+        "paid_probability": {
+            status: paid_by_status[status] / count
+            for status, count in status_counts.items()
+        },
+        "payment_status": weights(Counter(item["status"] for item in payments)),
+        "method": weights(Counter(item["method"] for item in payments)),
+        "appointments_per_patient": weights(appointments_per_patient),
+        "services_per_appointment": weights(
+            Counter(len(items) for items in services_by_appointment.values())
+        ),
+        "providers_per_appointment": weights(
+            Counter(
+                len({item["provider_id"] for item in items})
+                for items in services_by_appointment.values()
+            )
+        ),
+        "start_hour": weights(Counter(start.hour for start in starts)),
+        "start_minute": weights(Counter(start.minute for start in starts)),
+        "lead_days": sorted(lead_days),
+        "payment_offsets": sorted(payment_offsets),
+        "payment_created_offsets": sorted(payment_created_offsets),
+        "appointment_created_range": (min(created), max(created)),
+        "patient_created_range": (min(patient_created), max(patient_created)),
+        "birth_date_range": (min(birth_dates), max(birth_dates)),
+    }
+
+
+def pick(rng: random.Random, distribution: tuple[list, list]):
+    """Draw one value from a (values, weights) distribution."""
+    values, value_weights = distribution
+    return rng.choices(values, value_weights)[0]
+
+
+def random_datetime(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    """Uniform datetime between start and end, truncated to whole seconds."""
+    span = int((end - start).total_seconds())
+    return start + timedelta(seconds=rng.randint(0, span))
+
+
+def quarter_hour(value: datetime) -> datetime:
+    """Round a datetime down to the quarter hour, like the shipped schedule."""
+    return value.replace(minute=value.minute - value.minute % 15, second=0, microsecond=0)
+
+
+def chunk_rng(seed: int, chunk: int) -> random.Random:
+    """Independent RNG per chunk so output does not depend on worker scheduling."""
+    return random.Random(f"{seed}:{chunk}")
+
+
+def generate_providers(profile: dict, scale: float, seed: int) -> list[list]:
+    """Generate providers, scaled from the shipped provider count."""
+    rng = chunk_rng(seed, -1)
+    count = max(1, math.ceil(len(load_json("provider")) * scale))
+    start, end = profile["patient_created_range"]
+    rows = []
+    for index in range(count):
+        first_name = rng.choice(profile["first_names"])
+        last_name = rng.choice(profile["last_names"])
+        rows.append(
+            [
+                f"prv_g{index:015x}",
+                first_name,
+                last_name,
+                f"{first_name}.{last_name}.{index}@example.org".lower(),
+                f"({rng.randint(200, 999)}){rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                (start - timedelta(days=1)).isoformat(),
+            ]
+        )
+    return rows
+
+
+def generate_chunk(
+    profile: dict,
+    provider_ids: list[str],
+    seed: int,
+    chunk: int,
+    patient_count: int,
+    out_dir: str,
+) -> dict[str, int]:
+    """
+    Generate one chunk of patients and all of their dependent rows.
+
+    Each chunk only references its own patients plus the shared providers and
+    services, so chunks are independent and can be generated in parallel.
+
+    Returns:
+        Number of rows written per table
+    """
+    rng = chunk_rng(seed, chunk)
+    services = profile["services"]
+    patient_start, patient_end = profile["patient_created_range"]
+    appointment_start, appointment_end = profile["appointment_created_range"]
+    birth_start, birth_end = profile["birth_date_range"]
+
+    rows = {name: [] for name in ("patient", "appointment", "appointment_service", "payment")}
+    base = chunk * CHUNK_SIZE
+
+    for offset in range(patient_count):
+        index = base + offset
+        patient_id = f"pat_g{index:015x}"
+        first_name = rng.choice(profile["first_names"])
+        last_name = rng.choice(profile["last_names"])
+        rows["patient"].append(
+            [
+                patient_id,
+                first_name,
+                last_name,
+                random_datetime(rng, birth_start, birth_end)
+                .replace(hour=0, minute=0, second=0)
+                .isoformat(),
+                enum_name("patient", "gender", pick(rng, profile["gender"])),
+                rng.choice(profile["addresses"]),
+                f"({rng.randint(200, 999)}){rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                f"{first_name}.{last_name}.{index}@example.com".lower(),
+                enum_name("patient", "source", pick(rng, profile["source"])),
+                random_datetime(rng, patient_start, patient_end).isoformat(),
+            ]
+        )
+
+        for visit in range(pick(rng, profile["appointments_per_patient"])):
+            appointment_id = f"apt_g{index:011x}{visit:04x}"
+            status = pick(rng, profile["appointment_status"])
+            created_date = quarter_hour(
+                random_datetime(rng, appointment_start, appointment_end)
+            )
+            rows["appointment"].append(
+                [
+                    appointment_id,
+                    patient_id,
+                    enum_name("appointment", "status", status),
+                    created_date.isoformat(),
+                ]
+            )
+
+            # Schedule the services back to back, 15 minutes apart
+            day = created_date + timedelta(days=rng.choice(profile["lead_days"]))
+            start = day.replace(
+                hour=pick(rng, profile["start_hour"]),
+                minute=pick(rng, profile["start_minute"]),
+                second=0,
+                microsecond=0,
+            )
+            service_count = pick(rng, profile["services_per_appointment"])
+            booked = rng.sample(range(len(services)), k=min(service_count, len(services)))
+            providers = rng.sample(
+                provider_ids,
+                k=min(pick(rng, profile["providers_per_appointment"]), len(provider_ids)),
+            )
+            first_start = start
+            total_price = 0
+            for position, service_index in enumerate(booked):
+                service = services[service_index]
+                provider_id = providers[min(position, len(providers) - 1)]
+                end = start + timedelta(minutes=service["duration"])
+                rows["appointment_service"].append(
+                    [
+                        appointment_id,
+                        service["id"],
+                        provider_id,
+                        start.isoformat(),
+                        end.isoformat(),
+                    ]
+                )
+                total_price += service["price"]
+                start = end + timedelta(minutes=15)
+
+            # Payment covers every service and references the first one
+            if rng.random() < profile["paid_probability"].get(status, 0):
+                date = first_start + timedelta(
+                    minutes=rng.choice(profile["payment_offsets"])
+                )
+                rows["payment"].append(
+                    [
+                        f"pay_g{index:011x}{visit:04x}",
+                        patient_id,
+                        appointment_id,
+                        providers[0],
+                        services[booked[0]]["id"],
+                        total_price,
+                        date.isoformat(),
+                        enum_name("payment", "method", pick(rng, profile["method"])),
+                        enum_name(
+                            "payment", "status", pick(rng, profile["payment_status"])
+                        ),
+                        (
+                            date
+                            + timedelta(days=rng.choice(profile["payment_created_offsets"]))
+                        ).isoformat(),
+                    ]
+                )
+
+    for name, table_rows in rows.items():
+        write_csv(Path(out_dir) / f"{name}.{chunk:05d}.csv", table_rows)
+    return {name: len(table_rows) for name, table_rows in rows.items()}
+
+
+def write_csv(path: Path, rows: list[list]):
+    """Write rows as a headerless CSV file suitable for COPY ... (FORMAT csv)."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+
+def generate(
+    scale: float,
+    out_dir: Path,
+    seed: int = 42,
+    workers: int | None = None,
+) -> dict[str, int]:
+    """
+    Generate a full dataset at the given scale factor.
+
+    Args:
+        scale: Multiple of the shipped seed_data volume (e.g. 10 for 40k patients)
+        out_dir: Directory to write the CSV files to
+        seed: Base random seed; the same seed and scale always produce the same data
+        workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        Number of rows written per table
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for stale in out_dir.glob("*.csv"):
+        stale.unlink()
+
+    profile = build_profile()
+    totals = Counter()
+
+    providers = generate_providers(profile, scale, seed)
+    write_csv(out_dir / "provider.00000.csv", providers)
+    totals["provider"] = len(providers)
+
+    services = [
+        [
+            item["id"],
+            item["name"],
+            item["description"],
+            item["price"],
+            item["duration"],
+            item["created_date"],
+        ]
+        for item in profile["services"]
+    ]
+    write_csv(out_dir / "service.00000.csv", services)
+    totals["service"] = len(services)
+
+    patient_total = max(1, math.ceil(len(load_json("patient")) * scale))
+    chunk_count = math.ceil(patient_total / CHUNK_SIZE)
+    provider_ids = [row[0] for row in providers]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(
+                generate_chunk,
+                profile,
+                provider_ids,
+                seed,
+                chunk,
+                min(CHUNK_SIZE, patient_total - chunk * CHUNK_SIZE),
+                str(out_dir),
+            )
+            for chunk in range(chunk_count)
+        ]
+        for future in futures:
+            totals.update(future.result())
+
+    return dict(totals)
+
+
+def load(out_dir: Path, truncate: bool = False):
+    """
+    Load generated CSV files into the database with COPY.
+
+    Args:
+        out_dir: Directory produced by generate()
+        truncate: Empty the tables first (required unless the database is empty)
+
+    The daily rollups behind approximate analytics are rebuilt from the
+    loaded rows afterwards.
+    """
+    engine = create_sqlalchemy_engine()
+    upgrade_rollup_tables(engine)
+    raw_connection = engine.raw_connection()
+    try:
+        cursor = raw_connection.cursor()
+        if truncate:
+            # The seed sync manifest and the rollups describe the old rows,
+            # so they go too
+            table_list = ", ".join(
+                f'"{name}"'
+                for name in [table.name for table in TABLES + ROLLUP_TABLES]
+                + [SeedChecksum.__tablename__]
+            )
+            cursor.execute(f"TRUNCATE {table_list} CASCADE")
+
+        for table in TABLES:
+            columns = ", ".join(f'"{column}"' for column in COLUMNS[table.name])
+            copy_sql = f'COPY "{table.name}" ({columns}) FROM STDIN WITH (FORMAT csv)'
+            for path in sorted(out_dir.glob(f"{table.name}.*.csv")):
+                with open(path, "r", encoding="utf-8") as f:
+                    cursor.copy_expert(copy_sql, f)
+            print(f"  ✓ Loaded {table.name}")
+
+        raw_connection.commit()
+
+        # On partitioned tables, rows outside the existing months landed in
+        # the DEFAULT partition; give them their own monthly partitions
+        with engine.begin() as conn:
+            for table_name in PARTITION_KEYS:
+                if is_partitioned(conn, table_name):
+                    ensure_partitions(conn, table_name)
+
+        # VACUUM sets the visibility map bits that index-only scans (e.g. the
+        # partial covering payment indexes) rely on; it cannot run in a transaction
+        raw_connection.driver_connection.autocommit = True
+        for table in TABLES:
+            cursor.execute(f'VACUUM ANALYZE "{table.name}"')
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+
+    with Session(engine) as db:
+        bounds = data_range(db)
+        if bounds is not None:
+            build_range(db, *bounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate scaled synthetic seed data.")
+    parser.add_argument(
+        "--scale", type=float, default=10, help="Multiple of the shipped data volume"
+    )
+    parser.add_argument(
+        "--out", type=Path, required=True, help="Output directory for the CSV files"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--load", action="store_true", help="COPY the generated files into the database"
+    )
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Truncate the tables before loading (with --load)",
+    )
+    args = parser.parse_args()
+
+    try:
+        print(f"Generating data at scale {args.scale} into {args.out}...")
+        print("=" * 50)
+        totals = generate(args.scale, args.out, args.seed, args.workers)
+        for table in TABLES:
+            print(f"  ✓ {table.name}: {totals.get(table.name, 0)} rows")
+
+        if args.load:
+            print("\nLoading into the database...")
+            load(args.out, args.truncate)
+
+        print("=" * 50)
+        print("✓ Data generation completed successfully!")
+    except Exception as e:
+        print(f"✗ Failed to generate data: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,55 @@
+"""
+Script to install the change-notification triggers.
+
+Creates statement-level triggers on patient, appointment, appointment_service
+and payment that publish every change on the 'table_changes' NOTIFY channel
+(see changefeed/triggers.py). The API consumes them when started with
+CHANGE_FEED=1, to invalidate its caches.
+
+Re-running the script recreates the triggers, so it is safe after schema
+changes. scripts/partition_tables.py migrate recreates the triggers of the
+tables it partitions itself.
+
+Usage:
+    python scripts/install_change_triggers.py          # install or refresh
+    python scripts/install_change_triggers.py --drop   # remove
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path so we can import models
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from changefeed.triggers import WATCHED_TABLES, drop_triggers, install_triggers
+from db.engine import create_sqlalchemy_engine
+
+
+def main(drop: bool = False):
+    """Install (or drop) the change triggers in one transaction."""
+    engine = create_sqlalchemy_engine()
+    try:
+        with engine.begin() as conn:
+            if drop:
+                drop_triggers(conn)
+                print("✓ Change triggers removed")
+            else:
+                install_triggers(conn)
+                for table_name, columns in WATCHED_TABLES.items():
+                    print(f"  ✓ {table_name} (keys: {', '.join(columns)})")
+                print("✓ Change triggers installed")
+    except Exception as e:
+        print(f"✗ Failed to update change triggers: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install the change-notification triggers.")
+    parser.add_argument("--drop", action="store_true", help="Remove the triggers instead")
+    args = parser.parse_args()
+    main(drop=args.drop)
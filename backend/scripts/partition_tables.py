@@ -0,0 +1,178 @@
+"""
+Script to partition payment and appointment_service by month.
+
+Both tables are append-mostly and only grow. Range partitioning by month
+(payment.date, appointment_service.start) lets time-windowed analytics skip
+the months outside the window, and old months can be detached without
+deleting rows. See db/partitions.py for the layout.
+
+Commands:
+    # Migrate the existing single tables (one transaction per table)
+    python scripts/partition_tables.py migrate
+
+    # Create upcoming monthly partitions and move rows out of DEFAULT;
+    # run it periodically (e.g. daily from cron)
+    python scripts/partition_tables.py ensure --months-ahead 3
+
+    # Detach partitions for months before a date (--drop also drops them)
+    python scripts/partition_tables.py detach --before 2023-01-01
+
+    # List partitions and their row counts
+    python scripts/partition_tables.py status
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+from sqlalchemy import text
+
+# Add the backend directory to the path so we can import models
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from db.models import Base
+from db.engine import create_sqlalchemy_engine
+from db.partitions import (
+    DEFAULT_MONTHS_AHEAD,
+    PARTITION_KEYS,
+    detach_partitions,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+    partition_table,
+)
+
+
+def migrate(args):
+    """Convert each plain table into a monthly partitioned table."""
+    engine = create_sqlalchemy_engine()
+    migrated = []
+
+    for table_name in args.tables:
+        with engine.begin() as conn:
+            if is_partitioned(conn, table_name):
+                print(f"  ✓ {table_name} is already partitioned")
+                continue
+            print(f"  + Partitioning {table_name} by {PARTITION_KEYS[table_name]}...")
+            copied = partition_table(
+                conn, Base.metadata.tables[table_name], args.months_ahead
+            )
+            partitions = list_partitions(conn, table_name)
+            print(f"  ✓ {table_name}: {copied} rows in {len(partitions)} partitions")
+            migrated.append(table_name)
+
+    # Fresh partitions have no statistics or visibility map yet, and autovacuum
+    # never analyzes the partitioned parent itself
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table_name in migrated:
+            conn.execute(text(f'VACUUM ANALYZE "{table_name}"'))
+
+
+def ensure(args):
+    """Create upcoming monthly partitions for every partitioned table."""
+    engine = create_sqlalchemy_engine()
+    with engine.begin() as conn:
+        for table_name in args.tables:
+            if not is_partitioned(conn, table_name):
+                print(f"  - {table_name} is not partitioned (run migrate first)")
+                continue
+            created = ensure_partitions(conn, table_name, args.months_ahead)
+            for name in created:
+                print(f"  + Created {name}")
+            print(f"  ✓ {table_name}: {len(created)} partitions created")
+
+
+def detach(args):
+    """Detach (and optionally drop) partitions for months before --before."""
+    engine = create_sqlalchemy_engine()
+    with engine.begin() as conn:
+        for table_name in args.tables:
+            if not is_partitioned(conn, table_name):
+                print(f"  - {table_name} is not partitioned")
+                continue
+            detached = detach_partitions(conn, table_name, args.before, args.drop)
+            action = "Dropped" if args.drop else "Detached"
+            for name in detached:
+                print(f"  - {action} {name}")
+            print(f"  ✓ {table_name}: {len(detached)} partitions {action.lower()}")
+
+
+def status(args):
+    """Print the partitions of each table with estimated row counts."""
+    engine = create_sqlalchemy_engine()
+    with engine.connect() as conn:
+        for table_name in args.tables:
+            if not is_partitioned(conn, table_name):
+                print(f"{table_name}: not partitioned")
+                continue
+            print(f"{table_name}:")
+            for partition in list_partitions(conn, table_name):
+                rows = conn.execute(
+                    text("SELECT reltuples FROM pg_class WHERE relname = :name"),
+                    {"name": partition["name"]},
+                ).scalar()
+                bounds = (
+                    "DEFAULT"
+                    if partition["is_default"]
+                    else f"[{partition['lower']}, {partition['upper']})"
+                )
+                print(f"  {partition['name']}: {bounds}, ~{max(int(rows), 0)} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Partition payment and appointment_service by month."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_tables_argument(subparser):
+        subparser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(PARTITION_KEYS),
+            default=list(PARTITION_KEYS),
+            help="Tables to act on (default: all partitionable tables)",
+        )
+
+    migrate_parser = subparsers.add_parser("migrate", help="Partition the existing tables")
+    add_tables_argument(migrate_parser)
+    migrate_parser.add_argument(
+        "--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD
+    )
+    migrate_parser.set_defaults(func=migrate)
+
+    ensure_parser = subparsers.add_parser("ensure", help="Create upcoming partitions")
+    add_tables_argument(ensure_parser)
+    ensure_parser.add_argument(
+        "--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD
+    )
+    ensure_parser.set_defaults(func=ensure)
+
+    detach_parser = subparsers.add_parser("detach", help="Detach old partitions")
+    add_tables_argument(detach_parser)
+    detach_parser.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        required=True,
+        help="Detach months that end on or before this date (YYYY-MM-DD)",
+    )
+    detach_parser.add_argument(
+        "--drop", action="store_true", help="Drop the detached partitions"
+    )
+    detach_parser.set_defaults(func=detach)
+
+    status_parser = subparsers.add_parser("status", help="List partitions")
+    add_tables_argument(status_parser)
+    status_parser.set_defaults(func=status)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"✗ Partitioning failed: {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
@@ -3,10 +3,17 @@ Script to seed the database with data from JSON files.
 
 This script loads data from the seed_data directory and inserts it into the database
 in the correct order to respect foreign key constraints.
+
+Run with --sync to incrementally upsert into an already populated database.
+Sync mode hashes each record and keeps a checksum manifest in the seed_checksum
+table, so only records that actually changed since the last run are written.
 """
 
+from sqlalchemy import delete, inspect, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
-import os
+import argparse
+import hashlib
 import sys
 import json
 from datetime import datetime
@@ -18,7 +25,6 @@ backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
 from db.models import (
-    Base,
     Patient,
     Provider,
     Service,
@@ -30,13 +36,18 @@ from db.models import (
     PaymentMethodEnum,
     PaymentStatusEnum,
     AppointmentStatusEnum,
+    SeedChecksum,
 )
 from db.engine import create_sqlalchemy_engine
+from db.partitions import PARTITION_KEYS, ensure_partitions, is_partitioned
 
 # Get the project root directory (parent of backend)
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 SEED_DATA_DIR = PROJECT_ROOT / "seed_data"
 
+# Rows per INSERT ... ON CONFLICT statement in sync mode
+DEFAULT_BATCH_SIZE = 1000
+
 
 def parse_datetime(dt_str: str) -> datetime:
     """Parse datetime string from JSON to datetime object."""
@@ -62,24 +73,131 @@ def load_json_file(filepath: Path) -> list:
     return data
 
 
+def provider_row(item: dict) -> dict:
+    """Convert a provider JSON record to Provider column values."""
+    return {
+        "id": item["id"],
+        "first_name": item["first_name"],
+        "last_name": item["last_name"],
+        "email": item["email"],
+        "phone": item["phone"],
+        "created_date": parse_datetime(item["created_date"]),
+    }
+
+
+def service_row(item: dict) -> dict:
+    """Convert a service JSON record to Service column values."""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "description": item["description"],
+        "price": item["price"],
+        "duration": item["duration"],
+        "created_date": parse_datetime(item["created_date"]),
+    }
+
+
+def patient_row(item: dict) -> dict:
+    """Convert a patient JSON record to Patient column values."""
+    return {
+        "id": item["id"],
+        "first_name": item["first_name"],
+        "last_name": item["last_name"],
+        "date_of_birth": parse_datetime(item["date_of_birth"]),
+        "gender": GenderEnum(item["gender"]),
+        "address": item["address"],
+        "phone": item["phone"],
+        "email": item["email"],
+        "source": SourceEnum(item["source"]),
+        "created_date": parse_datetime(item["created_date"]),
+    }
+
+
+def appointment_row(item: dict) -> dict:
+    """Convert an appointment JSON record to Appointment column values."""
+    return {
+        "id": item["id"],
+        "patient_id": item["patient_id"],
+        "status": AppointmentStatusEnum(item["status"]),
+        "created_date": parse_datetime(item["created_date"]),
+    }
+
+
+def appointment_service_row(item: dict) -> dict:
+    """Convert an appointment service JSON record to AppointmentService column values."""
+    return {
+        "appointment_id": item["appointment_id"],
+        "service_id": item["service_id"],
+        "provider_id": item["provider_id"],
+        "start": parse_datetime(item["start"]),
+        "end": parse_datetime(item["end"]),
+    }
+
+
+def payment_row(item: dict) -> dict:
+    """Convert a payment JSON record to Payment column values."""
+    return {
+        "id": item["id"],
+        "patient_id": item["patient_id"],
+        "appointment_id": item["appointment_id"],
+        "provider_id": item["provider_id"],
+        "service_id": item["service_id"],
+        "amount": item["amount"],
+        "date": parse_datetime(item["date"]),
+        "method": PaymentMethodEnum(item["method"]),
+        "status": PaymentStatusEnum(item["status"]),
+        "created_date": parse_datetime(item["created_date"]),
+    }
+
+
+# Seed tables in order to respect foreign key constraints:
+# independent tables first, then appointments, then the junction table and payments
+SEED_TABLES = [
+    (Provider, "provider.json", provider_row),
+    (Service, "service.json", service_row),
+    (Patient, "patient.json", patient_row),
+    (Appointment, "appointment.json", appointment_row),
+    (AppointmentService, "appointment_service.json", appointment_service_row),
+    (Payment, "payment.json", payment_row),
+]
+
+
+def record_checksum(item: dict) -> str:
+    """Stable hash of a seed JSON record, independent of key order."""
+    payload = json.dumps(item, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def record_key(item: dict, key_columns: list[str]) -> str:
+    """Manifest key for a record, built from its primary key values."""
+    return "|".join(str(item[column]) for column in key_columns)
+
+
+def add_seed_checksums(session: Session, model, data: list[dict]):
+    """
+    Add the checksum manifest of freshly inserted records, so the first
+    --sync after a fresh seed skips every unchanged record.
+    """
+    table_name = model.__table__.name
+    key_columns = [column.name for column in model.__table__.primary_key.columns]
+    session.add_all(
+        SeedChecksum(
+            table_name=table_name,
+            record_key=record_key(item, key_columns),
+            checksum=record_checksum(item),
+        )
+        for item in data
+    )
+
+
 def seed_providers(session: Session):
     """Seed Provider table."""
     filepath = SEED_DATA_DIR / "provider.json"
     data = load_json_file(filepath)
 
-    providers = []
-    for item in data:
-        provider = Provider(
-            id=item["id"],
-            first_name=item["first_name"],
-            last_name=item["last_name"],
-            email=item["email"],
-            phone=item["phone"],
-            created_date=parse_datetime(item["created_date"]),
-        )
-        providers.append(provider)
-
+    providers = [Provider(**provider_row(item)) for item in data]
     session.add_all(providers)
+    add_seed_checksums(session, Provider, data)
     session.commit()
     print(f"  ✓ Inserted {len(providers)} providers")
 
@@ -89,19 +207,9 @@ def seed_services(session: Session):
     filepath = SEED_DATA_DIR / "service.json"
     data = load_json_file(filepath)
 
-    services = []
-    for item in data:
-        service = Service(
-            id=item["id"],
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            duration=item["duration"],
-            created_date=parse_datetime(item["created_date"]),
-        )
-        services.append(service)
-
+    services = [Service(**service_row(item)) for item in data]
     session.add_all(services)
+    add_seed_checksums(session, Service, data)
     session.commit()
     print(f"  ✓ Inserted {len(services)} services")
 
@@ -111,23 +219,9 @@ def seed_patients(session: Session):
     filepath = SEED_DATA_DIR / "patient.json"
     data = load_json_file(filepath)
 
-    patients = []
-    for item in data:
-        patient = Patient(
-            id=item["id"],
-            first_name=item["first_name"],
-            last_name=item["last_name"],
-            date_of_birth=parse_datetime(item["date_of_birth"]),
-            gender=GenderEnum(item["gender"]),
-            address=item["address"],
-            phone=item["phone"],
-            email=item["email"],
-            source=SourceEnum(item["source"]),
-            created_date=parse_datetime(item["created_date"]),
-        )
-        patients.append(patient)
-
+    patients = [Patient(**patient_row(item)) for item in data]
     session.add_all(patients)
+    add_seed_checksums(session, Patient, data)
     session.commit()
     print(f"  ✓ Inserted {len(patients)} patients")
 
@@ -137,17 +231,9 @@ def seed_appointments(session: Session):
     filepath = SEED_DATA_DIR / "appointment.json"
     data = load_json_file(filepath)
 
-    appointments = []
-    for item in data:
-        appointment = Appointment(
-            id=item["id"],
-            patient_id=item["patient_id"],
-            status=AppointmentStatusEnum(item["status"]),
-            created_date=parse_datetime(item["created_date"]),
-        )
-        appointments.append(appointment)
-
+    appointments = [Appointment(**appointment_row(item)) for item in data]
     session.add_all(appointments)
+    add_seed_checksums(session, Appointment, data)
     session.commit()
     print(f"  ✓ Inserted {len(appointments)} appointments")
 
@@ -157,18 +243,11 @@ def seed_appointment_services(session: Session):
     filepath = SEED_DATA_DIR / "appointment_service.json"
     data = load_json_file(filepath)
 
-    appointment_services = []
-    for item in data:
-        appointment_service = AppointmentService(
-            appointment_id=item["appointment_id"],
-            service_id=item["service_id"],
-            provider_id=item["provider_id"],
-            start=parse_datetime(item["start"]),
-            end=parse_datetime(item["end"]),
-        )
-        appointment_services.append(appointment_service)
-
+    appointment_services = [
+        AppointmentService(**appointment_service_row(item)) for item in data
+    ]
     session.add_all(appointment_services)
+    add_seed_checksums(session, AppointmentService, data)
     session.commit()
     print(f"  ✓ Inserted {len(appointment_services)} appointment services")
 
@@ -178,23 +257,9 @@ def seed_payments(session: Session):
     filepath = SEED_DATA_DIR / "payment.json"
     data = load_json_file(filepath)
 
-    payments = []
-    for item in data:
-        payment = Payment(
-            id=item["id"],
-            patient_id=item["patient_id"],
-            appointment_id=item["appointment_id"],
-            provider_id=item["provider_id"],
-            service_id=item["service_id"],
-            amount=item["amount"],
-            date=parse_datetime(item["date"]),
-            method=PaymentMethodEnum(item["method"]),
-            status=PaymentStatusEnum(item["status"]),
-            created_date=parse_datetime(item["created_date"]),
-        )
-        payments.append(payment)
-
+    payments = [Payment(**payment_row(item)) for item in data]
     session.add_all(payments)
+    add_seed_checksums(session, Payment, data)
     session.commit()
     print(f"  ✓ Inserted {len(payments)} payments")
 
@@ -205,6 +270,9 @@ def seed_database():
     print("Starting database seeding...")
     print("=" * 50)
 
+    # Make sure the manifest table exists on databases created before it was added
+    SeedChecksum.__table__.create(engine, checkfirst=True)
+
     with Session(engine) as session:
         try:
             # Seed in order to respect foreign key constraints
@@ -230,6 +298,207 @@ def seed_database():
             traceback.print_exc()
             sys.exit(1)
 
+def load_manifest(session: Session, table_name: str) -> dict[str, str]:
+    """Load the stored checksum manifest for a table as {record_key: checksum}."""
+    rows = session.execute(
+        select(SeedChecksum.record_key, SeedChecksum.checksum).where(
+            SeedChecksum.table_name == table_name
+        )
+    )
+    return {key: checksum for key, checksum in rows}
+
+
+def upsert_batch(session: Session, table, key_columns: list[str], rows: list[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE a batch of rows keyed by primary key."""
+    stmt = insert(table).values(rows)
+    update_columns = {
+        column.name: stmt.excluded[column.name]
+        for column in table.columns
+        if column.name not in key_columns
+    }
+    stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=update_columns)
+    session.execute(stmt)
+
+
+def database_key_columns(session: Session, table_name: str) -> list[str]:
+    """
+    Primary key columns of a table as it exists in the database.
+
+    Differs from the model when the table is partitioned: the partition key is
+    then part of the primary key (see db/partitions.py).
+    """
+    pk = inspect(session.connection()).get_pk_constraint(table_name)
+    return pk["constrained_columns"]
+
+
+def sync_table(
+    session: Session,
+    model,
+    filepath: Path,
+    to_row,
+    batch_size: int,
+    force: bool = False,
+):
+    """
+    Upsert the records of a seed JSON file, skipping unchanged ones.
+
+    Args:
+        session: Database session
+        model: SQLAlchemy model the file maps to
+        filepath: Path to the JSON file (full export or delta)
+        to_row: Converter from a JSON record to column values
+        batch_size: Number of rows per INSERT ... ON CONFLICT statement
+        force: Ignore the stored manifest and rewrite every record
+
+    Returns:
+        Tuple of (rows written, rows skipped as unchanged)
+    """
+    table = model.__table__
+    table_name = table.name
+    key_columns = [column.name for column in table.primary_key.columns]
+    conflict_columns = database_key_columns(session, table_name)
+
+    data = load_json_file(filepath)
+    manifest = {} if force else load_manifest(session, table_name)
+
+    # Keep only records whose checksum differs from the manifest
+    # (keyed by primary key, so a repeated record in a delta file is written once)
+    changed_by_key = {}
+    for item in data:
+        key = record_key(item, key_columns)
+        checksum = record_checksum(item)
+        if manifest.get(key) != checksum:
+            changed_by_key[key] = (key, checksum, item)
+    changed = list(changed_by_key.values())
+
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start : start + batch_size]
+        if conflict_columns != key_columns:
+            # The partition key is part of the conflict target, so a record
+            # whose date changed would be inserted next to the old row;
+            # delete the old rows by model key first
+            session.execute(
+                delete(table).where(
+                    tuple_(*(table.c[column] for column in key_columns)).in_(
+                        [
+                            tuple(item[column] for column in key_columns)
+                            for _, _, item in batch
+                        ]
+                    )
+                )
+            )
+        upsert_batch(
+            session, table, conflict_columns, [to_row(item) for _, _, item in batch]
+        )
+        # Record the new checksums in the same transaction as the data
+        upsert_batch(
+            session,
+            SeedChecksum.__table__,
+            ["table_name", "record_key"],
+            [
+                {"table_name": table_name, "record_key": key, "checksum": checksum}
+                for key, checksum, _ in batch
+            ],
+        )
+        session.commit()
+
+    written = len(changed)
+    skipped = len(data) - written
+    print(f"  ✓ {table_name}: {written} upserted, {skipped} unchanged")
+    return written, skipped
+
+
+def sync_database(
+    data_dir: Path = SEED_DATA_DIR,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    force: bool = False,
+):
+    """
+    Incrementally sync all tables from JSON files in data_dir.
+
+    Safe to re-run against a populated database: records are upserted by
+    primary key, and records whose checksum matches the manifest are skipped.
+    Files missing from data_dir are skipped, so a directory of deltas only
+    needs to contain the tables that changed; a missing directory, or one
+    without any seed file, is an error.
+    """
+    if not data_dir.is_dir():
+        print(f"✗ Data directory not found: {data_dir}")
+        sys.exit(1)
+    if not any((data_dir / filename).exists() for _, filename, _ in SEED_TABLES):
+        expected = ", ".join(filename for _, filename, _ in SEED_TABLES)
+        print(f"✗ No seed files in {data_dir} (expected any of: {expected})")
+        sys.exit(1)
+
+    engine = create_sqlalchemy_engine()
+    print(f"Starting incremental sync from {data_dir}...")
+    print("=" * 50)
+
+    # Make sure the manifest table exists on databases created before it was added
+    SeedChecksum.__table__.create(engine, checkfirst=True)
+
+    total_written = 0
+    total_skipped = 0
+
+    with Session(engine) as session:
+        try:
+            for model, filename, to_row in SEED_TABLES:
+                filepath = data_dir / filename
+                if not filepath.exists():
+                    print(f"Skipping {filename} (not present)")
+                    continue
+                written, skipped = sync_table(
+                    session, model, filepath, to_row, batch_size, force
+                )
+                total_written += written
+                total_skipped += skipped
+
+            # Synced rows outside the existing months landed in DEFAULT
+            for table_name in PARTITION_KEYS:
+                if is_partitioned(session.connection(), table_name):
+                    ensure_partitions(session.connection(), table_name)
+            session.commit()
+
+            print("=" * 50)
+            print("✓ Database sync completed successfully!")
+            print(f"  - Rows upserted: {total_written}")
+            print(f"  - Rows unchanged: {total_skipped}")
+        except Exception as e:
+            session.rollback()
+            print(f"✗ Error syncing database: {e}")
+            import traceback
+
+            traceback.print_exc()
+            sys.exit(1)
+
 
 if __name__ == "__main__":
-    seed_database()
+    parser = argparse.ArgumentParser(description="Seed the database from JSON files.")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Incrementally upsert changed records instead of a fresh insert",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=SEED_DATA_DIR,
+        help="Directory containing the JSON files (sync mode only)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Rows per upsert statement (sync mode only)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the checksum manifest and rewrite every record (sync mode only)",
+    )
+    args = parser.parse_args()
+
+    if args.sync:
+        sync_database(args.data_dir, args.batch_size, args.force)
+    else:
+        seed_database()
@@ -0,0 +1,11 @@
+"""Mergeable approximate sketches for analytics over large datasets."""
+
+from sketches.count_min import CountMinSketch
+from sketches.hll import HyperLogLog
+from sketches.kll import KLLSketch
+
+__all__ = [
+    "CountMinSketch",
+    "HyperLogLog",
+    "KLLSketch",
+]
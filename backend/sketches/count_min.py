@@ -0,0 +1,163 @@
+"""
+Count-Min sketch with top-K tracking: approximate per-key totals and rankings.
+
+A depth x width grid of counters estimates the total added for any key; the
+estimate never undercounts, and overcounts by at most e / width of the grand
+total with probability 1 - e^-depth (0.27% of the total with 98% confidence
+at the defaults). Alongside the counters, the sketch keeps the top_k keys with
+the largest estimates, so rankings need no list of every key.
+
+Sketches of the same dimensions merge by adding counters; the merged top
+keys are re-ranked from the union of both candidate lists.
+"""
+
+import math
+import struct
+import zlib
+from array import array
+
+from sketches.hashing import hash64
+
+DEFAULT_WIDTH = 1024
+DEFAULT_DEPTH = 4
+DEFAULT_TOP_K = 50
+
+_DENSE = 0
+_SPARSE = 1
+_HEADER = struct.Struct("<BIIIq")
+_CELL = struct.Struct("<Iq")
+
+
+class CountMinSketch:
+    """Mergeable per-key totals of string keys, with the top keys tracked."""
+
+    def __init__(
+        self,
+        width: int = DEFAULT_WIDTH,
+        depth: int = DEFAULT_DEPTH,
+        top_k: int = DEFAULT_TOP_K,
+    ):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.counts = array("q", bytes(8 * width * depth))
+        self.total = 0
+        # Candidate top keys -> their estimate when last seen
+        self.top: dict[str, int] = {}
+        # Candidates merged in but not ranked yet (ranked once, on demand)
+        self._merged_keys: set[str] = set()
+
+    @property
+    def epsilon(self) -> float:
+        """Maximum overcount of an estimate, as a fraction of total."""
+        return math.e / self.width
+
+    @property
+    def confidence(self) -> float:
+        """Probability that an estimate is within epsilon * total."""
+        return 1 - math.exp(-self.depth)
+
+    @property
+    def max_overcount(self) -> int:
+        """Maximum overcount of an estimate (with probability confidence)."""
+        return math.ceil(self.epsilon * self.total)
+
+    def _cells(self, key: str) -> list[int]:
+        # Double hashing: one 64-bit hash gives the column of every row
+        h = hash64(key)
+        first, second = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [
+            row * self.width + (first + row * second) % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1):
+        """Add a non-negative count to a key."""
+        cells = self._cells(key)
+        for cell in cells:
+            self.counts[cell] += count
+        self.total += count
+        self._track(key, min(self.counts[cell] for cell in cells))
+
+    def estimate(self, key: str) -> int:
+        """Estimated total of a key (never below the true total)."""
+        return min(self.counts[cell] for cell in self._cells(key))
+
+    def _track(self, key: str, estimate: int):
+        self._rank_merged()
+        if key in self.top or len(self.top) < self.top_k:
+            self.top[key] = estimate
+            return
+        smallest = min(self.top, key=self.top.__getitem__)
+        if estimate > self.top[smallest]:
+            del self.top[smallest]
+            self.top[key] = estimate
+
+    def _rank_merged(self):
+        if not self._merged_keys:
+            return
+        estimates = {key: self.estimate(key) for key in self.top.keys() | self._merged_keys}
+        ranked = sorted(estimates, key=estimates.__getitem__, reverse=True)
+        self.top = {key: estimates[key] for key in ranked[: self.top_k]}
+        self._merged_keys = set()
+
+    def most_common(self, n: int) -> list[tuple[str, int]]:
+        """Top n keys with their estimates, largest first."""
+        self._rank_merged()
+        ranked = sorted(
+            ((key, self.estimate(key)) for key in self.top),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:n]
+
+    def merge(self, other: "CountMinSketch"):
+        """Add every count of another sketch of the same dimensions."""
+        self._check_dimensions(other.width, other.depth)
+        for cell, count in enumerate(other.counts):
+            if count:
+                self.counts[cell] += count
+        self.total += other.total
+        self._merged_keys.update(other.top, other._merged_keys)
+
+    def merge_bytes(self, data: bytes):
+        """merge() a serialized sketch without building it first."""
+        kind, width, depth, _, total = _HEADER.unpack_from(data)
+        self._check_dimensions(width, depth)
+        payload = zlib.decompress(data[_HEADER.size :])
+        (cells_size,) = struct.unpack_from("<I", payload)
+        cells = payload[4 : 4 + cells_size]
+        if kind == _SPARSE:
+            for cell, count in _CELL.iter_unpack(cells):
+                self.counts[cell] += count
+        else:
+            for cell, count in enumerate(array("q", cells)):
+                if count:
+                    self.counts[cell] += count
+        self.total += total
+        keys = payload[4 + cells_size :].decode()
+        if keys:
+            self._merged_keys.update(keys.split("\n"))
+
+    def _check_dimensions(self, width: int, depth: int):
+        if (width, depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min sketches of different dimensions")
+
+    def to_bytes(self) -> bytes:
+        self._rank_merged()
+        cells = [(cell, count) for cell, count in enumerate(self.counts) if count]
+        if len(cells) * _CELL.size < len(self.counts) * self.counts.itemsize:
+            kind = _SPARSE
+            body = b"".join(_CELL.pack(cell, count) for cell, count in cells)
+        else:
+            kind = _DENSE
+            body = self.counts.tobytes()
+        keys = "\n".join(self.top).encode()
+        header = _HEADER.pack(kind, self.width, self.depth, self.top_k, self.total)
+        return header + zlib.compress(struct.pack("<I", len(body)) + body + keys)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        _, width, depth, top_k, _ = _HEADER.unpack_from(data)
+        sketch = cls(width, depth, top_k)
+        sketch.merge_bytes(data)
+        return sketch
@@ -0,0 +1,13 @@
+"""Stable hashing shared by the sketches."""
+
+from hashlib import blake2b
+
+
+def hash64(value: str) -> int:
+    """
+    64-bit hash of a string.
+
+    Stable across processes and restarts (unlike the salted built-in hash()),
+    since sketches built by one process are stored and merged by others.
+    """
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
@@ -0,0 +1,154 @@
+"""
+KLL sketch: approximate quantiles of a stream of numbers, mergeable.
+
+Values are kept in a stack of compactors: level h holds values that each
+stand for 2^h of the originals. When a level fills up, it is sorted and every
+other value (at a random offset) is promoted to the next level, halving it.
+Level capacities shrink geometrically towards the bottom, so a sketch holds
+O(k) values however many were added, and the rank of any value is off by
+about 1.7 / k of the count (0.85% at the default k = 200). Fewer than k
+values are kept exactly. Sketches merge by concatenating levels and
+compacting again, so the quantiles of a window come from merging its days'
+sketches.
+
+Based on Karnin, Lang and Liberty, "Optimal Quantile Approximation in
+Streams" (2016).
+"""
+
+import math
+import random
+import struct
+import zlib
+from array import array
+from collections.abc import Iterable
+
+DEFAULT_K = 200
+
+# Capacity ratio between a level and the one above it
+_CAPACITY_RATIO = 2 / 3
+_HEADER = struct.Struct("<IIqdd")
+
+
+class KLLSketch:
+    """Mergeable quantile sketch of numbers."""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.compactors: list[list[float]] = [[]]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    @property
+    def rank_error(self) -> float:
+        """Approximate error of the rank of a quantile, as a fraction of count."""
+        return 1.7 / self.k
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return math.ceil(_CAPACITY_RATIO**depth * self.k) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def add(self, value: float):
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self._grow()
+            compactor.sort()
+            # An odd value out stays behind, the rest are halved
+            keep = [compactor.pop()] if len(compactor) % 2 else []
+            self.compactors[level + 1].extend(compactor[random.getrandbits(1) :: 2])
+            self.compactors[level] = keep
+            self._size = sum(len(c) for c in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch"):
+        """Add every value counted by another sketch."""
+        self._merge_levels(other.compactors, other.count, other.min, other.max)
+
+    def _merge_levels(
+        self, levels: list[list[float]], count: int, low: float, high: float
+    ):
+        while len(self.compactors) < len(levels):
+            self._grow()
+        for level, values in enumerate(levels):
+            self.compactors[level].extend(values)
+        self.count += count
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        self._size = sum(len(c) for c in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def merge_bytes(self, data: bytes):
+        """merge() a serialized sketch without building it first."""
+        _, levels, count, low, high = _HEADER.unpack_from(data)
+        payload = zlib.decompress(data[_HEADER.size :])
+        sizes = struct.unpack_from(f"<{levels}I", payload)
+        values = array("d", payload[4 * levels :])
+        compactors, offset = [], 0
+        for size in sizes:
+            compactors.append(values[offset : offset + size].tolist())
+            offset += size
+        self._merge_levels(compactors, count, low, high)
+
+    def quantiles(self, fractions: Iterable[float]) -> list[float | None]:
+        """Estimated value at each fraction (0-1) of the count; None if empty."""
+        fractions = list(fractions)
+        if not self.count:
+            return [None] * len(fractions)
+        weighted = sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for value in compactor
+        )
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self.min)
+                continue
+            if fraction >= 1:
+                results.append(self.max)
+                continue
+            target, cumulative = fraction * total, 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+        return results
+
+    def to_bytes(self) -> bytes:
+        sizes = struct.pack(f"<{len(self.compactors)}I", *map(len, self.compactors))
+        values = array("d", (value for compactor in self.compactors for value in compactor))
+        header = _HEADER.pack(self.k, len(self.compactors), self.count, self.min, self.max)
+        return header + zlib.compress(sizes + values.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLLSketch":
+        (k,) = struct.unpack_from("<I", data)
+        sketch = cls(k)
+        sketch.merge_bytes(data)
+        return sketch
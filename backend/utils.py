@@ -2,6 +2,7 @@
 
 import base64
 import json
+from datetime import date, datetime, time, timedelta
 
 
 def encode_cursor(cursor_data: dict) -> str:
@@ -31,3 +32,36 @@ def decode_cursor(cursor: str) -> dict | None:
         return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
     except Exception:
         return None
+
+
+def validate_window(start_date: date | None, end_date: date | None):
+    """
+    Check a [start_date, end_date] window (both optional).
+
+    Raises:
+        ValueError: If start_date is after end_date
+    """
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("startDate must not be after endDate")
+
+
+def date_window(column, start_date: date | None, end_date: date | None) -> list:
+    """
+    Filter conditions restricting a timestamp column to [start_date, end_date].
+
+    Both dates are inclusive and optional. On partitioned tables
+    (db/partitions.py) the literal bounds let Postgres skip the months outside
+    the window.
+
+    Raises:
+        ValueError: If start_date is after end_date (see validate_window)
+    """
+    validate_window(start_date, end_date)
+    conditions = []
+    if start_date:
+        conditions.append(column >= datetime.combine(start_date, time.min))
+    if end_date:
+        conditions.append(
+            column < datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+    return conditions
@@ -0,0 +1,177 @@
+"""
+Startup warm-up.
+
+The first requests after a deploy or a cold start would otherwise pay for
+opening database connections, compiling every SQLAlchemy statement (the
+compiled cache is per process and starts empty) and the first run of each
+response model's validation and serialization. The warm-up pays these costs
+before real traffic arrives:
+
+1. opens WARMUP_CONNECTIONS pool connections (when DB_POOL_SIZE enables a pool)
+2. sends one in-process GET to every endpoint in WARMUP_PATHS, plus the
+   follow-up shapes (next page, patient detail), through the full middleware
+   stack, so each endpoint's statements are compiled and cached
+3. keeps the analytics responses in the response cache (WARMUP_PRECOMPUTE=1,
+   when the response cache is enabled) or drops them (WARMUP_PRECOMPUTE=0)
+
+The warm-up runs in the background once the server has started, and
+/ready answers 503 until it completes, so a load balancer only routes
+traffic to warmed-up workers (/health stays a plain liveness check). Failures are logged and do not block
+readiness.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+import anyio
+import httpx
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from middleware.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1").lower() in ("1", "true", "yes")
+# Connections to open up front (default: the whole pool)
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "-1"))
+WARMUP_PRECOMPUTE = os.getenv("WARMUP_PRECOMPUTE", "1").lower() in ("1", "true", "yes")
+
+# Endpoints requested once each, in order
+WARMUP_PATHS = [
+    "/api/patients",
+    "/api/providers",
+    "/api/appointments",
+    "/api/payments",
+    "/api/analytics/patients",
+    "/api/analytics/business",
+    "/api/analytics/providers",
+    "/api/analytics/patient-behavior",
+]
+
+
+@dataclass
+class WarmupState:
+    """Progress of the warm-up, reported by /ready."""
+
+    ready: bool = not WARMUP_ENABLED
+    duration_ms: float | None = None
+    failures: list[str] = field(default_factory=list)
+    # Set on shutdown: no further warm-up requests are sent
+    stopping: bool = False
+
+
+warmup_state = WarmupState()
+
+
+def open_connections(engine: Engine, count: int) -> int:
+    """
+    Open up to `count` pool connections and return them to the pool.
+
+    Returns:
+        Number of connections opened
+    """
+    if isinstance(engine.pool, NullPool):
+        # Nothing would stay open
+        return 0
+    if count < 0:
+        count = engine.pool.size()
+
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.raw_connection())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def request_endpoints(
+    app, paths: list[str], state: WarmupState = warmup_state
+) -> list[str]:
+    """
+    GET every path in-process, plus the follow-up requests their responses
+    enable, until state.stopping is set.
+
+    Returns:
+        Paths that failed
+    """
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        queue = list(paths)
+        while queue and not state.stopping:
+            path = queue.pop(0)
+            try:
+                response = await client.get(path)
+                response.raise_for_status()
+            except Exception as exc:
+                logger.warning("Warm-up request %s failed: %s", path, exc)
+                failures.append(path)
+                continue
+
+            if path == "/api/patients":
+                body = response.json()
+                if body["nextCursor"]:
+                    queue.append(f"/api/patients?{urlencode({'cursor': body['nextCursor']})}")
+                if body["data"]:
+                    queue.append(f"/api/patients/{body['data'][0]['id']}")
+            elif path in ("/api/providers", "/api/appointments", "/api/payments"):
+                cursor = response.json()["nextCursor"]
+                if cursor:
+                    queue.append(f"{path}?{urlencode({'cursor': cursor})}")
+    return failures
+
+
+async def warm_up(app, engine: Engine, state: WarmupState = warmup_state):
+    """Run the warm-up steps and mark the app ready."""
+    started = time.perf_counter()
+    opened = 0
+    try:
+        opened = await anyio.to_thread.run_sync(open_connections, engine, WARMUP_CONNECTIONS)
+        state.failures = await request_endpoints(app, WARMUP_PATHS, state)
+        if not WARMUP_PRECOMPUTE:
+            response_cache.clear()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Warm-up failed")
+    finally:
+        state.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        state.ready = True
+
+    logger.info(
+        "Warm-up finished in %.0f ms (%d connections opened, %d failed requests)",
+        state.duration_ms,
+        opened,
+        len(state.failures),
+    )
+
+
+def start_warmup(app, engine: Engine) -> asyncio.Task | None:
+    """
+    Start the warm-up in the background when WARMUP is enabled.
+
+    Returns:
+        The warm-up task, or None when the warm-up is disabled
+    """
+    if not WARMUP_ENABLED:
+        return None
+    warmup_state.stopping = False
+    return asyncio.create_task(warm_up(app, engine), name="warmup")
+
+
+async def stop_warmup(task: asyncio.Task, state: WarmupState = warmup_state):
+    """
+    Stop the warm-up after its in-flight request and wait for it.
+
+    Not cancelled: a cancelled request would abandon its endpoint in the
+    threadpool without closing the endpoint's session there.
+    """
+    state.stopping = True
+    await task